@@ -2,11 +2,13 @@
 Chat endpoints for conversational interface
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
+import json
 
-from config.database import get_db
+from config.database import get_db, SessionLocal
 from services.chat_service import ChatService
 
 router = APIRouter()
@@ -31,6 +33,7 @@ class MessageResponse(BaseModel):
     role: str
     content: str
     created_at: Optional[str]
+    metrics: Optional[Dict] = None
 
 
 class ChatResponse(BaseModel):
@@ -160,7 +163,8 @@ async def send_message(
             id=response.id,
             role=response.role,
             content=response.content,
-            created_at=response.created_at.isoformat() if response.created_at else None
+            created_at=response.created_at.isoformat() if response.created_at else None,
+            metrics=getattr(response, "metrics", None)
         )
     except Exception as e:
         raise HTTPException(
@@ -169,6 +173,49 @@ async def send_message(
         )
 
 
+@router.post("/chats/{chat_id}/messages/stream")
+async def stream_message(
+    chat_id: int,
+    message_data: MessageCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Send a message in a chat and stream the AI response as Server-Sent Events
+    
+    Events: "token" ({"content": ...}) for each piece of the response, then
+    "done" ({"message": ...} with metrics) once the assistant message is
+    stored, or "error" if the model failed.
+    """
+    # Check if chat exists
+    if not ChatService(db).get_chat(chat_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat not found"
+        )
+    
+    async def events():
+        # The stream outlives the request-scoped session, so it uses its own
+        stream_db = SessionLocal()
+        try:
+            chat_service = ChatService(stream_db)
+            async for event, data in chat_service.stream_message(
+                chat_id=chat_id,
+                content=message_data.content,
+                document_ids=message_data.document_ids
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'Error processing message: {str(e)}'})}\n\n"
+        finally:
+            stream_db.close()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.delete("/chats/{chat_id}")
 async def delete_chat(
     chat_id: int,
@@ -1,17 +1,21 @@
 """
 Document management endpoints
 """
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+import asyncio
 import os
-import uuid
 from datetime import datetime
 
 from config.database import get_db
 from config.settings import get_settings
 from models.document import Document
 from services.document_service import DocumentService
+from services.embedding_scheduler import get_embedding_scheduler
+from services.job_queue import get_ingestion_queue
+from services.blob_store import get_blob_store
+from utils.uploads import stream_upload_to_temp, UploadTooLargeError
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -26,63 +30,149 @@ class DocumentResponse(BaseModel):
     file_size: int
     status: str
     created_at: Optional[str]
+    job_id: Optional[int] = None
 
 
-@router.post("/documents/upload", response_model=DocumentResponse)
+class IngestionJobResponse(BaseModel):
+    """Ingestion job response schema"""
+    id: int
+    document_id: int
+    job_type: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    error_message: Optional[str]
+    created_at: Optional[str]
+    started_at: Optional[str]
+    finished_at: Optional[str]
+
+
+class TableInfo(BaseModel):
+    """Spreadsheet table schema"""
+    index: int
+    sheet: str
+    rows: int
+    columns: List[Dict[str, str]]
+
+
+class TableFilter(BaseModel):
+    """Table query filter"""
+    column: str
+    op: str = "=="
+    value: Any = None
+
+
+class TableAggregate(BaseModel):
+    """Table query aggregate; count without a column counts rows"""
+    func: str
+    column: Optional[str] = None
+
+
+class TableQueryRequest(BaseModel):
+    """Table query schema"""
+    filters: List[TableFilter] = []
+    group_by: List[str] = []
+    aggregates: List[TableAggregate] = []
+    columns: Optional[List[str]] = None
+    order_by: Optional[str] = None
+    descending: bool = False
+    limit: int = 100
+
+
+class TableQueryResponse(BaseModel):
+    """Table query result schema"""
+    columns: List[str]
+    rows: List[List[Any]]
+    row_count: int
+    truncated: bool
+    elapsed_ms: float
+
+
+class ChunkSearchResult(BaseModel):
+    """Chunk search result schema"""
+    chunk_id: int
+    document_id: int
+    chunk_index: int
+    content: str
+    score: float
+
+
+@router.post(
+    "/documents/upload",
+    response_model=DocumentResponse,
+    # The body is parsed by hand (see stream_upload_to_temp); describe it for the docs
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                }
+            },
+        }
+    }
+)
 async def upload_document(
-    file: UploadFile = File(...),
+    request: Request,
+    priority: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
     Upload a document for processing
+    
+    Returns as soon as the file is stored; extraction and embedding run on
+    the background ingestion queue. Poll /documents/jobs/{job_id} for progress.
     """
     settings = get_settings()
     document_service = DocumentService(db)
     
-    # Validate file type
-    file_ext = file.filename.split(".")[-1].lower() if "." in file.filename else ""
-    if file_ext not in settings.supported_formats:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported file type: {file_ext}"
-        )
-    
-    # Read file content
-    content = await file.read()
-    
-    # Check file size
-    file_size = len(content)
+    # Stream the multipart body straight to a temp file, hashing and
+    # enforcing the size limit as it arrives, so memory use stays constant
+    # and an oversized upload is cut off instead of received in full
     max_size = settings.max_file_size_mb * 1024 * 1024
-    if file_size > max_size:
+    try:
+        temp_path, file_size, file_hash, filename, content_type = await stream_upload_to_temp(
+            request, settings.temp_dir, max_size, supported_formats=settings.supported_formats
+        )
+    except UploadTooLargeError:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File too large. Maximum size: {settings.max_file_size_mb}MB"
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    file_ext = filename.split(".")[-1].lower() if "." in filename else ""
     
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}_{file.filename}"
-    file_path = os.path.join(settings.upload_dir, unique_filename)
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Store by content hash; identical uploads share one file on disk
+    try:
+        blob = get_blob_store().acquire(db, temp_path, file_hash, file_ext, file_size)
+    finally:
+        # acquire consumes the temp file on success
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    file_path = blob.file_path
+    unique_filename = os.path.basename(file_path)
     
     # Create document record
     document = document_service.create_document(
         filename=unique_filename,
-        original_filename=file.filename,
+        original_filename=filename,
         file_type=file_ext,
         file_size=file_size,
         file_path=file_path,
-        mime_type=file.content_type
+        mime_type=content_type
     )
     
-    # Process document asynchronously (in background)
-    # For now, we'll process it synchronously
-    try:
-        document_service.process_document(document.id)
-    except Exception as e:
-        print(f"Error processing document: {e}")
+    # Queue extraction and embedding for the background workers
+    job = get_ingestion_queue().enqueue(db, document.id, file_ext, priority=priority)
     
     return DocumentResponse(
         id=document.id,
@@ -91,7 +181,8 @@ async def upload_document(
         file_type=document.file_type,
         file_size=document.file_size,
         status=document.status,
-        created_at=document.created_at.isoformat() if document.created_at else None
+        created_at=document.created_at.isoformat() if document.created_at else None,
+        job_id=job.id
     )
 
 
@@ -121,6 +212,86 @@ async def list_documents(
     ]
 
 
+@router.get("/documents/search", response_model=List[ChunkSearchResult])
+async def search_documents(
+    q: str,
+    limit: int = 10,
+    mode: str = "hybrid",
+    document_ids: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Search document chunks
+    
+    Modes: "hybrid" (BM25 + vector, reciprocal rank fusion), "lexical" (BM25)
+    or "vector" (cosine similarity)
+    """
+    document_service = DocumentService(db)
+    
+    if mode not in ("hybrid", "lexical", "vector"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported search mode: {mode}"
+        )
+    
+    # Index loading and scoring are CPU-bound: keep them off the event loop
+    if mode == "lexical":
+        results = await asyncio.to_thread(
+            document_service.search_chunks_lexical, q, limit=limit, document_ids=document_ids
+        )
+    else:
+        query_embedding = await get_embedding_scheduler().embed(q)
+        if mode == "hybrid":
+            search = document_service.hybrid_search
+        else:
+            search = document_service.search_similar_chunks
+        results = await asyncio.to_thread(
+            search, q, limit=limit, document_ids=document_ids, query_embedding=query_embedding
+        )
+    
+    return [
+        ChunkSearchResult(
+            chunk_id=chunk.id,
+            document_id=chunk.document_id,
+            chunk_index=chunk.chunk_index,
+            content=chunk.content,
+            score=score
+        )
+        for chunk, score in results
+    ]
+
+
+@router.get("/documents/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(
+    job_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the status of a document ingestion job
+    """
+    job = get_ingestion_queue().get_job(db, job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return IngestionJobResponse(
+        id=job.id,
+        document_id=job.document_id,
+        job_type=job.job_type,
+        status=job.status,
+        priority=job.priority,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        error_message=job.error_message,
+        created_at=job.created_at.isoformat() if job.created_at else None,
+        started_at=job.started_at.isoformat() if job.started_at else None,
+        finished_at=job.finished_at.isoformat() if job.finished_at else None
+    )
+
+
 @router.get("/documents/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
@@ -149,6 +320,85 @@ async def get_document(
     )
 
 
+@router.get("/documents/{document_id}/tables", response_model=List[TableInfo])
+async def list_document_tables(
+    document_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    List the queryable tables (one per sheet) of a spreadsheet document
+    """
+    # Imported here so pyarrow loads on first use, not at startup
+    from services.table_query import document_tables
+    
+    document_service = DocumentService(db)
+    document = document_service.get_document(document_id)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    return [
+        TableInfo(index=index, sheet=table["sheet"], rows=table["rows"], columns=table["columns"])
+        for index, table in enumerate(document_tables(document))
+    ]
+
+
+@router.post("/documents/{document_id}/tables/{table_index}/query", response_model=TableQueryResponse)
+async def query_document_table(
+    document_id: int,
+    table_index: int,
+    query: TableQueryRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Filter, group and aggregate a spreadsheet table
+    
+    Runs on the document's columnar copy rather than its text, e.g.
+    {"group_by": ["region"], "aggregates": [{"column": "revenue", "func": "sum"}]}
+    """
+    from services.table_query import document_tables, query_table, TableQueryError
+    
+    document_service = DocumentService(db)
+    document = document_service.get_document(document_id)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    tables = document_tables(document)
+    if not 0 <= table_index < len(tables):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Table not found"
+        )
+    
+    try:
+        # A Parquet scan: keep it off the event loop
+        result = await asyncio.to_thread(
+            query_table,
+            tables[table_index]["path"],
+            filters=[condition.model_dump() for condition in query.filters],
+            group_by=query.group_by,
+            aggregates=[aggregate.model_dump() for aggregate in query.aggregates],
+            columns=query.columns,
+            order_by=query.order_by,
+            descending=query.descending,
+            limit=query.limit
+        )
+    except TableQueryError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return TableQueryResponse(**result)
+
+
 @router.delete("/documents/{document_id}")
 async def delete_document(
     document_id: int,
@@ -7,6 +7,10 @@ from datetime import datetime
 
 from config.database import get_db, check_database_connection
 from config.settings import get_settings
+from services.job_queue import get_ingestion_queue
+from services.ollama_client import get_ollama_client
+from services.response_cache import get_response_cache
+from services.request_coalescer import get_request_coalescer
 
 router = APIRouter()
 
@@ -50,9 +54,8 @@ async def detailed_health(db: Session = Depends(get_db)):
     # Check Ollama (basic)
     ollama_status = "unknown"
     try:
-        import httpx
-        response = httpx.get(f"{settings.ollama_base_url}/api/tags", timeout=5)
-        ollama_status = "healthy" if response.status_code == 200 else "unhealthy"
+        await get_ollama_client().request("GET", "/api/tags", route="health")
+        ollama_status = "healthy"
     except Exception:
         ollama_status = "unhealthy"
     
@@ -66,3 +69,72 @@ async def detailed_health(db: Session = Depends(get_db)):
         "version": settings.app_version
     }
 
+
+
+@router.get("/health/embedding-cache")
+async def embedding_cache_stats():
+    """
+    Embedding cache statistics (hit rate, bytes saved, memory tier size)
+    """
+    # Embedding services are resolved on use so importing the router stays light
+    from services.embedding_cache import get_embedding_cache
+    
+    cache = get_embedding_cache()
+    
+    return {
+        "enabled": cache is not None,
+        "stats": cache.stats() if cache else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/health/response-cache")
+async def response_cache_stats():
+    """
+    Chat response cache statistics (hit rate, generation time saved, size)
+    """
+    cache = get_response_cache()
+    
+    return {
+        "enabled": cache is not None,
+        "stats": cache.stats() if cache else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/health/generation-coalescing")
+async def generation_coalescing_stats():
+    """
+    Model generation coalescing statistics (upstream vs coalesced calls)
+    """
+    coalescer = get_request_coalescer()
+    
+    return {
+        "enabled": coalescer is not None,
+        "stats": coalescer.metrics() if coalescer else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/health/embedding-scheduler")
+async def embedding_scheduler_stats():
+    """
+    Embedding scheduler metrics (queue depth, batch sizes, latency)
+    """
+    from services.embedding_scheduler import get_embedding_scheduler
+    
+    return {
+        "stats": get_embedding_scheduler().metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/health/ingestion-queue")
+async def ingestion_queue_stats(db: Session = Depends(get_db)):
+    """
+    Ingestion queue statistics (jobs by status, running jobs per type)
+    """
+    return {
+        "stats": get_ingestion_queue().stats(db),
+        "timestamp": datetime.utcnow().isoformat()
+    }
@@ -0,0 +1,106 @@
+"""
+Benchmark: full chat history vs token-budgeted history with a rolling summary
+Plays a long conversation against a fake Ollama server (see
+bench_ollama_client.py) on a throwaway SQLite database and, at checkpoints,
+compares the prompt the previous implementation would send (every message
+of the chat) with the budgeted one: estimated prompt tokens and the time
+to assemble the history.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_conversation_history.py --turns 300 --model llama2
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+WORDS = (
+    "invoice payment customer order shipment warehouse report quarterly revenue "
+    "contract clause delivery schedule supplier account balance tax region "
+    "product catalogue discount meeting summary policy employee review budget"
+).split()
+
+CHECKPOINTS = [10, 25, 50, 100, 200, 300, 500, 1000]
+
+
+def question(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 90))) + "?"
+
+
+def legacy_history(db, chat_id: int):
+    """The previous history: every message of the chat"""
+    from models.chat import Message
+
+    messages = db.query(Message).filter(Message.chat_id == chat_id).order_by(Message.created_at).all()
+    return [{"role": msg.role, "content": msg.content} for msg in messages]
+
+
+def timed(fn, repeat: int = 5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+async def play(turns: int, model: str):
+    from config.database import SessionLocal, Base, engine
+    from services.chat_service import ChatService
+    from services.conversation_history import _summary_tasks
+    from utils.helpers import estimate_tokens
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    chat_service = ChatService(db)
+    chat = chat_service.create_chat(title="Benchmark", model_name=model)
+    rng = random.Random(5)
+
+    print(f"Model {model}: prompt budget {chat_service.history.prompt_budget(model)} tokens\n")
+    print(f"{'turn':>6}{'legacy tokens':>15}{'legacy ms':>11}{'budgeted tokens':>17}{'budgeted ms':>13}{'summarized':>12}")
+    for turn in range(1, turns + 1):
+        response = await chat_service.send_message(chat.id, question(rng))
+        # Let the background summary update finish before the next turn
+        await asyncio.gather(*list(_summary_tasks.values()))
+        if turn not in CHECKPOINTS and turn != turns:
+            continue
+
+        legacy, legacy_ms = timed(lambda: legacy_history(db, chat.id))
+        (history, stats), budgeted_ms = timed(lambda: chat_service.history.build(chat))
+        print(
+            f"{turn:>6}{sum(estimate_tokens(m['content']) for m in legacy):>15}{legacy_ms:>11.2f}"
+            f"{response.metrics['prompt_tokens_estimate']:>17}{budgeted_ms:>13.2f}{stats['summarized_messages']:>12}"
+        )
+    db.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark conversation history assembly")
+    parser.add_argument("--turns", type=int, default=300, help="User messages in the conversation")
+    parser.add_argument("--model", default="llama2", help="Model name (context length from [ollama.models])")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings read DATABASE_URL when config is first imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from config.settings import get_settings
+        from bench_ollama_client import start_server
+
+        server, base_url = start_server()
+        try:
+            get_settings().ollama_base_url = base_url
+            asyncio.run(play(args.turns, args.model))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
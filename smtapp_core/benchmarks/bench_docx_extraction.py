@@ -0,0 +1,185 @@
+"""
+Benchmark: python-docx object model vs streaming DOCX extraction
+Generates a synthetic DOCX of about --pages pages (paragraphs plus tables
+with horizontally and vertically merged cells), then extracts it in fresh
+subprocesses with the previous implementation (python-docx, text += ...),
+the python-docx fallback and the iterparse fast path, reporting wall time
+and peak RSS, and checks that the fast path and fallback agree.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_docx_extraction.py --pages 1000
+"""
+import sys
+import os
+import time
+import random
+import subprocess
+import tempfile
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+WORDS = (
+    "agreement party clause term payment schedule liability warranty notice "
+    "termination confidential supplier customer invoice delivery governing law"
+).split()
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '</Types>'
+)
+
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" '
+    'Target="docProps/core.xml"/>'
+    '</Relationships>'
+)
+
+DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"/>'
+)
+
+CORE = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dc:title>Contract bundle</dc:title><dc:creator>Benchmark</dc:creator>'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">2024-01-02T03:04:05Z</dcterms:created>'
+    '</cp:coreProperties>'
+)
+
+
+def paragraph(text: str) -> str:
+    return f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def cell(text: str, properties: str = "") -> str:
+    return f"<w:tc><w:tcPr>{properties}</w:tcPr>{paragraph(text)}</w:tc>"
+
+
+def table(rng: random.Random, rows: int) -> str:
+    """Four grid columns: a two-column merged header and a vertically merged first column"""
+    parts = ["<w:tbl><w:tblGrid>" + '<w:gridCol w:w="2000"/>' * 4 + "</w:tblGrid>"]
+    parts.append("<w:tr>" + cell("Section", '<w:gridSpan w:val="2"/>') + cell("Amount") + cell("Due") + "</w:tr>")
+    for number in range(rows):
+        first = cell(f"Group {number // 3}", '<w:vMerge w:val="restart"/>') if number % 3 == 0 else cell("", "<w:vMerge/>")
+        parts.append(
+            "<w:tr>" + first + cell(rng.choice(WORDS)) + cell(f"{rng.uniform(100, 9999):.2f}")
+            + cell(f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}") + "</w:tr>"
+        )
+    parts.append("</w:tbl>")
+    return "".join(parts)
+
+
+def write_synthetic_docx(path: str, pages: int, paragraphs_per_page: int = 30, seed: int = 3):
+    """Write a DOCX of roughly the given number of pages"""
+    rng = random.Random(seed)
+    body = []
+    for page in range(pages):
+        body.append(paragraph(f"Page {page + 1} clause schedule"))
+        for _ in range(paragraphs_per_page):
+            body.append(paragraph(" ".join(rng.choice(WORDS) for _ in range(14))))
+        if page % 5 == 4:
+            body.append(table(rng, 12))
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W_NS}"><w:body>' + "".join(body) + "<w:sectPr/></w:body></w:document>"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", PACKAGE_RELS)
+        archive.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS)
+        archive.writestr("word/document.xml", document)
+        archive.writestr("docProps/core.xml", CORE)
+
+
+def legacy_process(file_path: str) -> str:
+    """The previous DOCXProcessor.process: paragraphs, then every table cell"""
+    from docx import Document
+
+    doc = Document(file_path)
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text += cell.text + " "
+            text += "\n"
+    return text.strip()
+
+
+def run_worker(mode: str, path: str):
+    """Extract one file and print the text (runs in a subprocess)"""
+    from processors.docx_processor import DOCXProcessor
+
+    if mode == "legacy":
+        text = legacy_process(path)
+    elif mode == "fallback":
+        text = "".join(DOCXProcessor()._iter_python_docx(path, {})).strip()
+    else:
+        text = DOCXProcessor().process(path)["text"]
+    sys.stdout.write(text)
+
+
+def measure(mode: str, path: str):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--worker", mode, path],
+        stdout=subprocess.PIPE
+    )
+    output = proc.stdout.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError(f"{mode} worker failed on {path}")
+    # ru_maxrss is in KiB on Linux
+    return elapsed, usage.ru_maxrss / 1024, output.decode("utf-8")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark DOCX extraction")
+    parser.add_argument("--pages", type=int, default=1000, help="Approximate pages in the synthetic DOCX")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bundle.docx")
+        write_synthetic_docx(path, args.pages)
+        print(f"Synthetic DOCX: ~{args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB\n")
+
+        texts = {}
+        for mode in ("legacy", "fallback", "streaming"):
+            elapsed, rss_mb, texts[mode] = measure(mode, path)
+            print(f"{mode:<12}{elapsed:8.2f} s   peak RSS {rss_mb:8.1f} MB   text {len(texts[mode]) / 1e6:6.2f} M chars")
+
+        print(f"\nstreaming == fallback: {texts['streaming'] == texts['fallback']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: PyTorch vs ONNX Runtime (fp32 and int8) embedding backends
+Encodes the same chunk corpus with each backend, reports throughput, and
+checks parity: the cosine similarity between each ONNX embedding and the
+PyTorch embedding of the same text must stay above a bound. Exits non-zero
+when a backend drifts past its bound, so it can gate a backend switch.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_embedding_backends.py --chunks 2000 --threads 4
+    cd smtapp_core && python benchmarks/bench_embedding_backends.py --from-db 5000
+"""
+import sys
+import time
+import random
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from config.settings import get_settings
+from services.onnx_embedding import export_model, OnnxEmbeddingModel
+
+
+WORDS = (
+    "invoice payment customer order shipment warehouse report quarterly revenue "
+    "contract clause delivery schedule supplier account balance tax region "
+    "product catalogue discount meeting summary policy employee review budget"
+).split()
+
+
+def synthetic_corpus(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 180)))
+        for _ in range(count)
+    ]
+
+
+def db_corpus(count: int):
+    from config.database import SessionLocal
+    from models.document import DocumentChunk
+
+    db = SessionLocal()
+    try:
+        rows = db.query(DocumentChunk.content).order_by(DocumentChunk.id).limit(count).all()
+    finally:
+        db.close()
+    return [content for (content,) in rows if content]
+
+
+def timed_encode(model, texts, batch_size: int):
+    model.encode(texts[:batch_size], batch_size=batch_size, convert_to_numpy=True)
+    start = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return np.asarray(embeddings, dtype=np.float32), time.perf_counter() - start
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.einsum("ij,ij->i", a, b)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark and parity-check embedding backends")
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic chunks to encode")
+    parser.add_argument("--from-db", type=int, default=0, help="Use this many stored chunks instead")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per encode call")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX intra-op threads (0 = runtime default)")
+    parser.add_argument("--model-dir", default=None, help="Export directory (default: temporary)")
+    parser.add_argument("--min-cosine-fp32", type=float, default=0.9999, help="Parity bound for ONNX fp32")
+    parser.add_argument("--min-cosine-int8", type=float, default=0.98, help="Parity bound for ONNX int8")
+    args = parser.parse_args()
+
+    model_name = get_settings().default_embeddings_model
+    texts = db_corpus(args.from_db) if args.from_db else synthetic_corpus(args.chunks)
+    print(f"Model: {model_name}   chunks: {len(texts)}   batch size: {args.batch_size}\n")
+
+    export_root = args.model_dir or tempfile.mkdtemp(prefix="onnx-export-")
+    model_dir = export_model(model_name, export_root, quantize=True)
+
+    reference, elapsed = timed_encode(SentenceTransformer(model_name, device="cpu"), texts, args.batch_size)
+    print(f"{'torch fp32':<12}{len(texts) / elapsed:10.1f} chunks/s")
+
+    failed = False
+    for label, quantized, bound in (
+        ("onnx fp32", False, args.min_cosine_fp32),
+        ("onnx int8", True, args.min_cosine_int8),
+    ):
+        model = OnnxEmbeddingModel(model_dir, quantized=quantized, num_threads=args.threads)
+        embeddings, backend_elapsed = timed_encode(model, texts, args.batch_size)
+        cosines = cosine_rows(reference, embeddings)
+        ok = cosines.min() >= bound
+        failed |= not ok
+        print(
+            f"{label:<12}{len(texts) / backend_elapsed:10.1f} chunks/s   "
+            f"x{elapsed / backend_elapsed:4.2f}   "
+            f"cosine min {cosines.min():.5f} mean {cosines.mean():.5f}   "
+            f"{'OK' if ok else f'FAIL (< {bound})'}"
+        )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: per-chunk vs batched chunk embedding
+Measures chunks per second for the old one-encode-per-chunk loop and for
+EmbeddingService.iter_embedding_batches on the same synthetic document.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_embedding_batch.py --chunks 2000
+"""
+import sys
+import time
+import random
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.embedding_service import EmbeddingService
+from utils.helpers import chunk_text
+
+
+WORDS = (
+    "invoice contract payment shipment revenue region quarter customer supplier "
+    "warranty liability clause delivery schedule account balance report summary"
+).split()
+
+
+def make_document(chunks: int, seed: int = 0) -> str:
+    """Build a synthetic document that splits into roughly `chunks` chunks"""
+    rng = random.Random(seed)
+    # chunk_text advances 450 characters per chunk
+    target = chunks * 450
+    words = []
+    length = 0
+    while length < target:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def bench_loop(service: EmbeddingService, chunks) -> float:
+    start = time.perf_counter()
+    for chunk in chunks:
+        service.create_embedding(chunk)
+    return time.perf_counter() - start
+
+
+def bench_batched(service: EmbeddingService, chunks, batch_size: int) -> float:
+    start = time.perf_counter()
+    for _ in service.iter_embedding_batches(chunks, batch_size=batch_size):
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark chunk embedding throughput")
+    parser.add_argument("--chunks", type=int, default=1000, help="Number of chunks to embed")
+    parser.add_argument("--batch-size", type=int, default=None, help="Batch size (defaults to settings)")
+    args = parser.parse_args()
+
+    service = EmbeddingService()
+    chunks = chunk_text(make_document(args.chunks))
+    batch_size = args.batch_size or service.settings.embedding_batch_size
+
+    # Load the model and warm up outside the timed region
+    service.create_embeddings_batch(chunks[:8])
+
+    loop_seconds = bench_loop(service, chunks)
+    batched_seconds = bench_batched(service, chunks, batch_size)
+
+    print(f"Chunks: {len(chunks)}  batch size: {batch_size}")
+    print(f"Per-chunk loop: {len(chunks) / loop_seconds:10.1f} chunks/s ({loop_seconds:.2f}s)")
+    print(f"Batched:        {len(chunks) / batched_seconds:10.1f} chunks/s ({batched_seconds:.2f}s)")
+    print(f"Speedup:        {loop_seconds / batched_seconds:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: per-request embedding vs the micro-batching scheduler
+Simulates many concurrent callers each embedding one short text, first with
+one encode call per request (in threads) and then through
+EmbeddingScheduler. Reports embeddings per second and p50/p99 latency.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_embedding_scheduler.py --concurrency 64 --requests 2000
+"""
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from services.embedding_service import EmbeddingService
+from services.embedding_scheduler import EmbeddingScheduler
+
+
+def make_texts(count: int, offset: int):
+    # Unique texts so the embedding cache never short-circuits encode
+    return [f"customer question number {offset + i} about invoice totals" for i in range(count)]
+
+
+async def drive(embed, texts, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(text):
+        async with semaphore:
+            start = time.perf_counter()
+            await embed(text)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(text) for text in texts))
+    return time.perf_counter() - start, np.array(latencies)
+
+
+def report(label: str, elapsed: float, latencies: np.ndarray):
+    print(
+        f"{label:<14}{len(latencies) / elapsed:10.1f} emb/s   "
+        f"p50 {np.percentile(latencies, 50) * 1000:7.1f} ms   "
+        f"p99 {np.percentile(latencies, 99) * 1000:7.1f} ms"
+    )
+
+
+async def main_async(concurrency: int, requests: int, max_batch: int, max_wait_ms: float):
+    service = EmbeddingService()
+    service.cache = None
+    service.create_embedding("warmup")
+
+    async def per_request(text):
+        return await asyncio.to_thread(service.create_embedding, text)
+
+    elapsed, latencies = await drive(per_request, make_texts(requests, 0), concurrency)
+    report("Per-request", elapsed, latencies)
+
+    scheduler = EmbeddingScheduler(max_batch=max_batch, max_wait_ms=max_wait_ms)
+    scheduler.embedding_service.cache = None
+    await scheduler.start()
+    elapsed, latencies = await drive(scheduler.embed, make_texts(requests, requests), concurrency)
+    await scheduler.stop()
+    report("Scheduler", elapsed, latencies)
+    print(f"Average batch size: {scheduler.metrics()['avg_batch_size']:.1f}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the embedding scheduler")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent callers")
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests per mode")
+    parser.add_argument("--max-batch", type=int, default=32, help="Scheduler max batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Scheduler max wait")
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args.concurrency, args.requests, args.max_batch, args.max_wait_ms))
+
+
+if __name__ == "__main__":
+    main()
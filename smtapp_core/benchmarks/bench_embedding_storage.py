@@ -0,0 +1,73 @@
+"""
+Benchmark: JSON vs binary embedding storage
+Writes the same random vectors to a scratch SQLite database as JSON text,
+float32 BLOBs and float16 BLOBs, then reports database size, write time
+and the time to load every row into an index matrix.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_embedding_storage.py --rows 20000
+"""
+import sys
+import os
+import json
+import time
+import sqlite3
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from utils.embeddings import encode_embedding, decode_embeddings
+from utils.helpers import format_file_size
+
+
+def run(fmt: str, vectors: np.ndarray, directory: str):
+    path = os.path.join(directory, f"{fmt}.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE document_chunks (id INTEGER PRIMARY KEY, embedding BLOB)")
+
+    start = time.perf_counter()
+    if fmt == "json":
+        rows = ((i, json.dumps(v.tolist())) for i, v in enumerate(vectors))
+    else:
+        rows = ((i, encode_embedding(v, fmt)) for i, v in enumerate(vectors))
+    connection.executemany("INSERT INTO document_chunks VALUES (?, ?)", rows)
+    connection.commit()
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    values = [row[0] for row in connection.execute("SELECT embedding FROM document_chunks")]
+    matrix = decode_embeddings(values, vectors.shape[1])
+    load_seconds = time.perf_counter() - start
+    connection.close()
+
+    assert matrix.shape == vectors.shape
+    return os.path.getsize(path), write_seconds, load_seconds
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark embedding storage formats")
+    parser.add_argument("--rows", type=int, default=20000, help="Number of vectors")
+    parser.add_argument("--dimensions", type=int, default=384, help="Vector dimensions")
+    args = parser.parse_args()
+
+    vectors = np.random.default_rng(0).standard_normal((args.rows, args.dimensions)).astype(np.float32)
+
+    print(f"{args.rows} vectors x {args.dimensions} dimensions")
+    print(f"{'format':<10}{'db size':>14}{'write':>12}{'load':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in ("json", "float32", "float16"):
+            size, write_seconds, load_seconds = run(fmt, vectors, directory)
+            print(
+                f"{fmt:<10}{format_file_size(size):>14}"
+                f"{write_seconds * 1000:>10.0f}ms{load_seconds * 1000:>10.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
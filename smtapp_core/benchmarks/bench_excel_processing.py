@@ -0,0 +1,131 @@
+"""
+Benchmark: in-memory pandas rendering vs streaming ExcelProcessor
+Generates large CSV and XLSX files, then extracts each one in a fresh
+subprocess with the previous implementation (read everything, df.to_string)
+and with the streaming iter_segments path, reporting wall time and peak RSS.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_excel_processing.py --csv-rows 1000000 --xlsx-rows 200000
+"""
+import sys
+import os
+import time
+import subprocess
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+
+
+def make_frame(rows: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "order_id": np.arange(rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+        "product": rng.choice([f"SKU-{i:04d}" for i in range(500)], rows),
+        "quantity": rng.integers(1, 50, rows),
+        "unit_price": rng.uniform(1, 500, rows).round(2),
+        "revenue": rng.uniform(10, 20000, rows).round(2),
+    })
+
+
+def write_xlsx(path: str, df: pd.DataFrame):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Orders")
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        sheet.append(list(row))
+    workbook.save(path)
+
+
+def legacy_process(file_path: str) -> str:
+    """The previous ExcelProcessor.process: whole sheets + df.to_string()"""
+    if file_path.endswith(".csv"):
+        sheets = {"Sheet1": pd.read_csv(file_path)}
+    else:
+        sheets = pd.read_excel(file_path, sheet_name=None)
+    text = ""
+    for sheet_name, df in sheets.items():
+        text += f"\n\n=== {sheet_name} ===\n\n"
+        text += df.to_string(index=False)
+        text += f"\n\nSummary: {len(df)} rows, {len(df.columns)} columns\n"
+        text += f"Columns: {', '.join(df.columns)}\n"
+    return text.strip()
+
+
+def run_worker(mode: str, path: str):
+    """Generate or extract one file and print the text size (runs in a subprocess)"""
+    from processors.excel_processor import ExcelProcessor
+
+    if mode.startswith("generate-"):
+        rows = int(mode.split("-", 1)[1])
+        if path.endswith(".csv"):
+            make_frame(rows).to_csv(path, index=False)
+        else:
+            write_xlsx(path, make_frame(rows))
+        print(0)
+        return
+
+    if mode == "legacy":
+        chars = len(legacy_process(path))
+    else:
+        # Consume segments as the ingestion pipeline does, without joining
+        chars = sum(len(segment) for segment in ExcelProcessor().iter_segments(path, {}))
+    print(chars)
+
+
+def measure(mode: str, path: str):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--worker", mode, path],
+        stdout=subprocess.PIPE
+    )
+    output = proc.stdout.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError(f"{mode} worker failed on {path}")
+    # ru_maxrss is in KiB on Linux
+    return elapsed, usage.ru_maxrss / 1024, int(output)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark spreadsheet extraction")
+    parser.add_argument("--csv-rows", type=int, default=1000000, help="Rows in the generated CSV")
+    parser.add_argument("--xlsx-rows", type=int, default=200000, help="Rows in the generated XLSX (0 to skip)")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Inputs are generated in subprocesses too: a child's peak RSS
+        # counts the pages it inherits from the parent before exec
+        files = []
+        csv_path = os.path.join(tmp, "orders.csv")
+        measure(f"generate-{args.csv_rows}", csv_path)
+        files.append((f"CSV {args.csv_rows} rows", csv_path))
+        if args.xlsx_rows:
+            xlsx_path = os.path.join(tmp, "orders.xlsx")
+            measure(f"generate-{args.xlsx_rows}", xlsx_path)
+            files.append((f"XLSX {args.xlsx_rows} rows", xlsx_path))
+
+        for label, path in files:
+            print(f"{label} ({os.path.getsize(path) / 1e6:.1f} MB)")
+            for mode in ("legacy", "streaming"):
+                elapsed, rss_mb, chars = measure(mode, path)
+                print(f"  {mode:<10}{elapsed:8.2f} s   peak RSS {rss_mb:8.1f} MB   text {chars / 1e6:8.1f} M chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: BM25 lexical search latency at corpus scale
+Indexes synthetic chunks of Zipf-distributed words (plus one invoice-style
+identifier each) directly into a LexicalIndex, then reports query latency
+for queries mixing common words with an identifier. Finally deletes and
+re-adds a share of the documents, as reprocessing does, and reports the
+compaction time and latency afterwards.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_lexical_search.py --chunks 1000000 --queries 200
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from services.lexical_index import LexicalIndex
+
+
+CHUNKS_PER_DOCUMENT = 50
+
+
+def make_text(rng: np.random.Generator, vocabulary: int, words: int, chunk_id: int) -> str:
+    ranks = np.minimum(rng.zipf(1.2, words), vocabulary)
+    return " ".join(f"w{rank}" for rank in ranks) + f" INV-{chunk_id:08d}"
+
+
+def measure(index: LexicalIndex, rng: np.random.Generator, chunk_count: int, queries: int):
+    latencies = []
+    for _ in range(queries):
+        # Two of the most common words, one mid-frequency word and an identifier
+        query = f"w1 w2 w{rng.integers(50, 500)} INV-{rng.integers(chunk_count):08d}"
+        start = time.perf_counter()
+        index.search(query, limit=10)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark BM25 lexical search")
+    parser.add_argument("--chunks", type=int, default=1000000, help="Chunks in the index")
+    parser.add_argument("--words", type=int, default=80, help="Words per chunk")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="Distinct words")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per measurement")
+    parser.add_argument("--churn", type=float, default=0.3, help="Share of documents reprocessed")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    index = LexicalIndex()
+    # No database: chunks are indexed directly
+    index._loaded = True
+
+    start = time.perf_counter()
+    for first in range(0, args.chunks, CHUNKS_PER_DOCUMENT):
+        ids = list(range(first, min(first + CHUNKS_PER_DOCUMENT, args.chunks)))
+        texts = [make_text(rng, args.vocabulary, args.words, chunk_id) for chunk_id in ids]
+        index.add(ids, [first // CHUNKS_PER_DOCUMENT] * len(ids), texts)
+    print(f"Indexed {len(index)} chunks, {len(index._postings)} terms in {time.perf_counter() - start:.1f}s")
+
+    p50, p95 = measure(index, rng, args.chunks, args.queries)
+    print(f"search: p50 {p50:.1f} ms   p95 {p95:.1f} ms")
+
+    documents = args.chunks // CHUNKS_PER_DOCUMENT
+    churned = rng.choice(documents, int(documents * args.churn), replace=False)
+    next_id = args.chunks
+    start = time.perf_counter()
+    for document_id in churned.tolist():
+        index.remove_document(document_id)
+        ids = list(range(next_id, next_id + CHUNKS_PER_DOCUMENT))
+        texts = [make_text(rng, args.vocabulary, args.words, chunk_id - args.chunks) for chunk_id in ids]
+        index.add(ids, [document_id] * len(ids), texts)
+        next_id += CHUNKS_PER_DOCUMENT
+    print(
+        f"Reprocessed {len(churned)} documents in {time.perf_counter() - start:.1f}s: "
+        f"{len(index)} live of {index._chunk_ids.size} rows"
+    )
+
+    p50, p95 = measure(index, rng, args.chunks, args.queries)
+    print(f"search after churn: p50 {p50:.1f} ms   p95 {p95:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: embedding model startup and per-request latency
+Compares loading a fresh SentenceTransformer for every request (the old
+behaviour of a new EmbeddingService per request) with the shared,
+pre-warmed model from the registry.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_model_startup.py --requests 5
+"""
+import sys
+import time
+import statistics
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sentence_transformers import SentenceTransformer
+
+from config.settings import get_settings
+from services.embedding_service import EmbeddingService, get_model_registry
+
+
+QUERY = "What is the total amount due on the latest invoice?"
+
+
+def per_request_model(model_name: str, requests: int):
+    """Old path: every request loads its own model before encoding"""
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        model = SentenceTransformer(model_name)
+        model.encode(QUERY, convert_to_numpy=True)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def shared_model(requests: int):
+    """New path: requests use fresh services backed by the shared model"""
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        EmbeddingService().create_embedding(QUERY)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label: str, latencies):
+    print(
+        f"{label:<22} first {latencies[0] * 1000:9.1f} ms   "
+        f"median {statistics.median(latencies) * 1000:9.1f} ms"
+    )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark embedding model startup")
+    parser.add_argument("--requests", type=int, default=5, help="Simulated requests per mode")
+    args = parser.parse_args()
+
+    model_name = get_settings().default_embeddings_model
+
+    report("Per-request model", per_request_model(model_name, args.requests))
+
+    startup = get_model_registry().warmup(model_name)
+    print(f"{'Startup warmup':<22} {startup * 1000:9.1f} ms (paid once in lifespan)")
+    report("Shared warmed model", shared_model(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark: a new HTTP client per Ollama call vs the shared pooled OllamaClient
+Starts a fake Ollama server in a subprocess (/api/tags, /api/chat with and
+without streaming) and issues the same calls the app makes, first opening a
+fresh httpx.AsyncClient per call (as ModelService and ollama.Client did) and
+then through the shared keep-alive pool. Reports p50/p95 latency per call
+and the TCP connections the server accepted.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_ollama_client.py --requests 500 --concurrency 8
+"""
+import sys
+import json
+import time
+import socket
+import asyncio
+import subprocess
+import threading
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import numpy as np
+
+from services.ollama_client import OllamaClient
+
+
+TAGS = {"models": [{"name": f"model-{i}:latest", "size": 3825819519} for i in range(8)]}
+REPLY = "The total revenue for the north region is 1,234,567.".split(" ")
+MESSAGES = [{"role": "user", "content": "What is the total revenue per region?"}]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Minimal Ollama API: tags, chat (streamed or not) and a connection counter"""
+
+    protocol_version = "HTTP/1.1"
+    # Like Ollama's Go server; otherwise Nagle delays every keep-alive reply
+    disable_nagle_algorithm = True
+    connections = 0
+    chats = 0
+    # Seconds between streamed tokens (and the whole reply for non-streamed chats)
+    token_delay = 0.0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with FakeOllamaHandler.lock:
+            FakeOllamaHandler.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, payload: bytes, content_type: str = "application/json"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_body(json.dumps(TAGS).encode())
+        elif self.path == "/_connections":
+            self.send_body(json.dumps({
+                "connections": FakeOllamaHandler.connections, "chats": FakeOllamaHandler.chats
+            }).encode())
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+        with FakeOllamaHandler.lock:
+            FakeOllamaHandler.chats += 1
+        if not body.get("stream", True):
+            time.sleep(self.token_delay * len(REPLY))
+            message = {"role": "assistant", "content": " ".join(REPLY)}
+            self.send_body(json.dumps({"model": body["model"], "message": message, "done": True}).encode())
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in REPLY:
+            time.sleep(self.token_delay)
+            line = json.dumps({"message": {"role": "assistant", "content": token + " "}, "done": False}) + "\n"
+            self.wfile.write(f"{len(line):x}\r\n{line}\r\n".encode())
+        line = json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+        self.wfile.write(f"{len(line):x}\r\n{line}\r\n0\r\n\r\n".encode())
+
+
+def run_server(port: int, token_delay_ms: float = 0.0):
+    """Serve the fake Ollama API (runs in a subprocess)"""
+    FakeOllamaHandler.token_delay = token_delay_ms / 1000
+    ThreadingHTTPServer(("127.0.0.1", port), FakeOllamaHandler).serve_forever()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def connections(base_url: str) -> int:
+    return httpx.get(f"{base_url}/_connections").json()["connections"]
+
+
+def start_server(token_delay_ms: float = 0.0):
+    """Start the fake Ollama server in a subprocess and wait until it answers"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([
+        sys.executable, __file__, "--server", str(port), "--token-delay-ms", str(token_delay_ms)
+    ])
+    for _ in range(100):
+        try:
+            connections(base_url)
+            break
+        except httpx.TransportError:
+            time.sleep(0.05)
+    return server, base_url
+
+
+async def per_call(base_url: str, call: str):
+    """The previous pattern: a new client (and connection) for every call"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        if call == "tags":
+            response = await client.get("/api/tags")
+            response.raise_for_status()
+            response.json()
+        elif call == "chat":
+            response = await client.post("/api/chat", json={"model": "llama2", "messages": MESSAGES, "stream": False})
+            response.raise_for_status()
+            response.json()
+        else:
+            async with client.stream(
+                "POST", "/api/chat", json={"model": "llama2", "messages": MESSAGES, "stream": True}
+            ) as response:
+                async for _ in response.aiter_lines():
+                    pass
+
+
+async def pooled(client: OllamaClient, call: str):
+    if call == "tags":
+        (await client.request("GET", "/api/tags", route="tags")).json()
+    elif call == "chat":
+        await client.chat("llama2", MESSAGES)
+    else:
+        async for _ in client.stream_chat("llama2", MESSAGES):
+            pass
+
+
+async def drive(fn, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await fn()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - start, np.array(latencies)
+
+
+async def main_async(base_url: str, requests: int, concurrency: int):
+    client = OllamaClient(base_url)
+    await client.start()
+    try:
+        for call in ("tags", "chat", "stream"):
+            for label in ("per-call", "pooled"):
+                if label == "per-call":
+                    fn = lambda: per_call(base_url, call)
+                else:
+                    fn = lambda: pooled(client, call)
+                await drive(fn, 10, concurrency)  # warm up
+                opened = connections(base_url)
+                elapsed, latencies = await drive(fn, requests, concurrency)
+                opened = connections(base_url) - opened - 1
+                print(
+                    f"{call:<8}{label:<10}{requests / elapsed:9.1f} req/s   "
+                    f"p50 {np.percentile(latencies, 50) * 1000:6.2f} ms   "
+                    f"p95 {np.percentile(latencies, 95) * 1000:6.2f} ms   "
+                    f"connections {opened}"
+                )
+    finally:
+        await client.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs per-call Ollama HTTP clients")
+    parser.add_argument("--requests", type=int, default=500, help="Calls per client and route")
+    parser.add_argument("--concurrency", type=int, default=8, help="Calls in flight at once")
+    parser.add_argument("--server", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.server:
+        run_server(args.server, args.token_delay_ms)
+        return
+
+    server, base_url = start_server()
+    try:
+        print(f"Fake Ollama on {base_url}, {args.requests} calls per row, concurrency {args.concurrency}\n")
+        asyncio.run(main_async(base_url, args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: serial vs process-pool PDF text extraction
+Generates a synthetic multi-hundred-page PDF, extracts it with PDFProcessor
+using one process and then with the page-range process pool, checks that
+both produce identical text and page offsets, and reports the speedup.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_pdf_extraction.py --pages 500 --workers 4 8 16
+"""
+import sys
+import time
+import random
+import tempfile
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from processors.pdf_processor import PDFProcessor
+
+
+WORDS = (
+    "quarterly revenue invoice shipment contract clause customer region "
+    "balance forecast margin supplier audit schedule payment delivery"
+).split()
+
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int = 60, seed: int = 11):
+    """Write a text-only PDF with Helvetica text on every page"""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for number in range(pages):
+        lines = [f"Page {number + 1} report section"] + [
+            " ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)
+        ]
+        stream = "BT /F1 9 Tf 40 800 Td 11 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def timed(processor: PDFProcessor, path: str):
+    start = time.perf_counter()
+    result = processor.process(path)
+    return result, time.perf_counter() - start
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark parallel PDF extraction")
+    parser.add_argument("--pages", type=int, default=500, help="Pages in the synthetic PDF")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1], help="Pool sizes to try")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        write_synthetic_pdf(path, args.pages)
+        print(f"Synthetic PDF: {args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB   CPUs: {os.cpu_count()}\n")
+
+        baseline, serial_time = timed(PDFProcessor(workers=1), path)
+        print(f"{'serial':<12}{serial_time:8.2f} s")
+
+        for workers in sorted(set(args.workers)):
+            if workers <= 1:
+                continue
+            processor = PDFProcessor(workers=workers, parallel_min_pages=1)
+            # First call pays the worker spawn cost; the pool is reused afterwards
+            _, cold_time = timed(processor, path)
+            result, warm_time = timed(processor, path)
+            same = (
+                result["text"] == baseline["text"]
+                and result["metadata"]["page_offsets"] == baseline["metadata"]["page_offsets"]
+            )
+            print(
+                f"{f'{workers} workers':<12}{warm_time:8.2f} s   x{serial_time / warm_time:5.2f}   "
+                f"(cold {cold_time:.2f} s)   {'identical' if same else 'MISMATCH'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
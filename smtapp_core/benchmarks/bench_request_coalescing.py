@@ -0,0 +1,80 @@
+"""
+Benchmark: identical concurrent generations with and without coalescing
+Starts the fake Ollama server from bench_ollama_client.py with a per-token
+delay (a slow model) and sends fan-outs of identical prompts through
+ModelService, plain and streamed, first with coalescing disabled and then
+enabled. Reports wall time per fan-out and the chat requests Ollama saw.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_request_coalescing.py --fanout 16 --rounds 5 --token-delay-ms 20
+"""
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+
+from bench_ollama_client import start_server
+
+
+MESSAGES = [{"role": "user", "content": "Summarize this contract"}]
+
+
+async def fan_out(model_service, fanout: int, stream: bool):
+    async def one():
+        if not stream:
+            return await model_service.generate_response(MESSAGES, "llama2")
+        return "".join([token async for token in model_service.stream_response(MESSAGES, "llama2")])
+
+    answers = await asyncio.gather(*(one() for _ in range(fanout)))
+    return len(set(answers))
+
+
+async def main_async(base_url: str, fanout: int, rounds: int):
+    from services.model_service import ModelService
+    from services.request_coalescer import RequestCoalescer
+
+    model_service = ModelService()
+    for stream in (False, True):
+        for label, coalescer in (("off", None), ("on", RequestCoalescer())):
+            model_service.coalescer = coalescer
+            chats_before = httpx.get(f"{base_url}/_connections").json()["chats"]
+            start = time.perf_counter()
+            for _ in range(rounds):
+                assert await fan_out(model_service, fanout, stream) == 1
+            elapsed = (time.perf_counter() - start) / rounds
+            chats = httpx.get(f"{base_url}/_connections").json()["chats"] - chats_before
+            print(
+                f"{'stream' if stream else 'plain':<8}coalescing {label:<5}{elapsed * 1000:9.0f} ms per fan-out   "
+                f"upstream chats {chats:>4} / {fanout * rounds} calls"
+                + (f"   {coalescer.metrics()['coalesced_rate']:.0%} coalesced" if coalescer else "")
+            )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark request coalescing")
+    parser.add_argument("--fanout", type=int, default=16, help="Identical calls sent at once")
+    parser.add_argument("--rounds", type=int, default=5, help="Fan-outs per configuration")
+    parser.add_argument("--token-delay-ms", type=float, default=20.0, help="Simulated time per generated token")
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.token_delay_ms)
+    try:
+        from config.settings import get_settings
+
+        get_settings().ollama_base_url = base_url
+        print(f"Fake Ollama at {args.token_delay_ms} ms/token, fan-out {args.fanout}, {args.rounds} rounds\n")
+        asyncio.run(main_async(base_url, args.fanout, args.rounds))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: semantic response cache lookups
+Fills a ResponseCache with answers for random question embeddings and
+reports lookup latency (hits and misses) as the number of cached answers
+over one document set grows, plus the cost of invalidating a document.
+The embedding of the question itself is computed once per turn either way
+(it is reused for retrieval on a miss).
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_response_cache.py --dimensions 384 --lookups 2000
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from services.response_cache import ResponseCache
+
+
+def unit(rng: np.random.Generator, count: int, dimensions: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark response cache lookups")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding dimensions")
+    parser.add_argument("--lookups", type=int, default=2000, help="Lookups per scope size")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    print(f"{'answers':>8}{'hit p50':>12}{'hit p99':>12}{'miss p50':>12}{'miss p99':>12}{'invalidate':>13}")
+    for size in (10, 100, 1000, 5000):
+        cache = ResponseCache(max_entries=size, ttl_seconds=3600, similarity_threshold=0.95)
+        questions = unit(rng, size, args.dimensions)
+        for question in questions:
+            cache.put("llama2", [1, 2], question, "cached answer", generation_ms=4000.0)
+
+        hits = []
+        misses = []
+        for i in range(args.lookups):
+            # A paraphrase lands close to a cached question; a new question does not
+            paraphrase = questions[i % size] + 0.01 * unit(rng, 1, args.dimensions)[0]
+            start = time.perf_counter()
+            assert cache.get("llama2", [2, 1], paraphrase) is not None
+            hits.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            cache.get("llama2", [1, 2], unit(rng, 1, args.dimensions)[0])
+            misses.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        dropped = cache.invalidate_documents([2])
+        invalidate_ms = (time.perf_counter() - start) * 1000
+        assert dropped == size
+
+        hit_p50, hit_p99 = percentiles(hits)
+        miss_p50, miss_p99 = percentiles(misses)
+        print(
+            f"{size:>8}{hit_p50:>9.3f} ms{hit_p99:>9.3f} ms{miss_p50:>9.3f} ms{miss_p99:>9.3f} ms"
+            f"{invalidate_ms:>10.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
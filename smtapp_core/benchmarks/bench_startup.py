@@ -0,0 +1,61 @@
+"""
+Benchmark: cold application import time and memory
+Imports `main` in fresh interpreters and reports the median wall time of
+the import, the peak RSS, and which heavy libraries were loaded by it
+(before any request is served).
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_startup.py --repeat 5
+"""
+import sys
+import statistics
+import subprocess
+from pathlib import Path
+
+
+APP_DIR = str(Path(__file__).parent.parent)
+
+HEAVY_MODULES = [
+    "pandas", "pyarrow", "openpyxl", "pypdf", "docx", "lxml", "PIL",
+    "numpy", "torch", "sentence_transformers", "onnxruntime",
+]
+
+WORKER = """
+import sys, time, resource
+sys.path.insert(0, {app_dir!r})
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, ",".join(loaded))
+"""
+
+
+def measure():
+    """Import main in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER.format(app_dir=APP_DIR, heavy=HEAVY_MODULES)],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout.strip().splitlines()[-1]
+    elapsed, rss_mb, loaded = (output.split(" ", 2) + [""])[:3]
+    return float(elapsed), float(rss_mb), loaded
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark cold import of the application")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters to start")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.repeat)]
+    print(f"import main: {statistics.median(run[0] for run in runs) * 1000:.0f} ms (median of {args.repeat})")
+    print(f"peak RSS:    {statistics.median(run[1] for run in runs):.1f} MB")
+    print(f"loaded:      {runs[-1][2] or '-'}")
+
+
+if __name__ == "__main__":
+    main()
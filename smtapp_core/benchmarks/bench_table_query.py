@@ -0,0 +1,123 @@
+"""
+Benchmark: structured queries on spreadsheet columnar tables
+Generates a large CSV, processes it with ExcelProcessor (which writes the
+Parquet sidecar table), then times filter / group-by / aggregate queries
+through services.table_query against answering the same questions with
+pandas on the CSV, and checks both give the same numbers.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_table_query.py --rows 1000000 --repeat 5
+"""
+import sys
+import os
+import time
+import statistics
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from processors.excel_processor import ExcelProcessor
+from services.table_query import query_table, plan_query
+from utils.columnar import table_path_for
+
+
+def make_frame(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "order_id": np.arange(rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+        "product": rng.choice([f"SKU-{i:04d}" for i in range(500)], rows),
+        "quantity": rng.integers(1, 50, rows),
+        "revenue": rng.uniform(10, 20000, rows).round(2),
+    })
+
+
+QUERIES = [
+    (
+        "total revenue by region",
+        {"group_by": ["region"], "aggregates": [{"column": "revenue", "func": "sum"}]},
+        lambda df: df.groupby("region")["revenue"].sum().sort_index().tolist(),
+        lambda result: [row[1] for row in result["rows"]],
+    ),
+    (
+        "average quantity per product, top 10",
+        {
+            "group_by": ["product"],
+            "aggregates": [{"column": "quantity", "func": "mean"}],
+            "order_by": "mean(quantity)",
+            "descending": True,
+            "limit": 10,
+        },
+        lambda df: df.groupby("product")["quantity"].mean().nlargest(10).tolist(),
+        lambda result: [row[1] for row in result["rows"]],
+    ),
+    (
+        "orders over 19,000 in the north",
+        {
+            "filters": [{"column": "revenue", "op": ">", "value": 19000}, {"column": "region", "op": "==", "value": "north"}],
+            "aggregates": [{"func": "count"}, {"column": "revenue", "func": "max"}],
+        },
+        lambda df: [
+            int(((df["revenue"] > 19000) & (df["region"] == "north")).sum()),
+            df.loc[(df["revenue"] > 19000) & (df["region"] == "north"), "revenue"].max(),
+        ],
+        lambda result: result["rows"][0],
+    ),
+]
+
+
+def timed(fn, repeat: int):
+    """Median wall time of repeat calls, and the last result"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark spreadsheet table queries")
+    parser.add_argument("--rows", type=int, default=1000000, help="Rows in the generated CSV")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query (median reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "orders.csv")
+        make_frame(args.rows).to_csv(csv_path, index=False)
+
+        start = time.perf_counter()
+        metadata = {}
+        for _ in ExcelProcessor(columnar_tables=True).iter_segments(csv_path, metadata):
+            pass
+        process_time = time.perf_counter() - start
+        table = metadata["tables"][0]
+        table_path = table_path_for(csv_path, table["file"])
+        print(
+            f"{args.rows} rows: CSV {os.path.getsize(csv_path) / 1e6:.1f} MB, "
+            f"Parquet {os.path.getsize(table_path) / 1e6:.1f} MB, processed in {process_time:.2f} s\n"
+        )
+
+        plan = plan_query("What is the total revenue by region?", table)
+        print(f"Planned from chat question: {plan}\n")
+
+        print(f"{'query':<40}{'columnar':>12}{'pandas CSV':>14}")
+        for label, query, pandas_answer, query_answer in QUERIES:
+            query_time, result = timed(lambda: query_table(table_path, **query), args.repeat)
+            pandas_time, expected = timed(lambda: pandas_answer(pd.read_csv(csv_path)), 1)
+            same = np.allclose(np.array(query_answer(result), dtype=float), np.array(expected, dtype=float))
+            print(
+                f"{label:<40}{query_time * 1000:9.1f} ms{pandas_time * 1000:11.1f} ms   "
+                f"{'same' if same else 'MISMATCH'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
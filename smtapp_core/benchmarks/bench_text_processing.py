@@ -0,0 +1,119 @@
+"""
+Benchmark: whole-file text decoding vs single-pass streaming TextProcessor
+Generates a large log file, then extracts it in fresh subprocesses with the
+previous implementation (read the whole file per encoding tried, count
+lines with split) and with the memory-mapped iter_segments path, reporting
+wall time and peak RSS.
+
+Usage:
+    cd smtapp_core && python benchmarks/bench_text_processing.py --size-mb 1024
+"""
+import sys
+import os
+import time
+import random
+import subprocess
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+LEVELS = ["INFO", "INFO", "INFO", "DEBUG", "WARN", "ERROR"]
+MESSAGES = [
+    "request completed status=200 path=/api/v1/documents",
+    "cache miss key=embedding:%08x",
+    "retrying upstream call attempt=%d",
+    "user sesión iniciada región=eu-west",
+    "slow query took %d ms on documents",
+]
+
+
+def write_log(path: str, size_mb: int, seed: int = 13):
+    """Write a UTF-8 log file of about size_mb megabytes"""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        while written < target:
+            block = []
+            for _ in range(10000):
+                message = rng.choice(MESSAGES)
+                if "%" in message:
+                    message = message % rng.randint(0, 1 << 31)
+                block.append(f"2024-05-0{rng.randint(1, 9)}T12:{rng.randint(0, 59):02d}:00Z {rng.choice(LEVELS)} {message}\n")
+            chunk = "".join(block)
+            f.write(chunk)
+            written += len(chunk.encode("utf-8"))
+
+
+def legacy_process(file_path: str):
+    """The previous TextProcessor.process"""
+    text = None
+    for encoding in ["utf-8", "latin-1", "cp1252"]:
+        try:
+            with open(file_path, "r", encoding=encoding) as f:
+                text = f.read()
+            break
+        except UnicodeDecodeError:
+            continue
+    return len(text.split("\n")), len(text)
+
+
+def run_worker(mode: str, path: str):
+    """Extract one file and print line and character counts (runs in a subprocess)"""
+    from processors.text_processor import TextProcessor
+
+    if mode == "legacy":
+        lines, characters = legacy_process(path)
+    else:
+        metadata = {}
+        for _ in TextProcessor().iter_segments(path, metadata):
+            pass
+        lines, characters = metadata["lines"], metadata["characters"]
+    print(lines, characters)
+
+
+def measure(mode: str, path: str):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--worker", mode, path],
+        stdout=subprocess.PIPE
+    )
+    output = proc.stdout.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError(f"{mode} worker failed on {path}")
+    # ru_maxrss is in KiB on Linux
+    return elapsed, usage.ru_maxrss / 1024, output.decode().split()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark text file extraction")
+    parser.add_argument("--size-mb", type=int, default=1024, help="Size of the generated log file")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "app.log")
+        write_log(path, args.size_mb)
+        print(f"Log file: {os.path.getsize(path) / 1e6:.1f} MB\n")
+
+        counts = {}
+        for mode in ("legacy", "streaming"):
+            elapsed, rss_mb, counts[mode] = measure(mode, path)
+            print(f"{mode:<12}{elapsed:8.2f} s   peak RSS {rss_mb:8.1f} MB   lines {counts[mode][0]}")
+
+        print(f"\nSame line and character counts: {counts['legacy'] == counts['streaming']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+ANN Index Build Script
+Rebuilds the persisted IVF vector index from the embeddings stored in the
+database. Run offline (or from cron); serving workers pick up the new build
+on their next search. Uses NumPy only.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config.database import SessionLocal
+from config.settings import get_settings
+from services.ann_index import ANNIndex
+
+
+def main(nlist: int = None, batch_size: int = 10000):
+    """Main build function"""
+    settings = get_settings()
+
+    print("\n" + "="*60)
+    print("SMART APP - ANN INDEX BUILD")
+    print("="*60)
+    print(f"Index directory: {settings.ann_index_dir}")
+
+    index = ANNIndex(
+        index_dir=settings.ann_index_dir,
+        dimensions=settings.vector_dimensions,
+        nprobe=settings.ann_nprobe,
+        nlist=nlist if nlist is not None else settings.ann_nlist,
+        train_sample=settings.ann_train_sample,
+        kmeans_iterations=settings.ann_kmeans_iterations
+    )
+
+    db = SessionLocal()
+    try:
+        manifest = index.build(db, batch_size=batch_size)
+    finally:
+        db.close()
+
+    print(f"Rows: {manifest['size']}  lists: {manifest['nlist']}  build: {manifest['build']}")
+    if settings.vector_index_backend != "ann":
+        print("\nNote: set index_backend = \"ann\" under [database.vector] to serve from this index")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the ANN vector index")
+    parser.add_argument(
+        "--nlist",
+        type=int,
+        default=None,
+        help="Number of inverted lists (default: settings, 0 = about 4 * sqrt(rows))"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=10000,
+        help="Rows read from the database per query"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        main(nlist=args.nlist, batch_size=args.batch_size)
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n\nFatal error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
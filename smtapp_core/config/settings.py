@@ -28,11 +28,24 @@ class Settings(BaseSettings):
     ollama_base_url: str = os.getenv("OLLAMA_BASE_URL", "http://192.168.100.25:11434")
     ollama_timeout: int = 120
     ollama_default_model: str = "llama2"
+    ollama_max_connections: int = 20
+    ollama_max_keepalive_connections: int = 10
+    ollama_coalesce_requests: bool = True
     
     # HuggingFace Configuration
     huggingface_api_key: Optional[str] = os.getenv("HUGGINGFACE_API_KEY")
     huggingface_cache_dir: str = "./models/huggingface"
     default_embeddings_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_batch_size: int = 64
+    embedding_cache_enabled: bool = True
+    embedding_cache_dir: str = "./cache/embeddings"
+    embedding_cache_memory_items: int = 10000
+    embedding_scheduler_max_batch: int = 32
+    embedding_scheduler_max_wait_ms: float = 5.0
+    embedding_backend: str = "torch"  # torch or onnx
+    onnx_model_dir: str = "./models/onnx"
+    onnx_quantize: bool = True
+    onnx_threads: int = 0
     
     # API Configuration
     api_host: str = "0.0.0.0"
@@ -42,6 +55,13 @@ class Settings(BaseSettings):
     max_file_size_mb: int = 100
     upload_dir: str = "./uploads"
     temp_dir: str = "./temp"
+    # Cap on text kept on the document (0 = all; chunks hold the rest). With 0,
+    # ingestion holds a file's whole extracted text in memory until it is stored
+    extracted_text_max_chars: int = 0
+    pdf_workers: int = 0  # page extraction processes; 0 = one per CPU
+    pdf_parallel_min_pages: int = 16
+    excel_columnar_tables: bool = True  # Parquet copy of each sheet for structured queries
+    columnar_compression: str = "zstd"
     supported_formats: List[str] = [
         "pdf", "docx", "doc", "txt", "md",
         "xlsx", "xls", "csv",
@@ -50,8 +70,43 @@ class Settings(BaseSettings):
         "mp3", "wav", "mp4", "avi"
     ]
     
+    # Background Ingestion
+    ingestion_workers: int = 2
+    ingestion_max_attempts: int = 3
+    ingestion_retry_backoff_seconds: float = 5.0
+    ingestion_poll_interval_seconds: float = 1.0
+    ingestion_lease_seconds: float = 60.0
+    ingestion_type_limits: Dict[str, int] = {}
+    ingestion_priorities: Dict[str, int] = {}
+    
     # Vector Configuration
     vector_dimensions: int = 384
+    embedding_storage_dtype: str = "float32"
+    vector_index_backend: str = "memory"
+    ann_index_dir: str = "./data/ann_index"
+    ann_nlist: int = 0
+    ann_nprobe: int = 16
+    ann_train_sample: int = 100000
+    ann_kmeans_iterations: int = 20
+    
+    # Search Configuration
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    lexical_compact_ratio: float = 0.25
+    hybrid_candidates: int = 50
+    hybrid_rrf_k: int = 60
+    
+    # Chat Configuration
+    chat_context_top_k: int = 8
+    chat_context_token_budget: int = 1500
+    chat_table_max_rows: int = 50
+    chat_default_context_length: int = 4096
+    chat_response_reserve_tokens: int = 1024
+    chat_summary_max_tokens: int = 512
+    chat_response_cache_enabled: bool = True
+    chat_response_cache_max_entries: int = 1000
+    chat_response_cache_ttl_seconds: int = 3600
+    chat_response_cache_similarity: float = 0.95
     
     # Security
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -92,12 +147,95 @@ def get_settings() -> Settings:
                 settings.ollama_base_url = ollama_config.get("base_url", settings.ollama_base_url)
                 settings.ollama_timeout = ollama_config.get("timeout", settings.ollama_timeout)
                 settings.ollama_default_model = ollama_config.get("default_model", settings.ollama_default_model)
+                settings.ollama_max_connections = ollama_config.get("max_connections", settings.ollama_max_connections)
+                settings.ollama_max_keepalive_connections = ollama_config.get(
+                    "max_keepalive_connections", settings.ollama_max_keepalive_connections
+                )
+                settings.ollama_coalesce_requests = ollama_config.get("coalesce_requests", settings.ollama_coalesce_requests)
+            
+            if "database" in settings.toml_config:
+                vector_config = settings.toml_config["database"].get("vector", {})
+                settings.vector_dimensions = vector_config.get("dimensions", settings.vector_dimensions)
+                settings.embedding_storage_dtype = vector_config.get("storage_dtype", settings.embedding_storage_dtype)
+                settings.vector_index_backend = vector_config.get("index_backend", settings.vector_index_backend)
+                
+                ann_config = vector_config.get("ann", {})
+                settings.ann_index_dir = ann_config.get("index_dir", settings.ann_index_dir)
+                settings.ann_nlist = ann_config.get("nlist", settings.ann_nlist)
+                settings.ann_nprobe = ann_config.get("nprobe", settings.ann_nprobe)
+                settings.ann_train_sample = ann_config.get("train_sample", settings.ann_train_sample)
+                settings.ann_kmeans_iterations = ann_config.get("kmeans_iterations", settings.ann_kmeans_iterations)
+            
+            if "search" in settings.toml_config:
+                search_config = settings.toml_config["search"]
+                settings.bm25_k1 = search_config.get("bm25_k1", settings.bm25_k1)
+                settings.bm25_b = search_config.get("bm25_b", settings.bm25_b)
+                settings.lexical_compact_ratio = search_config.get("lexical_compact_ratio", settings.lexical_compact_ratio)
+                settings.hybrid_candidates = search_config.get("hybrid_candidates", settings.hybrid_candidates)
+                settings.hybrid_rrf_k = search_config.get("hybrid_rrf_k", settings.hybrid_rrf_k)
+            
+            if "chat" in settings.toml_config:
+                chat_config = settings.toml_config["chat"]
+                settings.chat_context_top_k = chat_config.get("context_top_k", settings.chat_context_top_k)
+                settings.chat_context_token_budget = chat_config.get("context_token_budget", settings.chat_context_token_budget)
+                settings.chat_table_max_rows = chat_config.get("table_max_rows", settings.chat_table_max_rows)
+                settings.chat_default_context_length = chat_config.get(
+                    "default_context_length", settings.chat_default_context_length
+                )
+                settings.chat_response_reserve_tokens = chat_config.get(
+                    "response_reserve_tokens", settings.chat_response_reserve_tokens
+                )
+                settings.chat_summary_max_tokens = chat_config.get("summary_max_tokens", settings.chat_summary_max_tokens)
+                settings.chat_response_cache_enabled = chat_config.get(
+                    "response_cache_enabled", settings.chat_response_cache_enabled
+                )
+                settings.chat_response_cache_max_entries = chat_config.get(
+                    "response_cache_max_entries", settings.chat_response_cache_max_entries
+                )
+                settings.chat_response_cache_ttl_seconds = chat_config.get(
+                    "response_cache_ttl_seconds", settings.chat_response_cache_ttl_seconds
+                )
+                settings.chat_response_cache_similarity = chat_config.get(
+                    "response_cache_similarity", settings.chat_response_cache_similarity
+                )
+            
+            if "huggingface" in settings.toml_config:
+                hf_config = settings.toml_config["huggingface"]
+                settings.embedding_batch_size = hf_config.get("embedding_batch_size", settings.embedding_batch_size)
+                settings.embedding_cache_enabled = hf_config.get("embedding_cache_enabled", settings.embedding_cache_enabled)
+                settings.embedding_cache_dir = hf_config.get("embedding_cache_dir", settings.embedding_cache_dir)
+                settings.embedding_cache_memory_items = hf_config.get("embedding_cache_memory_items", settings.embedding_cache_memory_items)
+                settings.embedding_scheduler_max_batch = hf_config.get("embedding_scheduler_max_batch", settings.embedding_scheduler_max_batch)
+                settings.embedding_scheduler_max_wait_ms = hf_config.get("embedding_scheduler_max_wait_ms", settings.embedding_scheduler_max_wait_ms)
+                settings.embedding_backend = hf_config.get("embedding_backend", settings.embedding_backend)
+                settings.onnx_model_dir = hf_config.get("onnx_model_dir", settings.onnx_model_dir)
+                settings.onnx_quantize = hf_config.get("onnx_quantize", settings.onnx_quantize)
+                settings.onnx_threads = hf_config.get("onnx_threads", settings.onnx_threads)
+            
+            if "ingestion" in settings.toml_config:
+                ingest_config = settings.toml_config["ingestion"]
+                settings.ingestion_workers = ingest_config.get("workers", settings.ingestion_workers)
+                settings.ingestion_max_attempts = ingest_config.get("max_attempts", settings.ingestion_max_attempts)
+                settings.ingestion_retry_backoff_seconds = ingest_config.get("retry_backoff_seconds", settings.ingestion_retry_backoff_seconds)
+                settings.ingestion_poll_interval_seconds = ingest_config.get("poll_interval_seconds", settings.ingestion_poll_interval_seconds)
+                settings.ingestion_lease_seconds = ingest_config.get("lease_seconds", settings.ingestion_lease_seconds)
+                settings.ingestion_type_limits = ingest_config.get("type_limits", settings.ingestion_type_limits)
+                settings.ingestion_priorities = ingest_config.get("priorities", settings.ingestion_priorities)
             
             if "processing" in settings.toml_config:
                 proc_config = settings.toml_config["processing"]
                 settings.max_file_size_mb = proc_config.get("max_file_size_mb", settings.max_file_size_mb)
                 settings.upload_dir = proc_config.get("upload_dir", settings.upload_dir)
                 settings.temp_dir = proc_config.get("temp_dir", settings.temp_dir)
+                settings.extracted_text_max_chars = proc_config.get("extracted_text_max_chars", settings.extracted_text_max_chars)
+                
+                pdf_config = proc_config.get("pdf", {})
+                settings.pdf_workers = pdf_config.get("workers", settings.pdf_workers)
+                settings.pdf_parallel_min_pages = pdf_config.get("parallel_min_pages", settings.pdf_parallel_min_pages)
+                
+                excel_config = proc_config.get("excel", {})
+                settings.excel_columnar_tables = excel_config.get("columnar_tables", settings.excel_columnar_tables)
+                settings.columnar_compression = excel_config.get("compression", settings.columnar_compression)
                 
         except Exception as e:
             print(f"Warning: Could not load TOML config: {e}")
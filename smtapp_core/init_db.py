@@ -17,6 +17,9 @@ from config.database import Base, engine
 from config.settings import get_settings, get_toml_config
 from models import User, Document, Chat, Message
 from models.document import DocumentChunk
+from models.ingestion_job import IngestionJob
+from models.file_blob import FileBlob
+from models.chat_summary import ChatSummary
 
 
 def check_database_exists():
@@ -60,7 +63,10 @@ def verify_tables():
     """Verify that all expected tables exist"""
     print("\nVerifying tables...")
     
-    expected_tables = ['users', 'documents', 'document_chunks', 'chats', 'messages']
+    expected_tables = [
+        'users', 'documents', 'document_chunks', 'chats', 'messages',
+        'ingestion_jobs', 'file_blobs', 'chat_summaries'
+    ]
     
     try:
         inspector = inspect(engine)
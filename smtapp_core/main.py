@@ -5,10 +5,14 @@ Main application entry point
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
 from config.settings import get_settings
 from config.database import engine, Base
 from api import chat, documents, models, health
+from services.embedding_scheduler import get_embedding_scheduler
+from services.job_queue import get_ingestion_queue
+from services.ollama_client import get_ollama_client
 
 
 @asynccontextmanager
@@ -22,10 +26,30 @@ async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully")
     
+    # Load and warm the shared embedding model once per process (the model
+    # stack is imported here, not when main is imported)
+    try:
+        from services.embedding_service import get_model_registry
+        get_model_registry().warmup(settings.default_embeddings_model, settings.embedding_backend)
+    except Exception as e:
+        print(f"Warning: Could not warm up embedding model: {e}")
+    
+    # Start the micro-batching embedding scheduler
+    await get_embedding_scheduler().start()
+    
+    # Open the shared Ollama connection pool
+    await get_ollama_client().start()
+    
+    # Start background ingestion workers
+    get_ingestion_queue().start()
+    
     yield
     
     # Shutdown
     print("Shutting down application...")
+    await asyncio.to_thread(get_ingestion_queue().stop)
+    await get_embedding_scheduler().stop()
+    await get_ollama_client().stop()
 
 
 # Initialize FastAPI app
@@ -0,0 +1,145 @@
+"""
+Embedding Storage Migration Script
+Converts JSON-encoded embeddings in documents and document_chunks to raw
+little-endian float BLOBs (one-time migration)
+"""
+import sys
+import os
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import text
+
+from config.database import engine
+from config.settings import get_settings
+from utils.embeddings import encode_embedding, decode_embedding, is_legacy_embedding
+from utils.helpers import format_file_size
+
+
+TABLES = ["documents", "document_chunks"]
+
+
+def sqlite_path():
+    """Return the SQLite database file path, or None for other databases"""
+    url = engine.url
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        return url.database
+    return None
+
+
+def migrate_table(table: str, dtype: str, dimensions: int, batch_size: int) -> int:
+    """
+    Convert legacy JSON embeddings in one table
+
+    Args:
+        table: Table name
+        dtype: Storage dtype ("float32" or "float16")
+        dimensions: Embedding dimensions
+        batch_size: Rows per transaction
+
+    Returns:
+        Number of rows converted
+    """
+    converted = 0
+    last_id = 0
+
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                text(
+                    f"SELECT id, embedding FROM {table} "
+                    "WHERE id > :last_id AND embedding IS NOT NULL "
+                    "ORDER BY id LIMIT :batch_size"
+                ),
+                {"last_id": last_id, "batch_size": batch_size}
+            ).fetchall()
+
+            if not rows:
+                break
+
+            updates = [
+                {"id": row_id, "embedding": encode_embedding(decode_embedding(value, dimensions), dtype)}
+                for row_id, value in rows
+                if is_legacy_embedding(value)
+            ]
+            if updates:
+                connection.execute(
+                    text(f"UPDATE {table} SET embedding = :embedding WHERE id = :id"),
+                    updates
+                )
+
+            converted += len(updates)
+            last_id = rows[-1][0]
+
+        print(f"   {table}: {converted} rows converted (up to id {last_id})")
+
+    return converted
+
+
+def vacuum():
+    """Reclaim space freed by the smaller rows (SQLite only)"""
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
+
+def main(batch_size: int = 1000, run_vacuum: bool = True):
+    """Main migration function"""
+    settings = get_settings()
+    dtype = settings.embedding_storage_dtype
+
+    print("\n" + "="*60)
+    print("SMART APP - EMBEDDING STORAGE MIGRATION")
+    print("="*60)
+    print(f"Target format: little-endian {dtype}, {settings.vector_dimensions} dimensions")
+
+    db_file = sqlite_path()
+    size_before = os.path.getsize(db_file) if db_file and os.path.exists(db_file) else None
+
+    start = time.perf_counter()
+    total = 0
+    for table in TABLES:
+        print(f"\nMigrating {table}...")
+        total += migrate_table(table, dtype, settings.vector_dimensions, batch_size)
+
+    if run_vacuum and db_file:
+        print("\nVacuuming database...")
+        vacuum()
+
+    print(f"\nConverted {total} embeddings in {time.perf_counter() - start:.2f}s")
+    if size_before is not None:
+        size_after = os.path.getsize(db_file)
+        print(f"Database size: {format_file_size(size_before)} -> {format_file_size(size_after)}")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert JSON embeddings to binary BLOBs")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Rows converted per transaction"
+    )
+    parser.add_argument(
+        "--no-vacuum",
+        action="store_true",
+        help="Skip VACUUM after migrating (SQLite only)"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        main(batch_size=args.batch_size, run_vacuum=not args.no_vacuum)
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n\nFatal error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,26 @@
+"""
+Rolling conversation summary model
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from config.database import Base
+
+
+class ChatSummary(Base):
+    """Summary of the older turns of a chat, extended as the chat grows"""
+
+    __tablename__ = "chat_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(Integer, ForeignKey("chats.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    content = Column(Text, nullable=False, default="")
+    last_message_id = Column(Integer, nullable=False, default=0)  # messages up to this ID are folded in
+    message_count = Column(Integer, nullable=False, default=0)  # messages folded in so far
+    tokens = Column(Integer, nullable=False, default=0)  # estimated tokens of content
+    model_name = Column(String(100), nullable=True)  # model that wrote the latest update
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ChatSummary(chat_id={self.chat_id}, last_message_id={self.last_message_id}, tokens={self.tokens})>"
@@ -0,0 +1,28 @@
+"""
+Content-addressed file blob model
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+
+from config.database import Base
+
+
+class FileBlob(Base):
+    """An uploaded file stored once by content hash and shared by documents"""
+
+    __tablename__ = "file_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    file_type = Column(String(50), nullable=False)  # part of the key: the type decides how the bytes are processed
+    file_path = Column(String(500), nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)  # documents pointing at this blob
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("sha256", "file_type", name="uq_file_blobs_sha256_type"),
+    )
+
+    def __repr__(self):
+        return f"<FileBlob(id={self.id}, sha256='{self.sha256[:12]}', ref_count={self.ref_count})>"
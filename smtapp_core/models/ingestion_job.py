@@ -0,0 +1,36 @@
+"""
+Ingestion job model for the background document processing queue
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from config.database import Base
+
+
+class IngestionJob(Base):
+    """A queued extraction + embedding run for one document"""
+
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    job_type = Column(String(50), nullable=False)  # file type, used for concurrency limits
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, completed, failed
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    error_message = Column(Text, nullable=True)
+    worker = Column(String(100), nullable=True)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # not claimed before this (retry backoff)
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # refreshed by the owning process while running
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_ingestion_jobs_claim", "status", "priority", "available_at"),
+    )
+
+    def __repr__(self):
+        return f"<IngestionJob(id={self.id}, document_id={self.document_id}, status='{self.status}')>"
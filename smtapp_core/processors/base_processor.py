@@ -2,26 +2,61 @@
 Base processor class for file processing
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 
 
 class BaseProcessor(ABC):
-    """Base class for all file processors"""
+    """
+    Base class for all file processors
+    
+    Processors implement either process() (whole text at once) or
+    iter_segments() (text streamed in pieces); each has a default in terms
+    of the other, so every processor supports both calls.
+    """
     
-    @abstractmethod
     def process(self, file_path: str) -> Dict[str, Any]:
         """
         Process a file and extract information
         
         Args:
             file_path: Path to the file to process
-            
+        
         Returns:
             Dictionary containing:
                 - text: Extracted text content
                 - metadata: Additional metadata
         """
-        pass
+        if type(self).iter_segments is BaseProcessor.iter_segments:
+            raise NotImplementedError(f"{type(self).__name__} implements neither process() nor iter_segments()")
+        
+        metadata: Dict[str, Any] = {}
+        text = "".join(self.iter_segments(file_path, metadata)).strip()
+        return {
+            "text": text,
+            "metadata": metadata
+        }
+    
+    def iter_segments(self, file_path: str, metadata: Dict[str, Any]) -> Iterator[str]:
+        """
+        Stream the extracted text in document order
+        
+        Concatenating the segments and stripping the result gives the same
+        text as process(). Segments should be small (a page, a block of
+        rows) so consumers can work in bounded memory.
+        
+        Args:
+            file_path: Path to the file to process
+            metadata: Dictionary filled with the file's metadata; complete
+                once the iterator is exhausted
+        
+        Yields:
+            Text segments
+        """
+        result = self.process(file_path)
+        metadata.update(result.get("metadata", {}))
+        text = result.get("text", "")
+        if text:
+            yield text
     
     @abstractmethod
     def supports(self, file_extension: str) -> bool:
@@ -30,7 +65,7 @@ class BaseProcessor(ABC):
         
         Args:
             file_extension: File extension (without dot)
-            
+        
         Returns:
             True if supported, False otherwise
         """
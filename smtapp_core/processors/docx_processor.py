@@ -1,13 +1,96 @@
 """
 DOCX file processor
 """
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional
+from datetime import datetime
 from docx import Document
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from lxml import etree
+import posixpath
+import zipfile
 import os
 
 from processors.base_processor import BaseProcessor
 
 
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W = "{%s}" % W_NS
+_P, _TBL, _TR, _TC, _R = _W + "p", _W + "tbl", _W + "tr", _W + "tc", _W + "r"
+_T, _TAB, _BR, _CR = _W + "t", _W + "tab", _W + "br", _W + "cr"
+_TC_PR, _V_MERGE, _VAL = _W + "tcPr", _W + "vMerge", _W + "val"
+# Run containers whose runs are part of the paragraph text
+_RUN_CONTAINERS = {_W + "hyperlink", _W + "ins", _W + "smartTag", _W + "fldSimple"}
+
+_OFFICE_DOCUMENT = "/officeDocument"
+_CORE_NS = {
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "dcterms": "http://purl.org/dc/terms/",
+}
+
+# Characters of text collected before a segment is yielded
+SEGMENT_CHARS = 65536
+
+
+class _SegmentBuffer:
+    """Collects text pieces in a list and joins them once per segment"""
+    
+    def __init__(self, max_chars: int = SEGMENT_CHARS):
+        self.max_chars = max_chars
+        self._parts: List[str] = []
+        self._size = 0
+    
+    def add(self, text: str) -> Optional[str]:
+        """Add text; returns a full segment when one is ready"""
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.max_chars:
+            return self.flush()
+        return None
+    
+    def flush(self) -> Optional[str]:
+        """Return the buffered text, if any, and reset"""
+        if not self._parts:
+            return None
+        segment = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        return segment
+
+
+def _paragraph_text(paragraph) -> str:
+    """Text of a w:p element, as python-docx's Paragraph.text"""
+    parts = []
+    for child in paragraph:
+        if child.tag == _R:
+            _run_text(child, parts)
+        elif child.tag in _RUN_CONTAINERS:
+            for run in child.iter(_R):
+                _run_text(run, parts)
+    return "".join(parts)
+
+
+def _run_text(run, parts: List[str]):
+    for child in run:
+        tag = child.tag
+        if tag == _T:
+            if child.text:
+                parts.append(child.text)
+        elif tag == _TAB:
+            parts.append("\t")
+        elif tag == _BR or tag == _CR:
+            parts.append("\n")
+
+
+def _is_merge_continuation(cell) -> bool:
+    """Whether a w:tc continues a vertical merge (its text belongs to the cell above)"""
+    properties = cell.find(_TC_PR)
+    if properties is None:
+        return False
+    merge = properties.find(_V_MERGE)
+    return merge is not None and merge.get(_VAL, "continue") == "continue"
+
+
 class DOCXProcessor(BaseProcessor):
     """Processor for DOCX files"""
     
@@ -15,52 +98,191 @@ class DOCXProcessor(BaseProcessor):
         """Check if DOCX is supported"""
         return file_extension.lower() in ["docx", "doc"]
     
-    def process(self, file_path: str) -> Dict[str, Any]:
+    def iter_segments(self, file_path: str, metadata: Dict[str, Any]) -> Iterator[str]:
         """
-        Process DOCX file and extract text
+        Stream DOCX text: paragraphs and tables in document order
+        
+        The main document part is read straight out of the zip with
+        iterparse and each paragraph or table row is released once its
+        text is taken, so memory does not grow with the document.
+        Paragraphs become one line each and table rows one line of cell
+        texts; horizontally merged cells appear once and vertically merged
+        ones only in their first row. Files the fast path cannot read (not
+        a zip, no main document part) go through python-docx instead, which
+        gives the same lines (but skips paragraphs in content controls).
         
         Args:
             file_path: Path to DOCX file
-            
-        Returns:
-            Dictionary with extracted text and metadata
+            metadata: Filled with paragraph / table counts and core properties
+        
+        Yields:
+            Text segments
         """
         try:
-            doc = Document(file_path)
-            
-            # Extract text from paragraphs
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
-            
-            # Get metadata
-            metadata = {
-                "paragraphs": len(doc.paragraphs),
-                "tables": len(doc.tables),
-                "file_size": os.path.getsize(file_path)
-            }
-            
-            # Add core properties if available
-            if doc.core_properties:
-                metadata.update({
-                    "title": doc.core_properties.title or "",
-                    "author": doc.core_properties.author or "",
-                    "subject": doc.core_properties.subject or "",
-                    "created": str(doc.core_properties.created) if doc.core_properties.created else "",
-                })
-            
-            return {
-                "text": text.strip(),
-                "metadata": metadata
-            }
+            try:
+                archive = zipfile.ZipFile(file_path)
+            except zipfile.BadZipFile:
+                archive = None
+            main_part = self._main_part(archive) if archive is not None else None
             
+            if main_part is None:
+                yield from self._iter_python_docx(file_path, metadata)
+            else:
+                with archive:
+                    yield from self._iter_xml(archive, main_part, metadata)
+                    metadata.update(self._core_properties(archive))
+            metadata["file_size"] = os.path.getsize(file_path)
+        
         except Exception as e:
             raise Exception(f"Error processing DOCX: {str(e)}")
-
+    
+    @staticmethod
+    def _main_part(archive: zipfile.ZipFile) -> Optional[str]:
+        """Zip member holding the document body, from the package relationships"""
+        try:
+            relationships = etree.fromstring(archive.read("_rels/.rels"))
+        except (KeyError, etree.XMLSyntaxError):
+            return None
+        for relationship in relationships:
+            if relationship.get("Type", "").endswith(_OFFICE_DOCUMENT):
+                part = posixpath.normpath(relationship.get("Target", "").lstrip("/"))
+                return part if part in archive.namelist() else None
+        return None
+    
+    def _iter_xml(self, archive: zipfile.ZipFile, main_part: str, metadata: Dict[str, Any]) -> Iterator[str]:
+        """Fast path: stream the main document part with iterparse"""
+        buffer = _SegmentBuffer()
+        paragraphs = 0
+        tables = 0
+        # Open tables; only top-level tables are output (python-docx does
+        # not include nested tables in a cell's text either)
+        table_depth = 0
+        row_cells: List[str] = []
+        
+        with archive.open(main_part) as xml:
+            for event, element in etree.iterparse(xml, events=("start", "end"), tag=(_P, _TBL, _TR, _TC)):
+                tag = element.tag
+                if event == "start":
+                    if tag == _TBL:
+                        table_depth += 1
+                        if table_depth == 1:
+                            tables += 1
+                    elif tag == _TR and table_depth == 1:
+                        row_cells = []
+                    continue
+                
+                if tag == _P:
+                    if table_depth == 0:
+                        paragraphs += 1
+                        segment = buffer.add(_paragraph_text(element) + "\n")
+                        self._release(element)
+                        if segment:
+                            yield segment
+                elif tag == _TC:
+                    if table_depth == 1 and not _is_merge_continuation(element):
+                        # A cell spanning several grid columns is one w:tc,
+                        # so horizontal merges are visited once already
+                        row_cells.append("\n".join(
+                            _paragraph_text(paragraph) for paragraph in element if paragraph.tag == _P
+                        ))
+                elif tag == _TR:
+                    if table_depth == 1:
+                        segment = buffer.add(" ".join(row_cells) + "\n")
+                        self._release(element)
+                        if segment:
+                            yield segment
+                elif tag == _TBL:
+                    table_depth -= 1
+                    if table_depth == 0:
+                        self._release(element)
+        
+        segment = buffer.flush()
+        if segment:
+            yield segment
+        metadata.update({
+            "paragraphs": paragraphs,
+            "tables": tables
+        })
+    
+    @staticmethod
+    def _release(element):
+        """Free a processed element and the siblings before it"""
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+    
+    @staticmethod
+    def _core_properties(archive: zipfile.ZipFile) -> Dict[str, str]:
+        """Title, author, subject and created date from docProps/core.xml"""
+        try:
+            core = etree.fromstring(archive.read("docProps/core.xml"))
+        except (KeyError, etree.XMLSyntaxError):
+            return {}
+        
+        def value(path: str) -> str:
+            node = core.find(path, _CORE_NS)
+            return (node.text or "").strip() if node is not None else ""
+        
+        created = value("dcterms:created")
+        try:
+            # Same format as python-docx's datetime
+            created = str(datetime.fromisoformat(created.replace("Z", "+00:00"))) if created else ""
+        except ValueError:
+            pass
+        return {
+            "title": value("dc:title"),
+            "author": value("dc:creator"),
+            "subject": value("dc:subject"),
+            "created": created,
+        }
+    
+    def _iter_python_docx(self, file_path: str, metadata: Dict[str, Any]) -> Iterator[str]:
+        """Fallback: extract through python-docx's object model"""
+        doc = Document(file_path)
+        buffer = _SegmentBuffer()
+        paragraphs = 0
+        tables = 0
+        
+        # Body children in document order; Document.iter_inner_content()
+        # selects them with an XPath union that is quadratic in body size
+        for element in doc.element.body.iterchildren(_P, _TBL):
+            if element.tag == _TBL:
+                tables += 1
+                seen = set()
+                for row in Table(element, doc._body).rows:
+                    cells = []
+                    for cell in row.cells:
+                        # Merged cells are returned once per grid column / row
+                        if cell._tc in seen:
+                            continue
+                        seen.add(cell._tc)
+                        cells.append(cell.text)
+                    segment = buffer.add(" ".join(cells) + "\n")
+                    if segment:
+                        yield segment
+            else:
+                paragraphs += 1
+                segment = buffer.add(Paragraph(element, doc._body).text + "\n")
+                if segment:
+                    yield segment
+        
+        segment = buffer.flush()
+        if segment:
+            yield segment
+        
+        # Get metadata
+        metadata.update({
+            "paragraphs": paragraphs,
+            "tables": tables
+        })
+        
+        # Add core properties if available
+        if doc.core_properties:
+            metadata.update({
+                "title": doc.core_properties.title or "",
+                "author": doc.core_properties.author or "",
+                "subject": doc.core_properties.subject or "",
+                "created": str(doc.core_properties.created) if doc.core_properties.created else "",
+            })
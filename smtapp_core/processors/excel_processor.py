@@ -1,66 +1,233 @@
 """
 Excel file processor
 """
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional
 import pandas as pd
+import math
 import os
 
+from config.settings import get_settings
 from processors.base_processor import BaseProcessor
+from utils.columnar import ColumnarTableWriter, table_path_for, remove_tables
+
+
+# Rows read, rendered and accounted per step
+ROWS_PER_SEGMENT = 5000
+
+
+class ColumnStats:
+    """
+    Running per-column summary statistics, updated one batch at a time
+    
+    Tracks non-null counts for every column and min / max / mean for
+    columns whose values are all numeric.
+    """
+    
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        self.rows = 0
+        self.count = {column: 0 for column in self.columns}
+        self.numeric = {column: True for column in self.columns}
+        self.minimum: Dict[str, Optional[float]] = {column: None for column in self.columns}
+        self.maximum: Dict[str, Optional[float]] = {column: None for column in self.columns}
+        self.total = {column: 0.0 for column in self.columns}
+    
+    def update(self, df: pd.DataFrame):
+        """Account one batch of rows"""
+        self.rows += len(df)
+        for position, column in enumerate(self.columns):
+            values = df.iloc[:, position]
+            non_null = int(values.count())
+            self.count[column] += non_null
+            if not self.numeric[column] or non_null == 0:
+                continue
+            if values.dtype == object:
+                values = pd.to_numeric(values, errors="coerce")
+                if int(values.count()) != non_null:
+                    self.numeric[column] = False
+                    continue
+            if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+                self.numeric[column] = False
+                continue
+            low, high = float(values.min()), float(values.max())
+            self.minimum[column] = low if self.minimum[column] is None else min(self.minimum[column], low)
+            self.maximum[column] = high if self.maximum[column] is None else max(self.maximum[column], high)
+            self.total[column] += float(values.sum())
+    
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-column statistics as JSON-serializable dicts"""
+        summary = {}
+        for column in self.columns:
+            stats: Dict[str, Any] = {"count": self.count[column]}
+            if self.numeric[column] and self.minimum[column] is not None:
+                stats.update({
+                    "min": _finite(self.minimum[column]),
+                    "max": _finite(self.maximum[column]),
+                    "mean": _finite(self.total[column] / self.count[column]),
+                })
+            summary[column] = stats
+        return summary
+    
+    def render(self) -> str:
+        """Summary block appended to the sheet text"""
+        lines = [
+            f"\n\nSummary: {self.rows} rows, {len(self.columns)} columns",
+            f"Columns: {', '.join(self.columns)}",
+        ]
+        for column, stats in self.summary().items():
+            if "mean" in stats:
+                lines.append(
+                    f"{column}: count {stats['count']}, min {stats['min']:g}, "
+                    f"max {stats['max']:g}, mean {stats['mean']:g}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _finite(value: float) -> Optional[float]:
+    """Map NaN / infinity (not valid JSON) to None"""
+    return value if math.isfinite(value) else None
 
 
 class ExcelProcessor(BaseProcessor):
     """Processor for Excel files"""
     
+    def __init__(self, columnar_tables: Optional[bool] = None):
+        """
+        Args:
+            columnar_tables: Also save each sheet as a Parquet table (default: settings)
+        """
+        self.columnar_tables = columnar_tables
+    
     def supports(self, file_extension: str) -> bool:
         """Check if Excel is supported"""
         return file_extension.lower() in ["xlsx", "xls", "csv"]
     
-    def process(self, file_path: str) -> Dict[str, Any]:
+    def iter_segments(self, file_path: str, metadata: Dict[str, Any]) -> Iterator[str]:
         """
-        Process Excel file and extract data
+        Stream spreadsheet rows as compact text, one block of rows at a time
+        
+        CSV is read with pandas in chunks and XLSX row by row with openpyxl
+        in read-only mode, so memory stays bounded by one block. Rows are
+        rendered as "|"-separated values under a header line, and row /
+        column counts and per-column statistics are computed in the same
+        pass.
+        
+        Unless disabled, every sheet is also written in the same pass to a
+        compressed Parquet table next to the file (see utils.columnar), for
+        structured queries; metadata["tables"] lists them.
         
         Args:
             file_path: Path to Excel file
-            
-        Returns:
-            Dictionary with extracted text and metadata
+            metadata: Filled with sheet counts, per-column statistics and tables
+        
+        Yields:
+            Text segments
         """
         try:
             file_ext = file_path.split(".")[-1].lower()
             
             if file_ext == "csv":
                 # Read CSV
-                df = pd.read_csv(file_path)
-                sheets = {"Sheet1": df}
+                sheets = [("Sheet1", pd.read_csv(file_path, chunksize=ROWS_PER_SEGMENT))]
+            elif file_ext == "xlsx":
+                # Read Excel rows lazily
+                sheets = self._iter_xlsx_sheets(file_path)
             else:
-                # Read Excel
-                sheets = pd.read_excel(file_path, sheet_name=None)
+                # Legacy .xls is not supported by openpyxl; read it whole
+                sheets = [
+                    (sheet_name, [df])
+                    for sheet_name, df in pd.read_excel(file_path, sheet_name=None).items()
+                ]
             
-            # Convert data to text
-            text = ""
-            for sheet_name, df in sheets.items():
-                text += f"\n\n=== {sheet_name} ===\n\n"
-                text += df.to_string(index=False)
-                text += f"\n\nSummary: {len(df)} rows, {len(df.columns)} columns\n"
-                text += f"Columns: {', '.join(df.columns)}\n"
+            settings = get_settings()
+            columnar = self.columnar_tables if self.columnar_tables is not None else settings.excel_columnar_tables
+            if columnar:
+                # Drop tables of an earlier run so none are left over
+                remove_tables(file_path)
             
-            # Get metadata
-            total_rows = sum(len(df) for df in sheets.values())
-            total_cols = sum(len(df.columns) for df in sheets.values())
+            sheet_stats = {}
+            tables = []
+            for sheet_name, batches in sheets:
+                stats = None
+                writer = None
+                if columnar:
+                    table_file = f"sheet{len(sheet_stats)}.parquet"
+                    writer = ColumnarTableWriter(table_path_for(file_path, table_file), settings.columnar_compression)
+                try:
+                    for df in batches:
+                        if stats is None:
+                            stats = ColumnStats([str(column) for column in df.columns])
+                            yield f"\n\n=== {sheet_name} ===\n\n" + "|".join(stats.columns) + "\n"
+                        stats.update(df)
+                        if writer is not None:
+                            writer.write(df)
+                        yield df.to_csv(sep="|", header=False, index=False, lineterminator="\n")
+                    if writer is not None:
+                        columns = writer.close()
+                        if columns:
+                            tables.append({"sheet": sheet_name, "file": table_file, "rows": writer.rows, "columns": columns})
+                finally:
+                    if writer is not None:
+                        writer.abort()
+                if stats is None:
+                    stats = ColumnStats([])
+                    yield f"\n\n=== {sheet_name} ===\n\n"
+                yield stats.render()
+                sheet_stats[sheet_name] = stats
             
-            metadata = {
-                "sheets": len(sheets),
-                "total_rows": total_rows,
-                "total_columns": total_cols,
+            # Get metadata
+            metadata.update({
+                "sheets": len(sheet_stats),
+                "total_rows": sum(stats.rows for stats in sheet_stats.values()),
+                "total_columns": sum(len(stats.columns) for stats in sheet_stats.values()),
                 "file_size": os.path.getsize(file_path),
-                "file_type": file_ext
-            }
-            
-            return {
-                "text": text.strip(),
-                "metadata": metadata
-            }
-            
+                "file_type": file_ext,
+                "column_stats": {name: stats.summary() for name, stats in sheet_stats.items()},
+                "tables": tables
+            })
+        
         except Exception as e:
             raise Exception(f"Error processing Excel: {str(e)}")
-
+    
+    def _iter_xlsx_sheets(self, file_path: str):
+        """Yield (sheet name, iterator of DataFrame row blocks) per worksheet"""
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                yield worksheet.title, self._iter_xlsx_blocks(worksheet)
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def _iter_xlsx_blocks(worksheet) -> Iterator[pd.DataFrame]:
+        """Read a read-only worksheet as DataFrames of ROWS_PER_SEGMENT rows"""
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        # Same names pandas.read_excel gives unnamed and repeated header cells
+        columns = []
+        seen = {}
+        for i, value in enumerate(header):
+            name = str(value) if value is not None else f"Unnamed: {i}"
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}.{seen[name]}"
+            seen.setdefault(name, 0)
+            columns.append(name)
+        
+        width = len(columns)
+        padding = (None,) * width
+        block = []
+        emitted = False
+        for row in rows:
+            block.append(row[:width] if len(row) >= width else row + padding[:width - len(row)])
+            if len(block) >= ROWS_PER_SEGMENT:
+                yield pd.DataFrame.from_records(block, columns=columns)
+                block = []
+                emitted = True
+        if block or not emitted:
+            # Header-only sheets still yield one (empty) block for the header line
+            yield pd.DataFrame.from_records(block, columns=columns)
@@ -1,31 +1,41 @@
 """
 Factory for creating file processors
 """
-from typing import Optional
+from typing import Dict, List
+import importlib
+import threading
 
 from processors.base_processor import BaseProcessor
-from processors.pdf_processor import PDFProcessor
-from processors.docx_processor import DOCXProcessor
-from processors.excel_processor import ExcelProcessor
-from processors.text_processor import TextProcessor
-from processors.audio_processor import AudioProcessor
-from processors.video_processor import VideoProcessor
-from processors.image_processor import ImageProcessor
 
 
 class FileProcessorFactory:
     """Factory for creating appropriate file processors"""
     
-    # Register all processors
-    _processors = [
-        PDFProcessor(),
-        DOCXProcessor(),
-        ExcelProcessor(),
-        TextProcessor(),
-        AudioProcessor(),
-        VideoProcessor(),
-        ImageProcessor(),
-    ]
+    # Processor classes ("module:Class") and the extensions they handle.
+    # Modules are imported and processors instantiated on first use, so
+    # parsing libraries (pandas, pypdf, python-docx, PIL, ...) load only
+    # once a file of that type shows up.
+    _processor_classes: Dict[str, List[str]] = {
+        "processors.pdf_processor:PDFProcessor": ["pdf"],
+        "processors.docx_processor:DOCXProcessor": ["docx", "doc"],
+        "processors.excel_processor:ExcelProcessor": ["xlsx", "xls", "csv"],
+        "processors.text_processor:TextProcessor": ["txt", "md", "json", "xml"],
+        "processors.audio_processor:AudioProcessor": ["mp3", "wav", "m4a", "ogg"],
+        "processors.video_processor:VideoProcessor": ["mp4", "avi", "mov", "mkv"],
+        "processors.image_processor:ImageProcessor": ["jpg", "jpeg", "png", "gif", "bmp"],
+    }
+    _registry: Dict[str, str] = {
+        extension: target
+        for target, extensions in _processor_classes.items()
+        for extension in extensions
+    }
+    
+    # One instance per processor class, shared by all its extensions
+    _instances: Dict[str, BaseProcessor] = {}
+    _instances_lock = threading.Lock()
+    
+    # Processors registered at runtime, tried in order after the registry
+    _processors: List[BaseProcessor] = []
     
     @classmethod
     def get_processor(cls, file_extension: str) -> BaseProcessor:
@@ -43,6 +53,10 @@ class FileProcessorFactory:
         """
         file_extension = file_extension.lower()
         
+        target = cls._registry.get(file_extension)
+        if target is not None:
+            return cls._instance(target)
+        
         for processor in cls._processors:
             if processor.supports(file_extension):
                 return processor
@@ -58,4 +72,17 @@ class FileProcessorFactory:
             processor: Processor instance to register
         """
         cls._processors.append(processor)
-
+    
+    @classmethod
+    def _instance(cls, target: str) -> BaseProcessor:
+        """Import and instantiate a registered processor class once"""
+        processor = cls._instances.get(target)
+        if processor is None:
+            # Ingestion workers are threads; build each processor only once
+            with cls._instances_lock:
+                processor = cls._instances.get(target)
+                if processor is None:
+                    module_name, class_name = target.split(":")
+                    processor = getattr(importlib.import_module(module_name), class_name)()
+                    cls._instances[target] = processor
+        return processor
@@ -1,43 +1,110 @@
 """
 PDF file processor
 """
-from typing import Dict, Any
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pypdf import PdfReader
+import multiprocessing
 import os
+import threading
 
+from config.settings import get_settings
 from processors.base_processor import BaseProcessor
 
 
+def _extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """
+    Extract the text of pages [start, end) (runs in a worker process)
+    
+    Each worker opens its own reader; parsed PDF objects are not picklable.
+    """
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Get the shared page-extraction process pool
+    
+    Workers are spawned rather than forked: the API process runs threads
+    (ingestion workers, model inference) that must not be forked mid-lock.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def page_number_for_offset(page_offsets: List[int], offset: int) -> int:
+    """
+    Map a character offset in the extracted text to a 1-based page number
+    
+    Args:
+        page_offsets: metadata["page_offsets"] from PDFProcessor
+        offset: Character offset (e.g. the start of a chunk)
+    
+    Returns:
+        Page number
+    """
+    return max(bisect_right(page_offsets, offset), 1)
+
+
 class PDFProcessor(BaseProcessor):
     """Processor for PDF files"""
     
+    def __init__(self, workers: Optional[int] = None, parallel_min_pages: Optional[int] = None):
+        """
+        Args:
+            workers: Page extraction processes (default: settings, 0 = one per CPU)
+            parallel_min_pages: Smallest PDF extracted in parallel (default: settings)
+        """
+        self.workers = workers
+        self.parallel_min_pages = parallel_min_pages
+    
     def supports(self, file_extension: str) -> bool:
         """Check if PDF is supported"""
         return file_extension.lower() == "pdf"
     
-    def process(self, file_path: str) -> Dict[str, Any]:
+    def iter_segments(self, file_path: str, metadata: Dict[str, Any]) -> Iterator[str]:
         """
-        Process PDF file and extract text
+        Stream the PDF text one page at a time
+        
+        Large PDFs are split into page ranges extracted in parallel on a
+        process pool, with a bounded number of ranges in flight; pages are
+        yielded in order. metadata["page_offsets"] holds the character
+        offset in the (stripped) text where each page starts.
         
         Args:
             file_path: Path to PDF file
-            
-        Returns:
-            Dictionary with extracted text and metadata
+            metadata: Filled with the PDF metadata
+        
+        Yields:
+            Page text followed by a blank line
         """
         try:
             reader = PdfReader(file_path)
-            
-            # Extract text from all pages
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n\n"
+            page_count = len(reader.pages)
             
             # Get metadata
-            metadata = {
-                "pages": len(reader.pages),
+            metadata.update({
+                "pages": page_count,
                 "file_size": os.path.getsize(file_path)
-            }
+            })
             
             # Add PDF metadata if available
             if reader.metadata:
@@ -48,11 +115,59 @@ class PDFProcessor(BaseProcessor):
                     "creator": reader.metadata.get("/Creator", ""),
                 })
             
-            return {
-                "text": text.strip(),
-                "metadata": metadata
-            }
+            # Offsets are tracked on the raw stream and shifted by the
+            # whitespace that stripping removes from either end
+            page_offsets = []
+            position = 0
+            leading = None
+            trailing = 0
+            for page_text in self._iter_page_texts(file_path, reader, page_count):
+                segment = page_text + "\n\n"
+                page_offsets.append(position)
+                if leading is None and segment.strip():
+                    leading = position + len(segment) - len(segment.lstrip())
+                trailing = trailing + len(segment) if not segment.strip() else len(segment) - len(segment.rstrip())
+                position += len(segment)
+                yield segment
             
+            leading = leading if leading is not None else position
+            text_length = max(position - leading - trailing, 0)
+            metadata["page_offsets"] = [min(max(offset - leading, 0), text_length) for offset in page_offsets]
+        
         except Exception as e:
             raise Exception(f"Error processing PDF: {str(e)}")
-
+    
+    def _iter_page_texts(self, file_path: str, reader: PdfReader, page_count: int) -> Iterator[str]:
+        """Yield every page's text in order, in parallel when the PDF is large enough"""
+        settings = get_settings()
+        workers = self.workers if self.workers is not None else settings.pdf_workers
+        workers = workers or os.cpu_count() or 1
+        min_pages = self.parallel_min_pages if self.parallel_min_pages is not None else settings.pdf_parallel_min_pages
+        
+        if workers <= 1 or page_count < min_pages:
+            for page in reader.pages:
+                yield page.extract_text() or ""
+            return
+        
+        pool = _get_pool(workers)
+        ranges = iter(self._page_ranges(page_count, workers))
+        in_flight = deque()
+        try:
+            # Keep two ranges per worker queued so workers never idle, without
+            # extracting far ahead of the consumer
+            for start, end in islice(ranges, workers * 2):
+                in_flight.append(pool.submit(_extract_page_range, file_path, start, end))
+            while in_flight:
+                page_texts = in_flight.popleft().result()
+                for start, end in islice(ranges, 1):
+                    in_flight.append(pool.submit(_extract_page_range, file_path, start, end))
+                yield from page_texts
+        finally:
+            for future in in_flight:
+                future.cancel()
+    
+    @staticmethod
+    def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+        """Split pages into ranges, about four per worker to even out slow pages"""
+        size = max(1, -(-page_count // (workers * 4)))
+        return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
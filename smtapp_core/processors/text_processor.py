@@ -1,12 +1,72 @@
 """
 Text file processor
 """
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
+import codecs
+import io
+import mmap
 import os
 
 from processors.base_processor import BaseProcessor
 
 
+# Bytes inspected to choose the encoding
+SAMPLE_BYTES = 64 * 1024
+# Bytes decoded per yielded segment
+SEGMENT_BYTES = 1024 * 1024
+
+# Longest BOMs first: the UTF-32 LE BOM starts with the UTF-16 LE one
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def _cp1252_fallback(error: UnicodeDecodeError):
+    """Decode bytes that are not valid UTF-8 as cp1252 (latin-1 where undefined)"""
+    raw = error.object[error.start:error.end]
+    try:
+        return raw.decode("cp1252"), error.end
+    except UnicodeDecodeError:
+        return raw.decode("latin-1"), error.end
+
+
+codecs.register_error("smtapp-cp1252", _cp1252_fallback)
+
+
+def sniff_encoding(sample: bytes, complete: bool = False) -> str:
+    """
+    Choose the encoding of a file from its first bytes
+    
+    A BOM decides; otherwise UTF-8 if the sample is valid UTF-8 (a sequence
+    cut off at the end of the sample is fine unless the sample is the whole
+    file), else cp1252, else latin-1.
+    
+    Args:
+        sample: Leading bytes of the file
+        complete: Whether the sample is the whole file
+    
+    Returns:
+        Codec name
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=complete)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
 class TextProcessor(BaseProcessor):
     """Processor for text files"""
     
@@ -14,46 +74,63 @@ class TextProcessor(BaseProcessor):
         """Check if text file is supported"""
         return file_extension.lower() in ["txt", "md", "json", "xml"]
     
-    def process(self, file_path: str) -> Dict[str, Any]:
+    def iter_segments(self, file_path: str, metadata: Dict[str, Any]) -> Iterator[str]:
         """
-        Process text file and extract content
+        Decode a text file in one pass over a memory map, a segment at a time
+        
+        The encoding is chosen from the first SAMPLE_BYTES (see
+        sniff_encoding); the file is then decoded incrementally, so it never
+        exists as a single string. In a file sniffed as UTF-8, stray bytes
+        that are not valid UTF-8 further on are decoded as cp1252 rather
+        than failing the file. Newlines are normalized to "\\n", and lines
+        and characters are counted per segment.
         
         Args:
             file_path: Path to text file
-            
-        Returns:
-            Dictionary with extracted text and metadata
+            metadata: Filled with encoding, line and character counts
+        
+        Yields:
+            Text segments
         """
         try:
-            # Read file with different encodings
-            encodings = ["utf-8", "latin-1", "cp1252"]
-            text = None
+            file_size = os.path.getsize(file_path)
+            lines = 1
+            characters = 0
+            encoding = "utf-8"
             
-            for encoding in encodings:
-                try:
-                    with open(file_path, "r", encoding=encoding) as f:
-                        text = f.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if text is None:
-                raise Exception("Could not decode file with any supported encoding")
+            if file_size:
+                with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    encoding = sniff_encoding(mapped[:SAMPLE_BYTES], complete=file_size <= SAMPLE_BYTES)
+                    errors = "smtapp-cp1252" if encoding == "utf-8" else "replace"
+                    # Translates \r\n and \r, including pairs split across segments
+                    decoder = io.IncrementalNewlineDecoder(
+                        codecs.getincrementaldecoder(encoding)(errors=errors), translate=True
+                    )
+                    
+                    if hasattr(mapped, "madvise"):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    
+                    for start in range(0, file_size, SEGMENT_BYTES):
+                        end = min(start + SEGMENT_BYTES, file_size)
+                        segment = decoder.decode(mapped[start:end], final=end == file_size)
+                        if hasattr(mapped, "madvise"):
+                            # Decoded pages are not needed again; unmapping them
+                            # keeps the resident size flat (the page cache keeps them)
+                            mapped.madvise(mmap.MADV_DONTNEED, start, end - start)
+                        if segment:
+                            lines += segment.count("\n")
+                            characters += len(segment)
+                            yield segment
             
             # Get metadata
             file_ext = file_path.split(".")[-1].lower()
-            metadata = {
+            metadata.update({
                 "file_type": file_ext,
-                "file_size": os.path.getsize(file_path),
-                "lines": len(text.split("\n")),
-                "characters": len(text)
-            }
-            
-            return {
-                "text": text,
-                "metadata": metadata
-            }
-            
+                "file_size": file_size,
+                "encoding": encoding,
+                "lines": lines,
+                "characters": characters
+            })
+        
         except Exception as e:
             raise Exception(f"Error processing text file: {str(e)}")
-
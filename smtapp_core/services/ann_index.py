@@ -0,0 +1,610 @@
+"""
+Persisted approximate-nearest-neighbour (IVF) index over memory-mapped vectors
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models.document import Document, DocumentChunk
+from services.vector_index import KIND_DOCUMENT, KIND_CHUNK, _mask, _normalize, _top_k
+from utils.embeddings import decode_embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Row arrays stored next to the vectors, all sharing the same capacity
+_COLUMNS = {
+    "ids": np.int64,
+    "document_ids": np.int64,
+    "kinds": np.int8,
+    "lists": np.int32,
+    "tombstones": np.uint8,
+}
+
+_MANIFEST = "manifest.json"
+_LOCK = "index.lock"
+
+
+class ANNIndex:
+    """
+    Inverted-file (IVF) cosine index persisted under one directory
+
+    Normalized vectors live in an append-only float32 file that every worker
+    process maps read-only, so the operating system shares one copy of the
+    pages. A k-means coarse quantizer assigns each row to a list; a search
+    scores the query against the centroids, probes the nprobe closest lists
+    and ranks their rows exactly. Deletes set a tombstone byte that other
+    processes see through the shared mapping; rebuilding compacts them away.
+
+    Until centroids are trained (see build_ann_index.py) the index falls
+    back to an exact scan of the mapped vectors.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        dimensions: int,
+        nprobe: int = 16,
+        nlist: int = 0,
+        train_sample: int = 100000,
+        kmeans_iterations: int = 20
+    ):
+        self.index_dir = index_dir
+        self.dimensions = dimensions
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.train_sample = train_sample
+        self.kmeans_iterations = kmeans_iterations
+
+        self._lock = threading.RLock()
+        self._manifest: Optional[Dict] = None
+        self._manifest_mtime = None
+        self._vectors: Optional[np.memmap] = None
+        self._columns: Dict[str, np.memmap] = {}
+        self._centroids: Optional[np.ndarray] = None
+        # CSR layout of the inverted lists for rows [0, _indexed)
+        self._list_rows = np.empty(0, dtype=np.int64)
+        self._list_offsets = np.zeros(1, dtype=np.int64)
+        self._indexed = 0
+        # Rows appended since the CSR layout was built, per list
+        self._pending: Dict[int, List[int]] = {}
+
+        os.makedirs(index_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # VectorIndex-compatible interface
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        manifest = self._refresh()
+        return manifest["size"] if manifest else 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._refresh() is not None
+
+    def load(self, db: Session):
+        """
+        Open the on-disk index, building it from the database if none exists
+
+        Args:
+            db: Database session
+        """
+        with self._lock:
+            if self._refresh() is not None:
+                return
+            with self._file_lock():
+                if self._read_manifest() is None:
+                    self._build(db)
+            self._refresh()
+
+    def add(
+        self,
+        kind: int,
+        ids: Sequence[int],
+        document_ids: Sequence[int],
+        embeddings: np.ndarray
+    ):
+        """
+        Append rows to the index
+
+        Args:
+            kind: KIND_DOCUMENT or KIND_CHUNK
+            ids: Row ids (document id or chunk id)
+            document_ids: Owning document id for each row
+            embeddings: Array of shape (n, dimensions)
+        """
+        if len(ids) == 0:
+            return
+
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimensions))
+        with self._lock, self._file_lock():
+            manifest = self._read_manifest()
+            if manifest is None:
+                # The first load() builds the index from the database
+                return
+
+            centroids = self._load_centroids(manifest)
+            lists = _assign(vectors, centroids) if centroids is not None else np.full(len(ids), -1, dtype=np.int32)
+
+            start = manifest["size"]
+            end = start + len(ids)
+            if end > manifest["capacity"]:
+                manifest["capacity"] = max(end, manifest["capacity"] * 2)
+                self._resize_files(manifest)
+
+            vector_file, column_files = self._open(manifest, mode="r+")
+            vector_file[start:end] = vectors
+            column_files["ids"][start:end] = ids
+            column_files["document_ids"][start:end] = document_ids
+            column_files["kinds"][start:end] = kind
+            column_files["lists"][start:end] = lists
+            column_files["tombstones"][start:end] = 0
+            vector_file.flush()
+            for column in column_files.values():
+                column.flush()
+
+            manifest["size"] = end
+            self._write_manifest(manifest)
+
+    def remove_document(self, document_id: int) -> int:
+        """
+        Tombstone every row belonging to a document
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            Number of rows tombstoned
+        """
+        with self._lock, self._file_lock():
+            manifest = self._read_manifest()
+            if manifest is None:
+                return 0
+
+            _, column_files = self._open(manifest, mode="r+")
+            size = manifest["size"]
+            rows = np.flatnonzero(
+                (column_files["document_ids"][:size] == document_id)
+                & (column_files["tombstones"][:size] == 0)
+            )
+            if len(rows):
+                column_files["tombstones"][rows] = 1
+                column_files["tombstones"].flush()
+                manifest["deleted"] = manifest.get("deleted", 0) + len(rows)
+                self._write_manifest(manifest)
+            return len(rows)
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        limit: int = 5,
+        kind: Optional[int] = None,
+        document_ids: Optional[Sequence[int]] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[int, int, float]]:
+        """
+        Find the rows most similar to the query
+
+        Args:
+            query_embedding: Query vector
+            limit: Number of results
+            kind: Restrict to KIND_DOCUMENT or KIND_CHUNK rows
+            document_ids: Restrict to rows of these documents (scored exactly)
+            nprobe: Lists to probe (defaults to the configured value)
+
+        Returns:
+            List of (row id, document id, cosine similarity), best first
+        """
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        rows, scores, columns = self._score_candidates(query, kind, document_ids, nprobe)
+        if rows is None:
+            return []
+
+        ids = columns["ids"]
+        owners = columns["document_ids"]
+        top = _top_k(scores, limit)
+        return [(int(ids[rows[i]]), int(owners[rows[i]]), float(scores[i])) for i in top]
+
+    def search_documents(
+        self,
+        query_embedding: Sequence[float],
+        limit: int = 5,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank documents by their best matching row among the probed lists
+
+        Args:
+            query_embedding: Query vector
+            limit: Number of documents
+            nprobe: Lists to probe (defaults to the configured value)
+
+        Returns:
+            List of (document id, cosine similarity), best first
+        """
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        rows, scores, columns = self._score_candidates(query, None, None, nprobe)
+        if rows is None or len(rows) == 0:
+            return []
+
+        owners = np.asarray(columns["document_ids"][rows])
+        unique_ids, inverse = np.unique(owners, return_inverse=True)
+        best = np.full(len(unique_ids), -np.inf, dtype=np.float32)
+        np.maximum.at(best, inverse, scores)
+
+        top = _top_k(best, limit)
+        return [(int(unique_ids[i]), float(best[i])) for i in top]
+
+    # ------------------------------------------------------------------
+    # Offline build
+    # ------------------------------------------------------------------
+
+    def build(self, db: Session, batch_size: int = 10000) -> Dict:
+        """
+        Rebuild the index from the database
+
+        Streams every stored embedding into a fresh vector file, trains the
+        coarse quantizer on a sample and assigns all rows. Tombstoned rows
+        are dropped. The new files are published by atomically replacing
+        the manifest, so readers switch over on their next search.
+
+        Args:
+            db: Database session
+            batch_size: Rows fetched per query
+
+        Returns:
+            The new manifest
+        """
+        with self._lock, self._file_lock():
+            return self._build(db, batch_size)
+
+    def _build(self, db: Session, batch_size: int = 10000) -> Dict:
+        """Rebuild the index (caller holds the file lock)"""
+        start_time = time.perf_counter()
+        total = (
+            db.query(Document.id).filter(Document.embedding.isnot(None)).count()
+            + db.query(DocumentChunk.id).filter(DocumentChunk.embedding.isnot(None)).count()
+        )
+
+        manifest = {
+            "build": uuid.uuid4().hex[:12],
+            "dimensions": self.dimensions,
+            "size": 0,
+            "capacity": max(total, 1024),
+            "deleted": 0,
+            "nlist": 0,
+        }
+        self._resize_files(manifest)
+        vector_file, column_files = self._open(manifest, mode="r+")
+
+        size = 0
+        for kind, ids, owners, values in _iter_stored_embeddings(db, batch_size):
+            vectors = _normalize(decode_embeddings(values, self.dimensions))
+            end = size + len(ids)
+            vector_file[size:end] = vectors
+            column_files["ids"][size:end] = ids
+            column_files["document_ids"][size:end] = owners
+            column_files["kinds"][size:end] = kind
+            size = end
+        column_files["lists"][:size] = -1
+        column_files["tombstones"][:size] = 0
+        manifest["size"] = size
+
+        nlist = self.nlist or _default_nlist(size)
+        if size >= nlist * 39 and nlist > 1:
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(size, min(size, self.train_sample), replace=False))
+            centroids = _train_centroids(
+                np.asarray(vector_file[sample_rows]), nlist, self.kmeans_iterations, rng
+            )
+            for block in range(0, size, 65536):
+                stop = min(block + 65536, size)
+                column_files["lists"][block:stop] = _assign(np.asarray(vector_file[block:stop]), centroids)
+            np.save(self._path(manifest, "centroids.npy"), centroids)
+            manifest["nlist"] = nlist
+
+        vector_file.flush()
+        for column in column_files.values():
+            column.flush()
+
+        previous = self._read_manifest()
+        self._write_manifest(manifest)
+        if previous and previous.get("build") != manifest["build"]:
+            self._remove_build_files(previous)
+
+        print(
+            f"ANN index built: {size} rows, {manifest['nlist']} lists "
+            f"in {time.perf_counter() - start_time:.2f}s"
+        )
+        return manifest
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _score_candidates(
+        self,
+        query: np.ndarray,
+        kind: Optional[int],
+        document_ids: Optional[Sequence[int]],
+        nprobe: Optional[int]
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Dict[str, np.memmap]]:
+        """
+        Select candidate rows and score them exactly against the query
+
+        Returns:
+            (row positions, scores, the row arrays the positions refer to)
+        """
+        with self._lock:
+            manifest = self._refresh()
+            if manifest is None:
+                return None, None, {}
+
+            size = manifest["size"]
+            vectors = self._vectors
+            columns = self._columns
+            kinds = columns["kinds"]
+            owners = columns["document_ids"]
+            tombstones = columns["tombstones"]
+
+            # Whether rows is exactly 0..size-1 in order (probed lists are not)
+            full_scan = False
+            if document_ids is not None or self._centroids is None:
+                # Exact scan: either the filter already makes the set small
+                # or there is no quantizer yet
+                if document_ids is not None:
+                    rows = np.flatnonzero(
+                        np.isin(owners[:size], np.asarray(list(document_ids), dtype=np.int64))
+                    )
+                else:
+                    rows = np.arange(size)
+                    full_scan = True
+            else:
+                rows = self._probe(query, nprobe or self.nprobe)
+
+        if len(rows) == 0:
+            return rows, np.empty(0, dtype=np.float32), columns
+
+        live = tombstones[rows] == 0
+        mask = _mask(kinds[rows], owners[rows], kind, None)
+        if mask is not None:
+            live &= mask
+        rows = rows[live]
+
+        if full_scan and len(rows) == size:
+            # Nothing filtered out: score the mapping in one contiguous pass
+            scores = np.asarray(vectors[:size]) @ query
+        else:
+            scores = np.asarray(vectors[rows]) @ query
+        return rows, scores, columns
+
+    def _probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Rows in the nprobe lists closest to the query (caller holds the lock)"""
+        lists = _top_k(self._centroids @ query, min(nprobe, len(self._centroids)))
+        parts = [self._list_rows[self._list_offsets[i]:self._list_offsets[i + 1]] for i in lists]
+        parts.extend(np.asarray(self._pending[i], dtype=np.int64) for i in lists if i in self._pending)
+        # Rows appended before training have no list
+        if -1 in self._pending:
+            parts.append(np.asarray(self._pending[-1], dtype=np.int64))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def _refresh(self) -> Optional[Dict]:
+        """
+        Pick up changes published by this or another process
+
+        Returns:
+            The current manifest, or None if no index exists yet
+        """
+        with self._lock:
+            path = os.path.join(self.index_dir, _MANIFEST)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            mtime = (stat.st_ino, stat.st_mtime_ns)
+            if mtime == self._manifest_mtime:
+                return self._manifest
+
+            manifest = self._read_manifest()
+            if manifest is None:
+                return None
+            previous = self._manifest
+            rebuilt = previous is None or previous["build"] != manifest["build"]
+
+            if rebuilt or previous["capacity"] != manifest["capacity"]:
+                self._vectors, self._columns = self._open(manifest, mode="r")
+
+            if rebuilt:
+                self._centroids = self._load_centroids(manifest)
+                self._build_lists(manifest["size"])
+            else:
+                self._append_pending(self._indexed, manifest["size"])
+
+            self._manifest = manifest
+            self._manifest_mtime = mtime
+            return manifest
+
+    def _build_lists(self, size: int):
+        """Build the CSR inverted lists for rows [0, size)"""
+        self._pending = {}
+        if self._centroids is None:
+            self._list_rows = np.empty(0, dtype=np.int64)
+            self._list_offsets = np.zeros(1, dtype=np.int64)
+            self._indexed = 0
+            self._append_pending(0, size)
+            return
+
+        lists = np.asarray(self._columns["lists"][:size])
+        order = np.argsort(lists, kind="stable")
+        counts = np.bincount(lists[lists >= 0], minlength=len(self._centroids))
+        unassigned = int((lists < 0).sum())
+        self._list_rows = order[unassigned:].astype(np.int64)
+        self._list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._indexed = size
+        if unassigned:
+            self._pending[-1] = order[:unassigned].tolist()
+
+    def _append_pending(self, start: int, stop: int):
+        """Track rows appended since the CSR layout was built"""
+        if stop <= start:
+            return
+        lists = np.asarray(self._columns["lists"][start:stop])
+        for row, list_id in zip(range(start, stop), lists.tolist()):
+            self._pending.setdefault(list_id, []).append(row)
+        self._indexed = stop
+
+    def _load_centroids(self, manifest: Dict) -> Optional[np.ndarray]:
+        if not manifest.get("nlist"):
+            return None
+        return np.load(self._path(manifest, "centroids.npy"))
+
+    def _path(self, manifest: Dict, name: str) -> str:
+        return os.path.join(self.index_dir, f"{manifest['build']}-{name}")
+
+    def _open(self, manifest: Dict, mode: str) -> Tuple[np.memmap, Dict[str, np.memmap]]:
+        """Map the vector and row files for a build"""
+        capacity = manifest["capacity"]
+        vectors = np.memmap(
+            self._path(manifest, "vectors.f32"),
+            dtype=np.float32,
+            mode=mode,
+            shape=(capacity, self.dimensions)
+        )
+        columns = {
+            name: np.memmap(self._path(manifest, f"{name}.bin"), dtype=dtype, mode=mode, shape=(capacity,))
+            for name, dtype in _COLUMNS.items()
+        }
+        return vectors, columns
+
+    def _resize_files(self, manifest: Dict):
+        """Create or grow the backing files to the manifest capacity"""
+        capacity = manifest["capacity"]
+        sizes = {"vectors.f32": capacity * self.dimensions * 4}
+        sizes.update({f"{name}.bin": capacity * np.dtype(dtype).itemsize for name, dtype in _COLUMNS.items()})
+        for name, size in sizes.items():
+            with open(self._path(manifest, name), "ab") as f:
+                f.truncate(size)
+
+    def _remove_build_files(self, manifest: Dict):
+        """Delete an old build (open mappings stay valid until closed)"""
+        names = ["vectors.f32", "centroids.npy"] + [f"{name}.bin" for name in _COLUMNS]
+        for name in names:
+            try:
+                os.remove(self._path(manifest, name))
+            except FileNotFoundError:
+                pass
+
+    def _read_manifest(self) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.index_dir, _MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest: Dict):
+        path = os.path.join(self.index_dir, _MANIFEST)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def _file_lock(self):
+        return _FileLock(os.path.join(self.index_dir, _LOCK))
+
+
+class _FileLock:
+    """Exclusive cross-process lock around index writes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        else:
+            # msvcrt locks a byte range; LK_LOCK raises after ten one-second
+            # attempts, so keep retrying to wait as long as flock does
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        return False
+
+
+def _iter_stored_embeddings(db: Session, batch_size: int):
+    """Yield (kind, ids, document ids, stored values) batches from the database"""
+    queries = [
+        (KIND_DOCUMENT, Document.id, Document.id, Document.embedding),
+        (KIND_CHUNK, DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.embedding),
+    ]
+    for kind, id_column, owner_column, embedding_column in queries:
+        last_id = 0
+        while True:
+            rows = db.query(id_column, owner_column, embedding_column).filter(
+                embedding_column.isnot(None),
+                id_column > last_id
+            ).order_by(id_column).limit(batch_size).all()
+            if not rows:
+                break
+            yield kind, [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]
+            last_id = rows[-1][0]
+
+
+def _default_nlist(size: int) -> int:
+    """Rule-of-thumb list count: about 4 * sqrt(n)"""
+    return int(min(65536, max(1, 4 * np.sqrt(size))))
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block: int = 65536) -> np.ndarray:
+    """Nearest centroid (by cosine) for each normalized vector"""
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block):
+        lists[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+    return lists
+
+
+def _train_centroids(
+    sample: np.ndarray,
+    nlist: int,
+    iterations: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """Spherical k-means on a sample of normalized vectors"""
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        lists = _assign(sample, centroids)
+        order = np.argsort(lists, kind="stable")
+        counts = np.bincount(lists, minlength=nlist)
+        nonempty = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[nonempty]
+        centroids[nonempty] = np.add.reduceat(sample[order], starts, axis=0)
+        # Re-seed empty lists with random sample points
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = _normalize(centroids)
+    return centroids.astype(np.float32)
@@ -0,0 +1,150 @@
+"""
+Content-addressable storage for uploaded files
+"""
+from typing import Optional
+import os
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config.settings import get_settings
+from models.file_blob import FileBlob
+from utils.uploads import move_into_place
+
+
+class BlobStore:
+    """
+    Stores each distinct upload once, addressed by its SHA-256
+
+    Files live at <root>/<h[0:2]>/<h[2:4]>/<hash>.<type>, so byte-identical
+    uploads of the same type resolve to one path. The file_blobs table
+    counts the documents that reference each blob; the file is removed when
+    the last one is deleted. The extension is kept because processors pick
+    the parser from it.
+
+    Reference counts change only through conditional UPDATE / DELETE
+    statements, so the database arbitrates between workers and processes:
+    a reference is either taken before the last one is dropped, or the
+    blob is gone and the next upload stores it afresh.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def path_for(self, sha256: str, file_type: str) -> str:
+        """Storage path for a content hash and file type"""
+        return os.path.join(self.root_dir, sha256[:2], sha256[2:4], f"{sha256}.{file_type}")
+
+    def acquire(
+        self,
+        db: Session,
+        temp_path: str,
+        sha256: str,
+        file_type: str,
+        size: int
+    ) -> FileBlob:
+        """
+        Store an uploaded temp file, or reference the existing identical blob
+
+        Args:
+            db: Database session
+            temp_path: Fully written temp file (consumed)
+            sha256: SHA-256 of the file content
+            file_type: File type (extension)
+            size: Size in bytes
+
+        Returns:
+            The blob now referenced once more
+        """
+        for _ in range(2):
+            # Waits for a concurrent release() of the same blob to finish
+            referenced = db.query(FileBlob).filter(
+                FileBlob.sha256 == sha256,
+                FileBlob.file_type == file_type
+            ).update({"ref_count": FileBlob.ref_count + 1}, synchronize_session=False)
+            if referenced:
+                db.commit()
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return self._find(db, sha256, file_type)
+
+            file_path = self.path_for(sha256, file_type)
+            move_into_place(temp_path, file_path)
+            blob = FileBlob(sha256=sha256, file_type=file_type, file_path=file_path, size=size, ref_count=1)
+            db.add(blob)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another process stored the same content first; the
+                # bytes on disk are identical, so just take a reference
+                db.rollback()
+                continue
+            db.refresh(blob)
+            return blob
+
+        raise RuntimeError(f"Could not store blob {sha256}")
+
+    def release(self, db: Session, file_path: str) -> Optional[bool]:
+        """
+        Drop one reference to the blob stored at file_path and commit
+
+        Commits the session (including the caller's pending changes, such as
+        the document delete) and removes the file once no document refers
+        to it.
+
+        Args:
+            db: Database session
+            file_path: Document file path
+
+        Returns:
+            None if the path is not a blob (legacy upload), otherwise whether
+            the blob was removed
+        """
+        while True:
+            shared = db.query(FileBlob).filter(
+                FileBlob.file_path == file_path,
+                FileBlob.ref_count > 1
+            ).update({"ref_count": FileBlob.ref_count - 1}, synchronize_session=False)
+            if shared:
+                db.commit()
+                return False
+
+            deleted = db.query(FileBlob).filter(
+                FileBlob.file_path == file_path,
+                FileBlob.ref_count <= 1
+            ).delete(synchronize_session=False)
+            if deleted:
+                # Remove the file before committing: until then the delete
+                # holds the row, so an acquire() of the same content waits
+                # and then stores its own copy instead of losing it
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                db.commit()
+                return True
+
+            if db.query(FileBlob.id).filter(FileBlob.file_path == file_path).first() is None:
+                db.commit()
+                return None
+            # An acquire() took a reference between the two statements: drop that one
+
+    def _find(self, db: Session, sha256: str, file_type: str) -> Optional[FileBlob]:
+        """Look up the blob for a content hash and file type"""
+        return db.query(FileBlob).filter(
+            FileBlob.sha256 == sha256,
+            FileBlob.file_type == file_type
+        ).first()
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Get the process-wide blob store
+
+    Returns:
+        Shared BlobStore rooted at the upload directory
+    """
+    global _store
+    if _store is None:
+        _store = BlobStore(get_settings().upload_dir)
+    return _store
@@ -2,11 +2,19 @@
 Chat service for managing conversations
 """
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import time
 
+from config.settings import get_settings
 from models.chat import Chat, Message
+from models.document import Document
 from services.model_service import ModelService
+from services.conversation_history import ConversationHistory, message_tokens
 from services.document_service import DocumentService
+from services.embedding_scheduler import get_embedding_scheduler
+from services.response_cache import get_response_cache
+from utils.helpers import estimate_tokens
 
 
 class ChatService:
@@ -14,8 +22,10 @@ class ChatService:
     
     def __init__(self, db: Session):
         self.db = db
+        self.settings = get_settings()
         self.model_service = ModelService()
         self.document_service = DocumentService(db)
+        self.history = ConversationHistory(db, self.model_service)
     
     def create_chat(
         self,
@@ -57,6 +67,7 @@ class ChatService:
         if not chat:
             return False
         
+        self.history.delete_summary(chat_id)
         self.db.delete(chat)
         self.db.commit()
         
@@ -75,70 +86,403 @@ class ChatService:
         if not chat:
             raise ValueError(f"Chat {chat_id} not found")
         
-        # Create user message
-        user_message = Message(
-            chat_id=chat_id,
-            role="user",
-            content=content,
-            document_ids=document_ids or []
-        )
-        self.db.add(user_message)
-        self.db.commit()
+        # The same question over the same documents may already be answered
+        cached, cache_lookup = await self._lookup_cached_answer(chat, content, document_ids)
+        if cached is not None:
+            assistant_message, metrics = self._answer_from_cache(chat, content, document_ids, cached)
+            assistant_message.metrics = metrics
+            return assistant_message
         
-        # Get conversation history
-        messages = self.db.query(Message).filter(
-            Message.chat_id == chat_id
-        ).order_by(Message.created_at).all()
-        
-        # Build context from documents if provided
-        context = ""
-        if document_ids:
-            for doc_id in document_ids:
-                doc = self.document_service.get_document(doc_id)
-                if doc and doc.extracted_text:
-                    context += f"\n\nDocument: {doc.original_filename}\n{doc.extracted_text[:1000]}"
-        
-        # Prepare messages for the model
-        conversation_history = []
-        for msg in messages:
-            conversation_history.append({
-                "role": msg.role,
-                "content": msg.content
-            })
+        conversation_history, context, metrics = await self._prepare_turn(
+            chat, content, document_ids, cache_lookup["embedding"] if cache_lookup else None
+        )
         
         # Get AI response
         try:
+            generation_start = time.perf_counter()
             ai_response = await self.model_service.generate_response(
                 messages=conversation_history,
                 model_name=chat.model_name,
                 model_provider=chat.model_provider,
                 context=context
             )
+            # Responses are not streamed, so the first token arrives with the last
+            metrics["time_to_first_token_ms"] = round((time.perf_counter() - generation_start) * 1000, 1)
             
             # Create assistant message
-            assistant_message = Message(
-                chat_id=chat_id,
-                role="assistant",
-                content=ai_response,
-                document_ids=document_ids or []
-            )
-            self.db.add(assistant_message)
-            self.db.commit()
-            self.db.refresh(assistant_message)
+            assistant_message = self._add_assistant_message(chat_id, ai_response, document_ids)
+            self.history.schedule_update(chat)
+            self._cache_answer(chat, document_ids, cache_lookup, ai_response, metrics["time_to_first_token_ms"])
+            
+            self._report_metrics(chat_id, metrics)
+            assistant_message.metrics = metrics
             
             return assistant_message
             
         except Exception as e:
             # Create error message
-            error_message = Message(
-                chat_id=chat_id,
-                role="assistant",
-                content=f"I apologize, but I encountered an error: {str(e)}",
-                document_ids=document_ids or []
+            return self._add_assistant_message(
+                chat_id, f"I apologize, but I encountered an error: {str(e)}", document_ids
+            )
+    
+    async def stream_message(
+        self,
+        chat_id: int,
+        content: str,
+        document_ids: Optional[List[int]] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Send a message in a chat and stream the AI response as it is generated
+        
+        The assistant message is stored once the stream completes. If the
+        model fails, the error message is stored as in send_message; if the
+        client goes away mid-stream, the text received so far is stored.
+        
+        Args:
+            chat_id: Chat ID
+            content: User message
+            document_ids: Attached document IDs
+        
+        Yields:
+            (event, data) pairs: "token" with the text piece, then "done"
+            with the stored message and metrics, or "error"
+        """
+        chat = self.get_chat(chat_id)
+        if not chat:
+            raise ValueError(f"Chat {chat_id} not found")
+        
+        cached, cache_lookup = await self._lookup_cached_answer(chat, content, document_ids)
+        if cached is not None:
+            assistant_message, metrics = self._answer_from_cache(chat, content, document_ids, cached)
+            yield "token", {"content": assistant_message.content}
+            yield "done", {"message": self._message_data(assistant_message, metrics)}
+            return
+        
+        conversation_history, context, metrics = await self._prepare_turn(
+            chat, content, document_ids, cache_lookup["embedding"] if cache_lookup else None
+        )
+        
+        pieces = []
+        generation_start = time.perf_counter()
+        try:
+            async for token in self.model_service.stream_response(
+                messages=conversation_history,
+                model_name=chat.model_name,
+                model_provider=chat.model_provider,
+                context=context
+            ):
+                if not pieces:
+                    metrics["time_to_first_token_ms"] = round((time.perf_counter() - generation_start) * 1000, 1)
+                pieces.append(token)
+                yield "token", {"content": token}
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client disconnected: keep what was generated
+            if pieces:
+                self._add_assistant_message(chat_id, "".join(pieces), document_ids)
+            raise
+        except Exception as e:
+            error_message = self._add_assistant_message(
+                chat_id, f"I apologize, but I encountered an error: {str(e)}", document_ids
             )
-            self.db.add(error_message)
-            self.db.commit()
-            self.db.refresh(error_message)
+            yield "error", {"message": self._message_data(error_message), "detail": str(e)}
+            return
+        
+        metrics["generation_ms"] = round((time.perf_counter() - generation_start) * 1000, 1)
+        assistant_message = self._add_assistant_message(chat_id, "".join(pieces), document_ids)
+        self.history.schedule_update(chat)
+        self._cache_answer(chat, document_ids, cache_lookup, assistant_message.content, metrics["generation_ms"])
+        self._report_metrics(chat_id, metrics)
+        yield "done", {"message": self._message_data(assistant_message, metrics)}
+    
+    async def _prepare_turn(
+        self,
+        chat: Chat,
+        content: str,
+        document_ids: Optional[List[int]],
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[List[Dict], str, Dict]:
+        """
+        Store the user message and assemble the model input for a reply
+        
+        Args:
+            chat: Chat
+            content: User message
+            document_ids: Attached document IDs
+            query_embedding: Embedding of the message, if already computed
+        
+        Returns:
+            Tuple of (conversation history, context text, prompt metrics)
+        """
+        # Create user message
+        user_message = Message(
+            chat_id=chat.id,
+            role="user",
+            content=content,
+            document_ids=document_ids or []
+        )
+        self.db.add(user_message)
+        self.db.commit()
+        
+        # Retrieve the most relevant document chunks as context
+        retrieval_start = time.perf_counter()
+        context, context_stats = await self._build_context(content, document_ids, query_embedding)
+        retrieval_ms = (time.perf_counter() - retrieval_start) * 1000
+        
+        # Latest turns verbatim and the rolling summary of older ones, within
+        # what the model's context length leaves after the document context
+        conversation_history, history_stats = self.history.build(
+            chat, message_tokens(context) if context else 0
+        )
+        
+        prompt_chars = len(context) + sum(len(msg["content"]) for msg in conversation_history)
+        metrics = {
+            "prompt_chars": prompt_chars,
+            "prompt_tokens_estimate": estimate_tokens(context) + sum(
+                estimate_tokens(msg["content"]) for msg in conversation_history
+            ),
+            "context_chunks": context_stats["chunks"],
+            "context_tables": context_stats["tables"],
+            "context_tokens_estimate": context_stats["tokens"],
+            "retrieval_ms": round(retrieval_ms, 1),
+            **history_stats,
+        }
+        
+        return conversation_history, context, metrics
+    
+    async def _lookup_cached_answer(
+        self,
+        chat: Chat,
+        content: str,
+        document_ids: Optional[List[int]]
+    ) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        Look up a cached answer to a similar question over the same documents
+        
+        Only questions about attached documents are cached: without them
+        the answer depends on the conversation rather than on the sources.
+        
+        Returns:
+            Tuple of (cache hit or None, lookup state for _cache_answer, or
+            None when the turn is not cacheable)
+        """
+        cache = get_response_cache()
+        if cache is None or not document_ids:
+            return None, None
+        
+        lookup_start = time.perf_counter()
+        # Taken before the context is read, so a document processed while
+        # the answer is generated keeps it out of the cache
+        since = cache.version()
+        embedding = await get_embedding_scheduler().embed(content)
+        cached = cache.get(chat.model_name, document_ids, embedding)
+        if cached is not None:
+            cached["lookup_ms"] = (time.perf_counter() - lookup_start) * 1000
+        return cached, {"embedding": embedding, "since": since}
+    
+    def _answer_from_cache(
+        self,
+        chat: Chat,
+        content: str,
+        document_ids: List[int],
+        cached: Dict
+    ) -> Tuple[Message, Dict]:
+        """Store the user message and a cached answer as this turn's reply"""
+        user_message = Message(
+            chat_id=chat.id,
+            role="user",
+            content=content,
+            document_ids=document_ids
+        )
+        self.db.add(user_message)
+        self.db.commit()
+        
+        assistant_message = self._add_assistant_message(chat.id, cached["content"], document_ids)
+        self.history.schedule_update(chat)
+        
+        metrics = {
+            "cache_hit": True,
+            "cache_similarity": round(cached["similarity"], 4),
+            "cache_age_seconds": round(cached["age_seconds"], 1),
+            "time_to_first_token_ms": round(cached["lookup_ms"], 1),
+        }
+        print(
+            f"Chat {chat.id}: answered from cache (similarity {metrics['cache_similarity']}, "
+            f"{metrics['time_to_first_token_ms']} ms)"
+        )
+        return assistant_message, metrics
+    
+    def _cache_answer(
+        self,
+        chat: Chat,
+        document_ids: Optional[List[int]],
+        cache_lookup: Optional[Dict],
+        answer: str,
+        generation_ms: float
+    ):
+        """Cache a generated answer for similar questions over the same documents"""
+        cache = get_response_cache()
+        if cache is None or cache_lookup is None or not answer:
+            return
+        cache.put(
+            chat.model_name,
+            document_ids,
+            cache_lookup["embedding"],
+            answer,
+            generation_ms=generation_ms,
+            since=cache_lookup["since"]
+        )
+    
+    def _add_assistant_message(
+        self,
+        chat_id: int,
+        content: str,
+        document_ids: Optional[List[int]]
+    ) -> Message:
+        """Store an assistant message"""
+        message = Message(
+            chat_id=chat_id,
+            role="assistant",
+            content=content,
+            document_ids=document_ids or []
+        )
+        self.db.add(message)
+        self.db.commit()
+        self.db.refresh(message)
+        
+        return message
+    
+    def _message_data(self, message: Message, metrics: Optional[Dict] = None) -> Dict:
+        """Serialize a message for a stream event"""
+        return {
+            "id": message.id,
+            "role": message.role,
+            "content": message.content,
+            "created_at": message.created_at.isoformat() if message.created_at else None,
+            "metrics": metrics
+        }
+    
+    async def _build_context(
+        self,
+        content: str,
+        document_ids: Optional[List[int]],
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[str, Dict]:
+        """
+        Build prompt context from the chunks most relevant to a message
+        
+        Aggregate questions about attached spreadsheets ("total revenue by
+        region") are answered by a query on the sheet's columnar table, and
+        the compact result table goes first. Then the message is embedded
+        once and the top-k chunks of all documents, spreadsheets included in
+        case the query missed part of the question, are taken in relevance
+        order until the token budget is spent. Selected chunks are grouped
+        per document in reading order.
+        
+        Args:
+            content: User message
+            document_ids: Attached document IDs
+            query_embedding: Embedding of the message, if already computed
             
-            return error_message
-
+        Returns:
+            Tuple of (context text, stats with chunk, table and token counts)
+        """
+        stats = {"chunks": 0, "tables": 0, "tokens": 0}
+        if not document_ids:
+            return "", stats
+        
+        parts = await self._table_context(content, document_ids)
+        stats["tables"] = len(parts)
+        stats["tokens"] = sum(estimate_tokens(part) for part in parts)
+        
+        # Embed through the shared micro-batching scheduler
+        if query_embedding is None:
+            query_embedding = await get_embedding_scheduler().embed(content)
+        # The first search loads the indexes; loading and scoring run off the event loop
+        ranked = await asyncio.to_thread(
+            self.document_service.hybrid_search,
+            content,
+            limit=self.settings.chat_context_top_k,
+            document_ids=document_ids,
+            query_embedding=query_embedding
+        )
+        
+        budget = self.settings.chat_context_token_budget
+        selected = []
+        for chunk, _ in ranked:
+            tokens = estimate_tokens(chunk.content)
+            if stats["tokens"] + tokens > budget:
+                continue
+            selected.append(chunk)
+            stats["tokens"] += tokens
+        
+        if not selected:
+            return "\n".join(parts), stats
+        stats["chunks"] = len(selected)
+        
+        filenames = dict(
+            self.db.query(Document.id, Document.original_filename).filter(
+                Document.id.in_({chunk.document_id for chunk in selected})
+            ).all()
+        )
+        
+        current_document = None
+        for chunk in sorted(selected, key=lambda c: (c.document_id, c.chunk_index)):
+            if chunk.document_id != current_document:
+                current_document = chunk.document_id
+                parts.append(f"\n\nDocument: {filenames.get(chunk.document_id, chunk.document_id)}")
+            parts.append(chunk.content)
+        
+        return "\n".join(parts), stats
+    
+    async def _table_context(self, content: str, document_ids: List[int]) -> List[str]:
+        """
+        Answer an aggregate question from the columnar tables of attached spreadsheets
+        
+        Args:
+            content: User message
+            document_ids: Attached document IDs
+        
+        Returns:
+            One context block per queried table
+        """
+        documents = self.db.query(Document).filter(
+            Document.id.in_(document_ids),
+            Document.file_type.in_(("csv", "xlsx", "xls")),
+            Document.status == "completed"
+        ).all()
+        if not documents:
+            return []
+        
+        # Imported here: pyarrow is only needed once spreadsheets are attached
+        from services.table_query import document_tables, plan_query, query_table, format_result, TableQueryError
+        
+        parts = []
+        for document in documents:
+            for table in document_tables(document):
+                plan = plan_query(content, table, limit=self.settings.chat_table_max_rows)
+                if plan is None:
+                    continue
+                try:
+                    # Vectorized and fast, but still CPU work: keep it off the event loop
+                    result = await asyncio.to_thread(query_table, table["path"], **plan)
+                except TableQueryError as e:
+                    print(f"Table query on document {document.id} failed: {e}")
+                    continue
+                parts.append(
+                    f"\n\nDocument: {document.original_filename}, sheet {table['sheet']} "
+                    f"({table['rows']} rows), query result:\n{format_result(result)}"
+                )
+        
+        return parts
+    
+    def _report_metrics(self, chat_id: int, metrics: Dict):
+        """Log per-message prompt size and latency"""
+        print(
+            f"Chat {chat_id}: prompt ~{metrics['prompt_tokens_estimate']} tokens "
+            f"({metrics['prompt_chars']} chars, {metrics['context_chunks']} chunks, "
+            f"{metrics['context_tables']} tables, "
+            f"{metrics['history_messages']} recent + {metrics['summarized_messages']} summarized messages), "
+            f"retrieval {metrics['retrieval_ms']} ms, "
+            f"first token {metrics.get('time_to_first_token_ms', '-')} ms"
+            + (f", generation {metrics['generation_ms']} ms" if "generation_ms" in metrics else "")
+        )
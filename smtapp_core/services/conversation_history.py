@@ -0,0 +1,246 @@
+"""
+Token-budgeted conversation history with a rolling summary
+"""
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+import asyncio
+
+from config.database import SessionLocal
+from config.settings import get_settings
+from models.chat import Chat, Message
+from models.chat_summary import ChatSummary
+from services.model_service import ModelService
+from utils.helpers import estimate_tokens
+
+
+# Role markers and separators Ollama adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Update the summary with the new messages. Keep facts, names, numbers, decisions, "
+    "preferences and open questions; drop greetings and repetition. "
+    "Reply with the updated summary only, in at most {words} words."
+)
+
+# Summary updates in flight, one per chat
+_summary_tasks: Dict[int, asyncio.Task] = {}
+
+
+def message_tokens(content: str) -> int:
+    """Estimated prompt tokens of one chat message"""
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationHistory:
+    """
+    Builds the history part of a chat prompt within the model's context length
+
+    The newest turns are sent verbatim, newest first until the budget left
+    by the document context and the summary is spent. Older turns are
+    folded into a per-chat rolling summary (ChatSummary) in the background
+    after a reply: only the messages after the summary's last_message_id
+    are read, and each update extends the stored summary with a batch of
+    new messages instead of summarizing the whole chat again. Prompt size
+    and per-turn work therefore stay flat however long the chat gets.
+    """
+
+    def __init__(self, db: Session, model_service: Optional[ModelService] = None):
+        self.db = db
+        self.settings = get_settings()
+        self.model_service = model_service or ModelService()
+
+    def build(self, chat: Chat, context_tokens: int = 0) -> Tuple[List[Dict], Dict]:
+        """
+        Assemble the conversation history for the next reply
+
+        Args:
+            chat: Chat whose latest message is the user's new message
+            context_tokens: Estimated tokens of the document context
+
+        Returns:
+            Tuple of (messages for the model, history stats)
+        """
+        budget = self.prompt_budget(chat.model_name)
+        summary = self.get_summary(chat.id)
+        summary_message = self._summary_message(summary)
+        summary_tokens = message_tokens(summary_message["content"]) if summary_message else 0
+
+        available = budget - context_tokens - summary_tokens
+        recent = []
+        used = 0
+        messages = self._unsummarized(chat.id, summary)
+        for message in reversed(messages):
+            tokens = message_tokens(message.content)
+            # The new user message is always sent, even over budget
+            if recent and used + tokens > available:
+                break
+            recent.append({"role": message.role, "content": message.content})
+            used += tokens
+        recent.reverse()
+
+        history = ([summary_message] if summary_message else []) + recent
+        stats = {
+            "history_messages": len(recent),
+            "history_dropped": len(messages) - len(recent),
+            "summarized_messages": summary.message_count if summary else 0,
+            "history_tokens": used + summary_tokens,
+            "prompt_budget_tokens": budget,
+        }
+        return history, stats
+
+    def prompt_budget(self, model_name: str) -> int:
+        """Prompt tokens available for a model, leaving room for the reply"""
+        return self.model_service.get_context_length(model_name) - self.settings.chat_response_reserve_tokens
+
+    def get_summary(self, chat_id: int) -> Optional[ChatSummary]:
+        """Get the rolling summary of a chat"""
+        return self.db.query(ChatSummary).filter(ChatSummary.chat_id == chat_id).first()
+
+    def delete_summary(self, chat_id: int):
+        """Delete the rolling summary of a chat (without committing)"""
+        self.db.query(ChatSummary).filter(ChatSummary.chat_id == chat_id).delete()
+
+    async def update_summary(self, chat_id: int, model_name: str, model_provider: str = "ollama") -> int:
+        """
+        Fold older turns into the rolling summary once they no longer fit
+
+        When the messages after the summary exceed the history budget (the
+        prompt budget minus the full document context budget and the
+        summary), the oldest of them are folded in until the rest fit in
+        half of it, so updates happen every few turns rather than on every
+        one. Messages are folded in batches that fit the model's context;
+        the summary is committed after each batch.
+
+        Args:
+            chat_id: Chat ID
+            model_name: Model that writes the summary
+            model_provider: Model provider
+
+        Returns:
+            Number of messages folded into the summary
+        """
+        summary = self.get_summary(chat_id)
+        messages = self._unsummarized(chat_id, summary)
+        history_budget = max(
+            self.prompt_budget(model_name)
+            - self.settings.chat_context_token_budget
+            - self.settings.chat_summary_max_tokens,
+            256
+        )
+        tokens = [message_tokens(message.content) for message in messages]
+        if sum(tokens) <= history_budget:
+            return 0
+
+        # Keep the newest messages that fit in half the budget verbatim
+        split = len(messages)
+        kept = 0
+        while split > 0 and kept + tokens[split - 1] <= history_budget // 2:
+            split -= 1
+            kept += tokens[split]
+        to_fold = messages[:split]
+        if not to_fold:
+            return 0
+
+        if summary is None:
+            summary = ChatSummary(chat_id=chat_id, content="", last_message_id=0, message_count=0, tokens=0)
+            self.db.add(summary)
+
+        # Current summary, instructions and the new summary must fit with the batch
+        capacity = max(
+            self.model_service.get_context_length(model_name)
+            - 2 * self.settings.chat_summary_max_tokens
+            - estimate_tokens(SUMMARY_INSTRUCTIONS) - MESSAGE_OVERHEAD_TOKENS * 2,
+            256
+        )
+        folded = 0
+        while folded < len(to_fold):
+            batch = []
+            batch_tokens = 0
+            for message in to_fold[folded:]:
+                tokens = message_tokens(message.content)
+                if batch and batch_tokens + tokens > capacity:
+                    break
+                batch.append(message)
+                batch_tokens += tokens
+
+            summary.content = await self._summarize(summary.content, batch, capacity, model_name, model_provider)
+            summary.tokens = estimate_tokens(summary.content)
+            summary.last_message_id = batch[-1].id
+            summary.message_count += len(batch)
+            summary.model_name = model_name
+            self.db.commit()
+            folded += len(batch)
+
+        return folded
+
+    def schedule_update(self, chat: Chat):
+        """
+        Update the chat's summary in the background after a reply
+
+        At most one update runs per chat; a turn that finds one running
+        leaves the remaining messages to the next turn.
+        """
+        task = _summary_tasks.get(chat.id)
+        if task is not None and not task.done():
+            return
+        _summary_tasks[chat.id] = asyncio.get_running_loop().create_task(
+            _run_summary_update(chat.id, chat.model_name, chat.model_provider)
+        )
+
+    async def _summarize(
+        self,
+        summary: str,
+        batch: List[Message],
+        capacity: int,
+        model_name: str,
+        model_provider: str
+    ) -> str:
+        """Extend a summary with a batch of messages"""
+        # A single message larger than the model's context is cut to fit
+        max_chars = capacity * 4
+        transcript = "\n\n".join(
+            f"{message.role.capitalize()}: {message.content[:max_chars]}" for message in batch
+        )
+        words = self.settings.chat_summary_max_tokens * 3 // 4
+        return (await self.model_service.generate_response(
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(words=words)},
+                {
+                    "role": "user",
+                    "content": f"Current summary:\n{summary or '(none yet)'}\n\nNew messages:\n{transcript}"
+                },
+            ],
+            model_name=model_name,
+            model_provider=model_provider
+        )).strip()
+
+    def _unsummarized(self, chat_id: int, summary: Optional[ChatSummary]) -> List[Message]:
+        """Messages of a chat not yet folded into its summary, oldest first"""
+        query = self.db.query(Message).filter(Message.chat_id == chat_id)
+        if summary is not None:
+            query = query.filter(Message.id > summary.last_message_id)
+        return query.order_by(Message.id).all()
+
+    def _summary_message(self, summary: Optional[ChatSummary]) -> Optional[Dict]:
+        if summary is None or not summary.content:
+            return None
+        return {
+            "role": "system",
+            "content": f"Summary of the earlier conversation ({summary.message_count} messages):\n{summary.content}"
+        }
+
+
+async def _run_summary_update(chat_id: int, model_name: str, model_provider: str):
+    """Update one chat's summary with its own database session"""
+    db = SessionLocal()
+    try:
+        folded = await ConversationHistory(db).update_summary(chat_id, model_name, model_provider)
+        if folded:
+            print(f"Chat {chat_id}: folded {folded} messages into the conversation summary")
+    except Exception as e:
+        db.rollback()
+        print(f"Warning: Could not update summary of chat {chat_id}: {e}")
+    finally:
+        db.close()
+        _summary_tasks.pop(chat_id, None)
@@ -2,13 +2,55 @@
 Document service for managing documents
 """
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 import os
+import numpy as np
 
 from models.document import Document, DocumentChunk
+from models.ingestion_job import IngestionJob
 from processors.file_processor_factory import FileProcessorFactory
+from services.blob_store import get_blob_store
 from services.embedding_service import EmbeddingService
-import json
+from services.vector_index import get_vector_index, KIND_DOCUMENT, KIND_CHUNK
+from services.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from services.response_cache import get_response_cache
+from utils.embeddings import encode_embedding, decode_embedding, decode_embeddings
+from utils.pipeline import batched, prefetch
+
+
+# Characters of text used for the whole-document embedding; the model
+# truncates its input to a few hundred tokens anyway
+_DOCUMENT_EMBEDDING_CHARS = 16384
+
+# Embedding batches per window of chunks sorted by length before encoding
+_SORT_WINDOW_BATCHES = 8
+
+
+class _TextPrefix:
+    """Passes segments through while keeping the first max_chars characters (all if None)"""
+    
+    def __init__(self, max_chars: Optional[int]):
+        self.max_chars = max_chars
+        self.length = 0
+        self._parts = []
+        self._kept = 0
+    
+    def capture(self, segments: Iterable[str]) -> Iterator[str]:
+        """Yield segments unchanged, recording the prefix and total length"""
+        for segment in segments:
+            self.length += len(segment)
+            if self.max_chars is None:
+                self._parts.append(segment)
+            elif self._kept < self.max_chars:
+                part = segment[:self.max_chars - self._kept]
+                self._parts.append(part)
+                self._kept += len(part)
+            yield segment
+    
+    @property
+    def text(self) -> str:
+        """The captured prefix"""
+        return "".join(self._parts)
 
 
 class DocumentService:
@@ -17,6 +59,8 @@ class DocumentService:
     def __init__(self, db: Session):
         self.db = db
         self.embedding_service = EmbeddingService()
+        self.vector_index = get_vector_index()
+        self.lexical_index = get_lexical_index()
     
     def create_document(
         self,
@@ -60,93 +104,289 @@ class DocumentService:
         if not document:
             return False
         
-        # Delete file from disk
-        if os.path.exists(document.file_path):
-            os.remove(document.file_path)
+        file_path = document.file_path
         
-        # Delete chunks
+        # Delete chunks and ingestion jobs
         self.db.query(DocumentChunk).filter(
             DocumentChunk.document_id == document_id
         ).delete()
+        self.db.query(IngestionJob).filter(
+            IngestionJob.document_id == document_id
+        ).delete()
         
-        # Delete document
+        # Delete document, then drop its reference to the stored file (the
+        # file itself goes once no other document shares it)
         self.db.delete(document)
-        self.db.commit()
+        removed = get_blob_store().release(self.db, file_path)
+        if removed is None:
+            # Upload from before content-addressed storage
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        if removed is not False:
+            # Spreadsheet tables go with the file they were built from
+            # (imported here: utils.columnar loads pandas and pyarrow)
+            from utils.columnar import remove_tables
+            remove_tables(file_path)
+        
+        self.vector_index.remove_document(document_id)
+        self.lexical_index.remove_document(document_id)
+        self._invalidate_cached_responses(document_id)
         
         return True
     
     def process_document(self, document_id: int) -> Document:
         """
         Process a document: extract text, create embeddings, etc.
+        
+        Runs as a streaming pipeline: the processor yields text segments,
+        which are chunked and grouped into windows on a background thread;
+        each window is embedded in length-sorted batches and written to the
+        database before the next is taken. Only a few windows are in memory
+        at any time, plus the text kept for Document.extracted_text: all of
+        it unless extracted_text_max_chars caps it. The chunks are added to
+        the search indexes once committed (see _index_chunks).
         """
         document = self.get_document(document_id)
         if not document:
             raise ValueError(f"Document {document_id} not found")
         
+        settings = self.embedding_service.settings
+        self._invalidate_cached_responses(document.id)
         try:
             # Update status
             document.status = "processing"
             self.db.commit()
             
+            # Identical content was already processed: reuse its results
+            source = self._find_processed_copy(document)
+            if source is not None:
+                return self._copy_processed(source, document)
+            
+            # Drop rows from a previous run (e.g. a retried job) so neither the
+            # database nor the indexes hold stale chunks
+            self.db.query(DocumentChunk).filter(
+                DocumentChunk.document_id == document.id
+            ).delete()
+            self.vector_index.remove_document(document.id)
+            self.lexical_index.remove_document(document.id)
+            
             # Get appropriate processor
             processor = FileProcessorFactory.get_processor(document.file_type)
             
-            # Extract text and metadata
-            extracted_data = processor.process(document.file_path)
-            
-            document.extracted_text = extracted_data.get("text", "")
-            document.extra_metadata = extracted_data.get("metadata", {})
+            # Stream text -> chunks -> batches on a background thread
+            metadata = {}
+            text_limit = settings.extracted_text_max_chars
+            prefix = _TextPrefix(max(text_limit, _DOCUMENT_EMBEDDING_CHARS) if text_limit else None)
+            segments = prefix.capture(processor.iter_segments(document.file_path, metadata))
+            # Windows of several embedding batches, so length-sorting them
+            # groups chunks of similar length into each encode call
+            windows = prefetch(
+                batched(self._iter_chunks(segments), settings.embedding_batch_size * _SORT_WINDOW_BATCHES),
+                maxsize=2
+            )
             
-            # Create embedding for the document
-            if document.extracted_text:
-                embedding = self.embedding_service.create_embedding(document.extracted_text)
-                # store as JSON when not using pgvector
-                document.embedding = json.dumps(embedding)
-                
-                # Create chunks and their embeddings
-                chunks = self._create_chunks(document.extracted_text)
-                for idx, chunk_text in enumerate(chunks):
-                    chunk_embedding = self.embedding_service.create_embedding(chunk_text)
-                    
-                    chunk = DocumentChunk(
+            storage_dtype = settings.embedding_storage_dtype
+            chunk_count = 0
+            for chunk_texts in windows:
+                embeddings = np.empty((len(chunk_texts), settings.vector_dimensions), dtype=np.float32)
+                for indices, batch_embeddings in self.embedding_service.iter_embedding_batches(chunk_texts):
+                    embeddings[indices] = batch_embeddings
+                batch = [
+                    DocumentChunk(
                         document_id=document.id,
-                        chunk_index=idx,
-                        content=chunk_text,
-                        embedding=json.dumps(chunk_embedding)
+                        chunk_index=chunk_count + i,
+                        content=content,
+                        embedding=encode_embedding(embedding, storage_dtype)
                     )
-                    self.db.add(chunk)
+                    for i, (content, embedding) in enumerate(zip(chunk_texts, embeddings))
+                ]
+                self.db.add_all(batch)
+                # Write the window out, then detach the rows so the session
+                # does not accumulate the whole document
+                self.db.flush()
+                for chunk in batch:
+                    self.db.expunge(chunk)
+                chunk_count += len(batch)
+            
+            text = prefix.text.strip()
+            document.extracted_text = text[:text_limit] if text_limit else text
+            metadata["text_length"] = prefix.length
+            if text_limit and prefix.length > text_limit:
+                # Only the first text_limit characters are on the record; the chunks hold all of it
+                metadata["extracted_text_truncated"] = True
+                metadata["extracted_text_chars"] = len(document.extracted_text)
+            metadata["chunks"] = chunk_count
+            document.extra_metadata = metadata
+            
+            # Create embedding for the document (the model only reads the
+            # first few hundred tokens, so a prefix gives the same vector)
+            document_embedding = None
+            if text:
+                document_embedding = self.embedding_service.create_embedding(text[:_DOCUMENT_EMBEDDING_CHARS])
+                # store as raw float BLOBs when not using pgvector
+                document.embedding = encode_embedding(document_embedding, storage_dtype)
             
             # Update status
             document.status = "completed"
             self.db.commit()
             self.db.refresh(document)
             
+            if document_embedding is not None:
+                self.vector_index.add(KIND_DOCUMENT, [document.id], [document.id], np.array([document_embedding]))
+            self._index_chunks(document.id)
+        
         except Exception as e:
+            # Discard partially written chunks (and their index entries)
+            # before recording the failure
+            self.db.rollback()
+            self.vector_index.remove_document(document.id)
+            self.lexical_index.remove_document(document.id)
             document.status = "failed"
             document.error_message = str(e)
             self.db.commit()
             raise
+        finally:
+            # Answers generated while the document was being processed saw
+            # partial content; drop them too
+            self._invalidate_cached_responses(document.id)
         
         return document
     
-    def _create_chunks(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+    def _invalidate_cached_responses(self, document_id: int):
+        """Drop cached chat answers that were based on a document"""
+        cache = get_response_cache()
+        if cache is not None:
+            cache.invalidate_documents([document_id])
+    
+    def _find_processed_copy(self, document: Document) -> Optional[Document]:
+        """Find another completed document backed by the same stored file"""
+        return self.db.query(Document).filter(
+            Document.file_path == document.file_path,
+            Document.file_type == document.file_type,
+            Document.status == "completed",
+            Document.id != document.id
+        ).order_by(Document.id).first()
+    
+    def _copy_processed(self, source: Document, document: Document, batch_size: int = 1000) -> Document:
         """
-        Split text into overlapping chunks
+        Give a document the extraction results of an identical one
+        
+        Copies the extracted text, metadata, embedding and chunk rows
+        (with their stored embeddings) instead of running extraction and
+        the embedding model again. Chunk rows are copied rather than shared
+        because each belongs to one document.
         """
-        if not text:
-            return []
+        dimensions = self.embedding_service.settings.vector_dimensions
+        
+        self.db.query(DocumentChunk).filter(
+            DocumentChunk.document_id == document.id
+        ).delete()
+        self.vector_index.remove_document(document.id)
+        self.lexical_index.remove_document(document.id)
+        
+        document.extracted_text = source.extracted_text
+        document.extra_metadata = dict(source.extra_metadata or {})
+        document.embedding = source.embedding
+        
+        last_index = -1
+        while True:
+            rows = self.db.query(
+                DocumentChunk.chunk_index, DocumentChunk.content, DocumentChunk.embedding
+            ).filter(
+                DocumentChunk.document_id == source.id,
+                DocumentChunk.chunk_index > last_index
+            ).order_by(DocumentChunk.chunk_index).limit(batch_size).all()
+            if not rows:
+                break
+            
+            batch = [
+                DocumentChunk(document_id=document.id, chunk_index=idx, content=content, embedding=embedding)
+                for idx, content, embedding in rows
+            ]
+            self.db.add_all(batch)
+            self.db.flush()
+            for chunk in batch:
+                self.db.expunge(chunk)
+            last_index = rows[-1][0]
+        
+        document.status = "completed"
+        self.db.commit()
+        self.db.refresh(document)
+        print(f"Document {document.id} reused processing results of document {source.id}")
         
-        chunks = []
-        start = 0
-        text_length = len(text)
+        if document.embedding is not None:
+            self.vector_index.add(
+                KIND_DOCUMENT, [document.id], [document.id],
+                decode_embedding(document.embedding, dimensions)[None, :]
+            )
+        self._index_chunks(document.id, batch_size)
         
-        while start < text_length:
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start += chunk_size - overlap
+        return document
+    
+    def _index_chunks(self, document_id: int, batch_size: int = 1000):
+        """
+        Add a document's committed chunks to the search indexes
         
-        return chunks
+        Runs after the commit: an index loaded by another session in the
+        meantime read the database without these chunks, and adding them
+        before the commit would be skipped by an index that is not loaded
+        yet. The indexes ignore chunk ids they already hold, so a load that
+        did see them is harmless. Rows are read back in batches, so a
+        large document is never held in memory as a whole.
+        """
+        dimensions = self.embedding_service.settings.vector_dimensions
+        last_index = -1
+        while True:
+            rows = self.db.query(
+                DocumentChunk.chunk_index, DocumentChunk.id, DocumentChunk.content, DocumentChunk.embedding
+            ).filter(
+                DocumentChunk.document_id == document_id,
+                DocumentChunk.chunk_index > last_index
+            ).order_by(DocumentChunk.chunk_index).limit(batch_size).all()
+            if not rows:
+                break
+            
+            chunk_ids = [chunk_id for _, chunk_id, _, _ in rows]
+            document_ids = [document_id] * len(rows)
+            self.vector_index.add(
+                KIND_CHUNK, chunk_ids, document_ids,
+                decode_embeddings([embedding for _, _, _, embedding in rows], dimensions)
+            )
+            self.lexical_index.add(chunk_ids, document_ids, [content for _, _, content, _ in rows])
+            last_index = rows[-1][0]
+    
+    def _iter_chunks(self, segments: Iterable[str], chunk_size: int = 500, overlap: int = 50) -> Iterator[str]:
+        """
+        Split streamed text into overlapping chunks
+        
+        Yields exactly the chunks that fixed-size windows over the joined,
+        stripped text would give, buffering only about one segment.
+        """
+        step = chunk_size - overlap
+        buffer = ""
+        started = False
+        for segment in segments:
+            if not started:
+                segment = segment.lstrip()
+                if not segment:
+                    continue
+                started = True
+            buffer += segment
+            
+            # Only emit windows followed by non-whitespace, so trailing
+            # whitespace the final strip would drop never leaks into a chunk
+            stable = len(buffer.rstrip())
+            position = 0
+            while stable - position >= chunk_size:
+                yield buffer[position:position + chunk_size]
+                position += step
+            buffer = buffer[position:]
+        
+        buffer = buffer.rstrip()
+        position = 0
+        while position < len(buffer):
+            yield buffer[position:position + chunk_size]
+            position += step
     
     def search_similar_documents(self, query: str, limit: int = 5) -> List[Document]:
         """
@@ -155,11 +395,140 @@ class DocumentService:
         # Create embedding for query
         query_embedding = self.embedding_service.create_embedding(query)
         
-        # Search using pgvector
-        # This is a simplified version - you'd use proper vector search
-        documents = self.db.query(Document).filter(
-            Document.embedding.isnot(None)
-        ).limit(limit).all()
+        # Rank documents by their best matching document or chunk vector
+        self.vector_index.load(self.db)
+        ranked = self.vector_index.search_documents(query_embedding, limit=limit)
+        if not ranked:
+            return []
+        
+        ids = [doc_id for doc_id, _ in ranked]
+        documents = {
+            doc.id: doc
+            for doc in self.db.query(Document).filter(Document.id.in_(ids)).all()
+        }
+        
+        return [documents[doc_id] for doc_id in ids if doc_id in documents]
+    
+    def search_similar_chunks(
+        self,
+        query: str,
+        limit: int = 5,
+        document_ids: Optional[List[int]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Tuple[DocumentChunk, float]]:
+        """
+        Search for the chunks most similar to the query
+        
+        Args:
+            query: Query text
+            limit: Number of chunks to return
+            document_ids: Optionally restrict the search to these documents
+            query_embedding: Precomputed query embedding (skips encoding)
+        
+        Returns:
+            List of (chunk, cosine similarity), best first
+        """
+        if query_embedding is None:
+            query_embedding = self.embedding_service.create_embedding(query)
+        
+        self.vector_index.load(self.db)
+        ranked = self.vector_index.search(
+            query_embedding,
+            limit=limit,
+            kind=KIND_CHUNK,
+            document_ids=document_ids
+        )
+        
+        return self._load_chunks([(chunk_id, score) for chunk_id, _, score in ranked])
+    
+    def search_chunks_lexical(
+        self,
+        query: str,
+        limit: int = 10,
+        document_ids: Optional[List[int]] = None
+    ) -> List[Tuple[DocumentChunk, float]]:
+        """
+        Search chunks by BM25 keyword relevance
+        
+        Args:
+            query: Query text
+            limit: Number of chunks to return
+            document_ids: Optionally restrict the search to these documents
+        
+        Returns:
+            List of (chunk, BM25 score), best first
+        """
+        self.lexical_index.load(self.db)
+        ranked = self.lexical_index.search(query, limit=limit, document_ids=document_ids)
+        
+        return self._load_chunks([(chunk_id, score) for chunk_id, _, score in ranked])
+    
+    def hybrid_search(
+        self,
+        query: str,
+        limit: int = 10,
+        document_ids: Optional[List[int]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Tuple[DocumentChunk, float]]:
+        """
+        Search chunks by combining BM25 and vector rankings
+        
+        Each retriever returns its top candidates, which are merged with
+        reciprocal rank fusion so exact identifiers found by BM25 and
+        paraphrases found by the embedding model both surface.
+        
+        Args:
+            query: Query text
+            limit: Number of chunks to return
+            document_ids: Optionally restrict the search to these documents
+            query_embedding: Precomputed query embedding (skips encoding)
+        
+        Returns:
+            List of (chunk, fused score), best first
+        """
+        settings = self.embedding_service.settings
+        candidates = max(limit, settings.hybrid_candidates)
+        
+        if query_embedding is None:
+            query_embedding = self.embedding_service.create_embedding(query)
+        self.vector_index.load(self.db)
+        self.lexical_index.load(self.db)
+        
+        vector_ranked = self.vector_index.search(
+            query_embedding,
+            limit=candidates,
+            kind=KIND_CHUNK,
+            document_ids=document_ids
+        )
+        lexical_ranked = self.lexical_index.search(query, limit=candidates, document_ids=document_ids)
+        
+        fused = reciprocal_rank_fusion(
+            [
+                [chunk_id for chunk_id, _, _ in vector_ranked],
+                [chunk_id for chunk_id, _, _ in lexical_ranked],
+            ],
+            k=settings.hybrid_rrf_k
+        )
+        
+        return self._load_chunks(fused[:limit])
+    
+    def _load_chunks(self, ranked: List[Tuple[int, float]]) -> List[Tuple[DocumentChunk, float]]:
+        """
+        Fetch ranked chunks in one query, preserving rank order
+        """
+        if not ranked:
+            return []
+        
+        chunks = {
+            chunk.id: chunk
+            for chunk in self.db.query(DocumentChunk).filter(
+                DocumentChunk.id.in_([chunk_id for chunk_id, _ in ranked])
+            ).all()
+        }
         
-        return documents
+        return [
+            (chunks[chunk_id], score)
+            for chunk_id, score in ranked
+            if chunk_id in chunks
+        ]
 
@@ -0,0 +1,180 @@
+"""
+Content-hash embedding cache
+"""
+from collections import OrderedDict
+from typing import Dict, Optional
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+import numpy as np
+
+from config.settings import get_settings
+from utils.embeddings import encode_embedding, decode_embedding
+from utils.helpers import generate_file_hash
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys (Unicode NFC, collapsed whitespace)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by hash(model name, normalized text)
+
+    The memory tier is a bounded LRU; the disk tier stores one raw float32
+    file per key in a sharded directory and survives restarts. Both tiers are
+    consulted before the model's encode is called.
+    """
+
+    def __init__(self, cache_dir: str, max_memory_items: int, dimensions: int):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.dimensions = dimensions
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+        }
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """Build the cache key for a text embedded by a model"""
+        return generate_file_hash(f"{model_name}\n{normalize_text(text)}".encode("utf-8"))
+
+    def get(self, key: str, text_bytes: int = 0) -> Optional[np.ndarray]:
+        """
+        Look up an embedding
+
+        Args:
+            key: Cache key from make_key
+            text_bytes: Size of the text, counted as saved on a hit
+
+        Returns:
+            float32 embedding, or None on a miss
+        """
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                self._stats["bytes_saved"] += text_bytes
+                return embedding
+
+        embedding = self._read_disk(key)
+
+        with self._lock:
+            if embedding is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._stats["bytes_saved"] += text_bytes
+            self._remember(key, embedding)
+        return embedding
+
+    def put(self, key: str, embedding: np.ndarray):
+        """
+        Store an embedding in both tiers
+
+        Args:
+            key: Cache key from make_key
+            embedding: Embedding vector
+        """
+        # Own copy: a row view would keep its whole batch array alive
+        embedding = np.array(embedding, dtype=np.float32, copy=True)
+        with self._lock:
+            self._remember(key, embedding)
+        self._write_disk(key, embedding)
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics
+
+        Returns:
+            Hit/miss counters, hit rate, bytes of text not re-encoded and
+            current memory tier size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["max_memory_items"] = self.max_memory_items
+        return stats
+
+    def clear_memory(self):
+        """Drop the in-memory tier (disk entries are kept)"""
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        """Insert into the LRU tier (caller holds the lock)"""
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        """Sharded on-disk location for a key"""
+        return os.path.join(self.cache_dir, key[:2], key[2:4], f"{key}.f32")
+
+    def _read_disk(self, key: str) -> Optional[np.ndarray]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return decode_embedding(f.read(), self.dimensions)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, embedding: np.ndarray):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so readers never see a partial vector
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(encode_embedding(embedding, "float32"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write embedding cache entry: {e}")
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the process-wide embedding cache
+
+    Returns:
+        Shared EmbeddingCache, or None when caching is disabled
+    """
+    global _cache
+    settings = get_settings()
+    if not settings.embedding_cache_enabled:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    cache_dir=settings.embedding_cache_dir,
+                    max_memory_items=settings.embedding_cache_memory_items,
+                    dimensions=settings.vector_dimensions
+                )
+    return _cache
@@ -0,0 +1,158 @@
+"""
+Dynamic micro-batching scheduler for embedding requests
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import asyncio
+import time
+import numpy as np
+
+from config.settings import get_settings
+from services.embedding_service import EmbeddingService
+
+
+class EmbeddingScheduler:
+    """
+    Collects concurrent embedding requests into batched encode calls
+
+    Callers await embed(); a dispatcher task waits up to max_wait_ms (or
+    until max_batch texts are queued), runs one encode for the whole batch
+    in a worker thread and resolves every caller's future. While a batch is
+    encoding the next one accumulates, so throughput rises with load while
+    an idle request waits at most max_wait_ms.
+    """
+
+    def __init__(self, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.embedding_service = EmbeddingService()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._latencies = deque(maxlen=2048)
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "max_batch_seen": 0,
+            "errors": 0,
+        }
+
+    async def start(self):
+        """Start the dispatcher on the running event loop"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the dispatcher, failing any requests still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Embedding scheduler stopped"))
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed one text as part of the next batch
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Embedding as a list of floats
+        """
+        if not text:
+            return [0.0] * self.embedding_service.settings.vector_dimensions
+
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    def metrics(self) -> Dict:
+        """
+        Get scheduler metrics
+
+        Returns:
+            Queue depth, request/batch counters, average batch size and
+            p50/p99 request latency in milliseconds
+        """
+        stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize() if self._queue else 0
+        stats["avg_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        stats["max_batch"] = self.max_batch
+        stats["max_wait_ms"] = self.max_wait * 1000
+        if self._latencies:
+            latencies = np.fromiter(self._latencies, dtype=np.float64)
+            stats["latency_p50_ms"] = float(np.percentile(latencies, 50) * 1000)
+            stats["latency_p99_ms"] = float(np.percentile(latencies, 99) * 1000)
+        return stats
+
+    async def _run(self):
+        """Dispatcher loop: gather a batch, encode it, fan results out"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                # Take whatever is already queued without waiting
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _, _ in batch]
+            try:
+                embeddings = await loop.run_in_executor(
+                    self._executor, self.embedding_service.create_embeddings_array, texts
+                )
+            except Exception as e:
+                self._stats["errors"] += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            for (_, future, enqueued), embedding in zip(batch, embeddings):
+                self._latencies.append(now - enqueued)
+                if not future.done():
+                    future.set_result(embedding.tolist())
+
+            self._stats["requests"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+
+
+_scheduler: Optional[EmbeddingScheduler] = None
+
+
+def get_embedding_scheduler() -> EmbeddingScheduler:
+    """
+    Get the process-wide embedding scheduler
+
+    Returns:
+        Shared EmbeddingScheduler instance
+    """
+    global _scheduler
+    if _scheduler is None:
+        settings = get_settings()
+        _scheduler = EmbeddingScheduler(
+            max_batch=settings.embedding_scheduler_max_batch,
+            max_wait_ms=settings.embedding_scheduler_max_wait_ms
+        )
+    return _scheduler
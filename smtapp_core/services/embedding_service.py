@@ -1,11 +1,105 @@
 """
 Embedding service for creating vector embeddings
 """
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
+import threading
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 from config.settings import get_settings
+from services.embedding_cache import EmbeddingCache, get_embedding_cache
+
+
+class EmbeddingModelRegistry:
+    """
+    Process-wide registry of loaded embedding models
+    
+    Each model is loaded from disk once and shared by every EmbeddingService,
+    so per-request services no longer pay the load cost. Models are keyed by
+    backend as well as name: "torch" loads a SentenceTransformer, "onnx"
+    loads (exporting on first use) an ONNX Runtime model with the same
+    encode() interface.
+    """
+    
+    def __init__(self):
+        self._models: Dict[str, object] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, model_name: str, backend: str = "torch"):
+        """
+        Get a loaded model, loading it on first use
+        
+        Args:
+            model_name: SentenceTransformer model name or path
+            backend: "torch" or "onnx"
+            
+        Returns:
+            Shared model instance
+        """
+        key = f"{backend}:{model_name}"
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                start = time.perf_counter()
+                model = self._load(model_name, backend)
+                self._models[key] = model
+                print(f"Loaded {backend} embedding model {model_name} in {time.perf_counter() - start:.2f}s")
+            return model
+    
+    def _load(self, model_name: str, backend: str):
+        """Load a model for the given backend"""
+        if backend == "torch":
+            # Imported here: sentence-transformers pulls in torch, which
+            # should not load just because the app or a service is imported
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name)
+        if backend == "onnx":
+            from services.onnx_embedding import load_onnx_model
+            settings = get_settings()
+            return load_onnx_model(
+                model_name,
+                settings.onnx_model_dir,
+                quantize=settings.onnx_quantize,
+                num_threads=settings.onnx_threads
+            )
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    
+    def warmup(self, model_name: str, backend: str = "torch") -> float:
+        """
+        Load a model and run a throwaway encode
+        
+        The first encode call initializes tokenizer and inference state, so
+        doing it at startup keeps that cost off the first user request.
+        
+        Args:
+            model_name: SentenceTransformer model name or path
+            backend: "torch" or "onnx"
+            
+        Returns:
+            Seconds spent loading and warming up
+        """
+        start = time.perf_counter()
+        model = self.get(model_name, backend)
+        model.encode(["warmup"], convert_to_numpy=True)
+        elapsed = time.perf_counter() - start
+        print(f"Embedding model {model_name} warmed up in {elapsed:.2f}s")
+        return elapsed
+    
+    def is_loaded(self, model_name: str, backend: str = "torch") -> bool:
+        """Check whether a model has been loaded"""
+        return f"{backend}:{model_name}" in self._models
+
+
+_registry = EmbeddingModelRegistry()
+
+
+def get_model_registry() -> EmbeddingModelRegistry:
+    """Get the process-wide embedding model registry"""
+    return _registry
 
 
 class EmbeddingService:
@@ -14,11 +108,76 @@ class EmbeddingService:
     def __init__(self):
         self.settings = get_settings()
         self.model = None
+        self.cache = get_embedding_cache()
     
     def _load_model(self):
-        """Lazy load the embedding model"""
+        """Get the shared embedding model from the registry"""
         if self.model is None:
-            self.model = SentenceTransformer(self.settings.default_embeddings_model)
+            self.model = get_model_registry().get(
+                self.settings.default_embeddings_model,
+                self.settings.embedding_backend
+            )
+    
+    @property
+    def model_key(self) -> str:
+        """
+        Identity of the embedding function, used to key cached embeddings
+        
+        ONNX and int8 outputs drift slightly from PyTorch, so each variant
+        gets its own cache entries.
+        """
+        model_name = self.settings.default_embeddings_model
+        if self.settings.embedding_backend == "onnx":
+            return f"{model_name}#onnx-{'int8' if self.settings.onnx_quantize else 'fp32'}"
+        return model_name
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts, serving repeated texts from the embedding cache
+        
+        Only cache misses reach the model, and identical texts within one
+        call are encoded once.
+        
+        Args:
+            texts: Non-empty texts to embed
+            
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        if self.cache is None:
+            self._load_model()
+            embeddings = self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+            return embeddings.astype(np.float32, copy=False)
+        
+        model_name = self.model_key
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        misses: Dict[str, List[int]] = {}
+        
+        for i, text in enumerate(texts):
+            key = EmbeddingCache.make_key(model_name, text)
+            if key in misses:
+                misses[key].append(i)
+                continue
+            cached = self.cache.get(key, text_bytes=len(text.encode("utf-8")))
+            if cached is None:
+                misses[key] = [i]
+            else:
+                results[i] = cached
+        
+        if misses:
+            self._load_model()
+            keys = list(misses)
+            embeddings = self.model.encode(
+                [texts[misses[key][0]] for key in keys],
+                batch_size=len(keys),
+                convert_to_numpy=True
+            ).astype(np.float32, copy=False)
+            for key, embedding in zip(keys, embeddings):
+                self.cache.put(key, embedding)
+                for i in misses[key]:
+                    results[i] = embedding
+        
+        return np.stack(results)
     
     def create_embedding(self, text: str) -> List[float]:
         """
@@ -33,10 +192,8 @@ class EmbeddingService:
         if not text:
             return [0.0] * self.settings.vector_dimensions
         
-        self._load_model()
-        
         # Create embedding
-        embedding = self.model.encode(text, convert_to_numpy=True)
+        embedding = self._encode([text])[0]
         
         # Convert to list
         return embedding.tolist()
@@ -54,14 +211,56 @@ class EmbeddingService:
         if not texts:
             return []
         
-        self._load_model()
-        
         # Create embeddings
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
+        embeddings = self._encode(texts)
         
         # Convert to list
         return embeddings.tolist()
     
+    def create_embeddings_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Create embeddings for multiple texts as one float32 array
+        
+        Args:
+            texts: List of texts to embed
+            
+        Returns:
+            Array of shape (len(texts), dim)
+        """
+        if not texts:
+            return np.empty((0, self.settings.vector_dimensions), dtype=np.float32)
+        
+        return self._encode(texts)
+    
+    def iter_embedding_batches(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None
+    ) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """
+        Embed texts in length-sorted batches
+        
+        Texts of similar length are grouped together so each encode call
+        pads as little as possible. Batches are yielded as soon as they are
+        encoded so callers can persist them incrementally.
+        
+        Args:
+            texts: List of texts to embed
+            batch_size: Texts per encode call (defaults to settings)
+            
+        Yields:
+            Tuples of (indices into texts, float32 array of shape (len(indices), dim))
+        """
+        if not texts:
+            return
+        
+        batch_size = batch_size or self.settings.embedding_batch_size
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            yield indices, self._encode([texts[i] for i in indices])
+    
     def compute_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """
         Compute cosine similarity between two embeddings
@@ -0,0 +1,366 @@
+"""
+Persistent background queue for document ingestion jobs
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import os
+import threading
+import time
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from config.settings import get_settings
+from models.document import Document
+from models.ingestion_job import IngestionJob
+
+
+class IngestionQueue:
+    """
+    Database-backed job queue with a pool of worker threads
+
+    Jobs live in the ingestion_jobs table, so queued work survives restarts.
+    Workers claim the highest-priority available job with a conditional
+    UPDATE (safe across threads and processes), run
+    DocumentService.process_document off the event loop and retry failures
+    with exponential backoff. Per-type limits cap how many jobs of one file
+    type run at once, so a burst of videos cannot occupy every worker.
+
+    A claimed job is leased: the owning process refreshes its heartbeat_at
+    while it runs, and any process requeues running jobs whose heartbeat is
+    older than lease_seconds (their process died or hung). Jobs still
+    running in a live process are left alone.
+
+    Workers are threads in the API process so finished documents go straight
+    into the in-process vector and lexical indexes.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 5.0,
+        poll_interval_seconds: float = 1.0,
+        lease_seconds: float = 60.0,
+        type_limits: Optional[Dict[str, int]] = None,
+        priorities: Optional[Dict[str, int]] = None
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff_seconds
+        self.poll_interval = poll_interval_seconds
+        self.lease = lease_seconds
+        self.type_limits = dict(type_limits or {})
+        self.priorities = dict(priorities or {})
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._running: Dict[str, int] = {}
+        self._running_lock = threading.Lock()
+        # Jobs claimed by this process, heartbeated until they finish
+        self._claimed: Dict[int, str] = {}
+        self._stats = {"completed": 0, "failed": 0, "retried": 0}
+
+    def start(self):
+        """Requeue jobs whose lease expired and start the workers"""
+        if self._threads:
+            return
+
+        self._stop.clear()
+        self._requeue_expired()
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ingest-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="ingest-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        print(f"Ingestion queue started with {self.workers} workers")
+
+    def stop(self, timeout: float = 30.0):
+        """
+        Stop the workers, letting running jobs finish
+
+        Args:
+            timeout: Seconds to wait for each worker
+        """
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def enqueue(
+        self,
+        db: Session,
+        document_id: int,
+        job_type: str,
+        priority: Optional[int] = None
+    ) -> IngestionJob:
+        """
+        Queue a document for processing
+
+        Args:
+            db: Database session
+            document_id: Document ID
+            job_type: File type of the document
+            priority: Explicit priority (default: configured priority for the type)
+
+        Returns:
+            Created job
+        """
+        job = IngestionJob(
+            document_id=document_id,
+            job_type=job_type,
+            status="queued",
+            priority=priority if priority is not None else self.priorities.get(job_type, 0),
+            max_attempts=self.max_attempts,
+            available_at=datetime.utcnow()
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def get_job(self, db: Session, job_id: int) -> Optional[IngestionJob]:
+        """Get a job by ID"""
+        return db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+
+    def stats(self, db: Session) -> Dict:
+        """
+        Get queue statistics
+
+        Args:
+            db: Database session
+
+        Returns:
+            Job counts by status, running jobs by type and worker counters
+        """
+        counts = dict(
+            db.query(IngestionJob.status, func.count(IngestionJob.id)).group_by(IngestionJob.status).all()
+        )
+        with self._running_lock:
+            running = {job_type: n for job_type, n in self._running.items() if n}
+            outcomes = dict(self._stats)
+        return {
+            "workers": self.workers,
+            "jobs": counts,
+            "running_by_type": running,
+            "type_limits": self.type_limits,
+            **outcomes,
+        }
+
+    def _count(self, outcome: str):
+        """Increment an outcome counter"""
+        with self._running_lock:
+            self._stats[outcome] += 1
+
+    def _heartbeat(self):
+        """Keep the leases of this process's jobs fresh and recover expired ones"""
+        interval = self.lease / 3
+        while not self._stop.wait(interval):
+            try:
+                with self._running_lock:
+                    claimed = dict(self._claimed)
+                db = SessionLocal()
+                try:
+                    if claimed:
+                        db.query(IngestionJob).filter(
+                            IngestionJob.id.in_(list(claimed)),
+                            IngestionJob.worker.in_(set(claimed.values())),
+                            IngestionJob.status == "running"
+                        ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+                        db.commit()
+                finally:
+                    db.close()
+                self._requeue_expired()
+            except Exception as e:
+                print(f"Error refreshing ingestion job leases: {e}")
+
+    def _requeue_expired(self):
+        """Requeue running jobs whose owning process stopped heartbeating"""
+        expired_before = datetime.utcnow() - timedelta(seconds=self.lease)
+        db = SessionLocal()
+        try:
+            recovered = db.query(IngestionJob).filter(
+                IngestionJob.status == "running",
+                or_(
+                    IngestionJob.heartbeat_at < expired_before,
+                    and_(IngestionJob.heartbeat_at.is_(None), IngestionJob.started_at < expired_before)
+                )
+            ).update({"status": "queued", "worker": None}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if recovered:
+            print(f"Requeued {recovered} ingestion jobs whose lease expired")
+
+    def _work(self):
+        """Worker loop: claim a job, run it, repeat"""
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"Error claiming ingestion job: {e}")
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            job_id, document_id, job_type = job
+            try:
+                self._run(job_id, document_id)
+            finally:
+                with self._running_lock:
+                    self._running[job_type] -= 1
+                    self._claimed.pop(job_id, None)
+                with self._wakeup:
+                    # A slot for this type is free again
+                    self._wakeup.notify()
+
+    def _claim(self):
+        """
+        Claim the next runnable job
+
+        Returns:
+            (job id, document id, job type) or None
+        """
+        db = SessionLocal()
+        try:
+            with self._running_lock:
+                saturated = [
+                    job_type for job_type, limit in self.type_limits.items()
+                    if limit and self._running.get(job_type, 0) >= limit
+                ]
+
+            query = db.query(IngestionJob.id, IngestionJob.document_id, IngestionJob.job_type).filter(
+                IngestionJob.status == "queued",
+                IngestionJob.available_at <= datetime.utcnow()
+            )
+            if saturated:
+                query = query.filter(IngestionJob.job_type.notin_(saturated))
+            candidates = query.order_by(IngestionJob.priority.desc(), IngestionJob.id).limit(8).all()
+
+            for job_id, document_id, job_type in candidates:
+                with self._running_lock:
+                    limit = self.type_limits.get(job_type, 0)
+                    if limit and self._running.get(job_type, 0) >= limit:
+                        continue
+                    # Reserve the slot before claiming so two workers cannot
+                    # both pass the limit check
+                    self._running[job_type] = self._running.get(job_type, 0) + 1
+
+                now = datetime.utcnow()
+                claimed = db.query(IngestionJob).filter(
+                    IngestionJob.id == job_id,
+                    IngestionJob.status == "queued"
+                ).update({
+                    "status": "running",
+                    "attempts": IngestionJob.attempts + 1,
+                    "worker": _worker_name(),
+                    "started_at": now,
+                    "heartbeat_at": now,
+                }, synchronize_session=False)
+                db.commit()
+
+                if claimed:
+                    with self._running_lock:
+                        self._claimed[job_id] = _worker_name()
+                    return job_id, document_id, job_type
+                with self._running_lock:
+                    self._running[job_type] -= 1
+            return None
+        finally:
+            db.close()
+
+    def _run(self, job_id: int, document_id: int):
+        """Process one claimed job and record the outcome"""
+        # Imported here: document_service pulls in every processor and the
+        # embedding model stack
+        from services.document_service import DocumentService
+
+        db = SessionLocal()
+        start = time.perf_counter()
+        try:
+            error = None
+            try:
+                if db.query(Document.id).filter(Document.id == document_id).first() is None:
+                    raise LookupError(f"Document {document_id} no longer exists")
+                DocumentService(db).process_document(document_id)
+            except Exception as e:
+                db.rollback()
+                error = e
+
+            job = self.get_job(db, job_id)
+            if job is None:
+                return
+            if job.worker != _worker_name():
+                # The lease expired and the job was requeued; its new owner records the outcome
+                print(f"Ingestion job {job_id} was reclaimed by another worker, discarding this run")
+                return
+
+            if error is None:
+                job.status = "completed"
+                job.error_message = None
+                job.finished_at = datetime.utcnow()
+                self._count("completed")
+                print(f"Ingestion job {job_id} (document {document_id}) completed in {time.perf_counter() - start:.2f}s")
+            elif job.attempts < job.max_attempts and not isinstance(error, LookupError):
+                delay = self.retry_backoff * (2 ** (job.attempts - 1))
+                job.status = "queued"
+                job.error_message = str(error)
+                job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+                self._count("retried")
+                print(f"Ingestion job {job_id} failed (attempt {job.attempts}/{job.max_attempts}), retrying in {delay:.0f}s: {error}")
+            else:
+                job.status = "failed"
+                job.error_message = str(error)
+                job.finished_at = datetime.utcnow()
+                self._count("failed")
+                print(f"Ingestion job {job_id} failed: {error}")
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error recording ingestion job {job_id}: {e}")
+        finally:
+            db.close()
+
+
+def _worker_name() -> str:
+    """Identify the calling worker thread across processes"""
+    return f"{os.getpid()}:{threading.current_thread().name}"
+
+
+_queue: Optional[IngestionQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_ingestion_queue() -> IngestionQueue:
+    """
+    Get the process-wide ingestion queue
+
+    Returns:
+        Shared IngestionQueue instance
+    """
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                settings = get_settings()
+                _queue = IngestionQueue(
+                    workers=settings.ingestion_workers,
+                    max_attempts=settings.ingestion_max_attempts,
+                    retry_backoff_seconds=settings.ingestion_retry_backoff_seconds,
+                    poll_interval_seconds=settings.ingestion_poll_interval_seconds,
+                    lease_seconds=settings.ingestion_lease_seconds,
+                    type_limits=settings.ingestion_type_limits,
+                    priorities=settings.ingestion_priorities
+                )
+    return _queue
@@ -0,0 +1,386 @@
+"""
+BM25 inverted index over document chunk text
+"""
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+import re
+import threading
+import numpy as np
+from sqlalchemy.orm import Session
+
+from config.settings import get_settings
+from models.document import DocumentChunk
+from services.vector_index import _top_k
+
+
+# Kana and CJK ideographs: not space-separated, so each character is a term
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+# Words in any script plus identifiers such as INV-2024-0012, SKU_77A or v1.2.3
+_WORD = rf"[^\W{_CJK}]+"
+_TOKEN = re.compile(rf"[{_CJK}]|{_WORD}(?:[-_./]{_WORD})*")
+_SPLIT = re.compile(r"[-_./]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into casefolded index terms
+
+    Compound identifiers are indexed whole and by their parts, so
+    "INV-2024-0012" matches queries for the full id or for "0012".
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.casefold()):
+        tokens.append(token)
+        if _SPLIT.search(token):
+            tokens.extend(part for part in _SPLIT.split(token) if part)
+    return tokens
+
+
+class _Column:
+    """Growable NumPy array of per-row values"""
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype, values: Optional[np.ndarray] = None):
+        if values is None:
+            self.data = np.empty(1024, dtype=dtype)
+            self.size = 0
+        else:
+            self.data = np.ascontiguousarray(values, dtype=dtype)
+            self.size = len(values)
+
+    def append(self, value):
+        if self.size == len(self.data):
+            # Grow into a new array: snapshots keep reading the old one
+            grown = np.empty(max(1024, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def values(self) -> np.ndarray:
+        return self.data[:self.size]
+
+
+_NO_ROWS = np.empty(0, dtype=np.int64)
+_NO_TFS = np.empty(0, dtype=np.int32)
+
+
+class _Postings:
+    """
+    Postings of one term: a frozen NumPy part plus an append buffer
+
+    The frozen arrays are never modified, only replaced, so a search can
+    score them after releasing the index lock.
+    """
+
+    __slots__ = ("rows", "tfs", "tail_rows", "tail_tfs")
+
+    def __init__(self, rows: np.ndarray = _NO_ROWS, tfs: np.ndarray = _NO_TFS):
+        self.rows = rows
+        self.tfs = tfs
+        self.tail_rows = array("q")
+        self.tail_tfs = array("i")
+
+    def append(self, row: int, tf: int):
+        self.tail_rows.append(row)
+        self.tail_tfs.append(tf)
+        # Merge the buffer once it reaches 1/8 of the frozen part: amortized linear
+        if len(self.tail_rows) >= max(1024, len(self.rows) >> 3):
+            self.rows, self.tfs = self.merged()
+            self.tail_rows = array("q")
+            self.tail_tfs = array("i")
+
+    def snapshot(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Immutable (rows, term frequencies) parts covering every posting so far"""
+        parts = [(self.rows, self.tfs)]
+        if self.tail_rows:
+            parts.append((np.array(self.tail_rows, dtype=np.int64), np.array(self.tail_tfs, dtype=np.int32)))
+        return parts
+
+    def merged(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All postings as one (rows, term frequencies) pair"""
+        if not self.tail_rows:
+            return self.rows, self.tfs
+        return (
+            np.concatenate([self.rows, np.array(self.tail_rows, dtype=np.int64)]),
+            np.concatenate([self.tfs, np.array(self.tail_tfs, dtype=np.int32)]),
+        )
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 index over DocumentChunk.content
+
+    Postings are compact typed arrays (row, term frequency) appended as
+    chunks are ingested. A query gathers the postings of its terms and
+    scores all matching rows at once with np.bincount, so the cost depends
+    on the posting list lengths rather than the corpus size.
+
+    Removing a document only marks its rows dead; document frequencies and
+    the average length are computed over live rows. Once dead rows exceed
+    compact_ratio of all rows the index is rebuilt without them, releasing
+    their postings. Searches hold the lock only to take a snapshot of the
+    arrays they read and score outside it.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, compact_ratio: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._postings: Dict[str, _Postings] = {}
+        self._chunk_ids = _Column(np.int64)
+        self._document_ids = _Column(np.int64)
+        self._lengths = _Column(np.int32)
+        self._alive = _Column(np.uint8)
+        self._rows_by_document: Dict[int, List[int]] = {}
+        self._total_length = 0
+        self._live_rows = 0
+        self._dead_rows = 0
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return self._live_rows
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, db: Session, batch_size: int = 5000):
+        """
+        Build the index from stored chunks (once per process)
+
+        Args:
+            db: Database session
+            batch_size: Chunks read per query
+        """
+        with self._lock:
+            if self._loaded:
+                return
+
+            last_id = 0
+            while True:
+                rows = db.query(
+                    DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.content
+                ).filter(DocumentChunk.id > last_id).order_by(DocumentChunk.id).limit(batch_size).all()
+                if not rows:
+                    break
+                for chunk_id, document_id, content in rows:
+                    self._add_row(chunk_id, document_id, content or "")
+                last_id = rows[-1][0]
+
+            self._loaded = True
+            print(f"Lexical index loaded: {self._live_rows} chunks, {len(self._postings)} terms")
+
+    def add(self, chunk_ids: Sequence[int], document_ids: Sequence[int], texts: Sequence[str]):
+        """
+        Index new chunks
+
+        Args:
+            chunk_ids: Chunk IDs
+            document_ids: Owning document id for each chunk
+            texts: Chunk contents
+        """
+        if len(chunk_ids) == 0:
+            return
+
+        with self._lock:
+            if not self._loaded:
+                # The first load() reads these chunks from the database
+                return
+
+            # Skip chunks a concurrent load() already picked up
+            existing = self._chunk_ids.values()[self._alive.values() == 1]
+            fresh = ~np.isin(np.asarray(chunk_ids, dtype=np.int64), existing)
+            for chunk_id, document_id, text, is_fresh in zip(chunk_ids, document_ids, texts, fresh):
+                if is_fresh:
+                    self._add_row(chunk_id, document_id, text or "")
+
+    def remove_document(self, document_id: int) -> int:
+        """
+        Remove every chunk of a document from search results
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            Number of chunks removed
+        """
+        with self._lock:
+            rows = self._rows_by_document.pop(document_id, [])
+            alive = self._alive.data
+            for row in rows:
+                if alive[row]:
+                    alive[row] = 0
+                    self._live_rows -= 1
+                    self._dead_rows += 1
+                    self._total_length -= int(self._lengths.data[row])
+            if self._dead_rows and self._dead_rows > self.compact_ratio * self._alive.size:
+                self._compact()
+            return len(rows)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        document_ids: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, int, float]]:
+        """
+        Rank chunks by BM25 score
+
+        Args:
+            query: Query text
+            limit: Number of results
+            document_ids: Restrict to chunks of these documents
+
+        Returns:
+            List of (chunk id, document id, BM25 score), best first
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            if self._live_rows == 0:
+                return []
+            n = self._chunk_ids.size
+            live_rows = self._live_rows
+            avg_length = self._total_length / live_rows
+            chunk_ids = self._chunk_ids.data
+            owners = self._document_ids.data
+            lengths = self._lengths.data
+            # Rows removed during the search may still be scored; that is harmless
+            alive = self._alive.data
+            postings = [self._postings[term].snapshot() for term in terms if term in self._postings]
+
+        rows_parts = []
+        weight_parts = []
+        for parts in postings:
+            live_parts = []
+            for rows, tf in parts:
+                live = alive[rows] == 1
+                live_parts.append((rows[live], tf[live]))
+            df = sum(len(rows) for rows, _ in live_parts)
+            if df == 0:
+                continue
+            idf = math.log(1.0 + (live_rows - df + 0.5) / (df + 0.5))
+            for rows, tf in live_parts:
+                tf = tf.astype(np.float32)
+                norm = self.k1 * (1.0 - self.b + self.b * lengths[rows] / avg_length)
+                rows_parts.append(rows)
+                weight_parts.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+
+        if not rows_parts:
+            return []
+
+        rows = np.concatenate(rows_parts)
+        weights = np.concatenate(weight_parts)
+        dense = np.bincount(rows, weights=weights, minlength=n)
+        candidates = np.flatnonzero(dense)
+        scores = dense[candidates].astype(np.float32)
+
+        candidate_owners = owners[candidates]
+        if document_ids is not None:
+            allowed = np.isin(candidate_owners, np.asarray(list(document_ids), dtype=np.int64))
+            scores[~allowed] = -np.inf
+
+        top = _top_k(scores, limit)
+        return [
+            (int(chunk_ids[candidates[i]]), int(candidate_owners[i]), float(scores[i]))
+            for i in top
+            if scores[i] != -np.inf
+        ]
+
+    def _add_row(self, chunk_id: int, document_id: int, text: str):
+        """Append one chunk (caller holds the lock)"""
+        row = self._chunk_ids.size
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+
+        self._chunk_ids.append(chunk_id)
+        self._document_ids.append(document_id)
+        self._lengths.append(length)
+        self._alive.append(1)
+        self._rows_by_document.setdefault(document_id, []).append(row)
+        self._total_length += length
+        self._live_rows += 1
+
+        for term, tf in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Postings()
+            postings.append(row, tf)
+
+    def _compact(self):
+        """Rebuild the arrays without dead rows (caller holds the lock)"""
+        alive = self._alive.values() == 1
+        keep = np.flatnonzero(alive)
+        # Old row -> new row for live rows
+        renumber = np.cumsum(alive, dtype=np.int64) - 1
+
+        postings = {}
+        for term, term_postings in self._postings.items():
+            rows, tfs = term_postings.merged()
+            live = alive[rows]
+            if live.any():
+                postings[term] = _Postings(renumber[rows[live]], tfs[live])
+
+        self._postings = postings
+        self._chunk_ids = _Column(np.int64, self._chunk_ids.values()[keep])
+        self._document_ids = _Column(np.int64, self._document_ids.values()[keep])
+        self._lengths = _Column(np.int32, self._lengths.values()[keep])
+        self._alive = _Column(np.uint8, np.ones(len(keep), dtype=np.uint8))
+        self._rows_by_document = {
+            document_id: renumber[rows].tolist()
+            for document_id, rows in self._rows_by_document.items()
+        }
+        self._dead_rows = 0
+        print(f"Lexical index compacted: {len(keep)} live chunks, {len(postings)} terms")
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]],
+    k: int = 60
+) -> List[Tuple[int, float]]:
+    """
+    Combine several rankings with reciprocal rank fusion
+
+    Args:
+        rankings: Lists of ids, best first
+        k: RRF damping constant
+
+    Returns:
+        List of (id, fused score), best first
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+_index: Optional[LexicalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """
+    Get the process-wide lexical index
+
+    Returns:
+        Shared LexicalIndex instance
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                settings = get_settings()
+                _index = LexicalIndex(
+                    k1=settings.bm25_k1,
+                    b=settings.bm25_b,
+                    compact_ratio=settings.lexical_compact_ratio
+                )
+    return _index
@@ -1,11 +1,12 @@
 """
 Model service for managing AI models
 """
-from typing import List, Dict, Optional
-import httpx
-import ollama
+from typing import AsyncIterator, List, Dict, Optional
+from functools import partial
 
 from config.settings import get_settings, get_toml_config
+from services.ollama_client import get_ollama_client
+from services.request_coalescer import get_request_coalescer
 
 
 class ModelService:
@@ -14,6 +15,8 @@ class ModelService:
     def __init__(self):
         self.settings = get_settings()
         self.ollama_config = get_toml_config("ollama")
+        self.ollama = get_ollama_client()
+        self.coalescer = get_request_coalescer()
     
     async def list_available_models(self) -> List[Dict]:
         """
@@ -47,27 +50,39 @@ class ModelService:
         
         return models
     
+    def get_context_length(self, model_name: str) -> int:
+        """
+        Context window of a model, from [ollama.models] in the TOML config
+        
+        Args:
+            model_name: Model name, with or without a tag ("llama3:8b")
+        
+        Returns:
+            Context length in tokens (chat default for unlisted models)
+        """
+        configured = (self.ollama_config or {}).get("models", {})
+        for candidate in (model_name, model_name.split(":")[0]):
+            for model_info in configured.values():
+                if model_info.get("name") == candidate and model_info.get("context_length"):
+                    return int(model_info["context_length"])
+        return self.settings.chat_default_context_length
+    
     async def get_ollama_models(self) -> List[Dict]:
         """
         Get list of Ollama models
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.settings.ollama_base_url}/api/tags",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                return [
-                    {
-                        "name": model["name"],
-                        "size": model.get("size", 0),
-                        "context_length": 4096  # Default, could be in model details
-                    }
-                    for model in data.get("models", [])
-                ]
+            response = await self.ollama.request("GET", "/api/tags", route="tags")
+            data = response.json()
+            
+            return [
+                {
+                    "name": model["name"],
+                    "size": model.get("size", 0),
+                    "context_length": 4096  # Default, could be in model details
+                }
+                for model in data.get("models", [])
+            ]
         except Exception as e:
             raise Exception(f"Failed to fetch Ollama models: {str(e)}")
     
@@ -76,13 +91,8 @@ class ModelService:
         Pull an Ollama model
         """
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    f"{self.settings.ollama_base_url}/api/pull",
-                    json={"name": model_name}
-                )
-                response.raise_for_status()
-                return {"status": "success", "model": model_name}
+            await self.ollama.request("POST", "/api/pull", route="pull", json={"name": model_name})
+            return {"status": "success", "model": model_name}
         except Exception as e:
             raise Exception(f"Failed to pull model: {str(e)}")
     
@@ -97,17 +107,86 @@ class ModelService:
     ) -> str:
         """
         Generate a response from the AI model
+        
+        Concurrent calls with the same model, messages, context and
+        temperature share one generation (see RequestCoalescer).
         """
         if model_provider == "ollama":
-            return await self._generate_ollama_response(
+            generate = partial(
+                self._generate_ollama_response,
                 messages=messages,
                 model_name=model_name,
                 context=context,
                 temperature=temperature
             )
+            if self.coalescer is None:
+                return await generate()
+            key = self.coalescer.fingerprint(
+                provider=model_provider, model=model_name, messages=messages,
+                context=context, temperature=temperature
+            )
+            return await self.coalescer.run(key, generate)
         else:
             raise ValueError(f"Unsupported model provider: {model_provider}")
     
+    async def stream_response(
+        self,
+        messages: List[Dict],
+        model_name: str,
+        model_provider: str = "ollama",
+        context: Optional[str] = None,
+        temperature: float = 0.7
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response from the AI model as it is generated
+        
+        Concurrent identical requests subscribe to one upstream stream.
+        
+        Yields:
+            Pieces of the response text, in order
+        """
+        if model_provider != "ollama":
+            raise ValueError(f"Unsupported model provider: {model_provider}")
+        
+        generate = partial(self._stream_ollama_response, messages, model_name, context)
+        if self.coalescer is None:
+            tokens = generate()
+        else:
+            key = self.coalescer.fingerprint(
+                provider=model_provider, model=model_name, messages=messages,
+                context=context, temperature=temperature, stream=True
+            )
+            tokens = self.coalescer.stream(key, generate)
+        try:
+            async for token in tokens:
+                yield token
+        finally:
+            await tokens.aclose()
+    
+    async def _stream_ollama_response(
+        self,
+        messages: List[Dict],
+        model_name: str,
+        context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response using Ollama
+        """
+        stream = self.ollama.stream_chat(
+            model=model_name,
+            messages=self._ollama_messages(messages, context)
+        )
+        try:
+            async for part in stream:
+                token = part.get("message", {}).get("content")
+                if token:
+                    yield token
+        except Exception as e:
+            raise Exception(f"Ollama error: {str(e)}")
+        finally:
+            # Return the connection to the pool even when the consumer stops early
+            await stream.aclose()
+    
     async def _generate_ollama_response(
         self,
         messages: List[Dict],
@@ -119,24 +198,24 @@ class ModelService:
         Generate response using Ollama
         """
         try:
-            # Add context to the system message if provided
-            if context:
-                system_message = {
-                    "role": "system",
-                    "content": f"Use the following context to answer questions:\n{context}"
-                }
-                messages = [system_message] + messages
-            
-            # Use ollama library
-            client = ollama.Client(host=self.settings.ollama_base_url)
-            
-            response = client.chat(
+            # Shared pooled client: no connection setup per message, and the
+            # event loop stays free while the model generates
+            response = await self.ollama.chat(
                 model=model_name,
-                messages=messages
+                messages=self._ollama_messages(messages, context)
             )
             
             return response["message"]["content"]
             
         except Exception as e:
             raise Exception(f"Ollama error: {str(e)}")
-
+    
+    def _ollama_messages(self, messages: List[Dict], context: Optional[str] = None) -> List[Dict]:
+        """Prepend the retrieved context as a system message if provided"""
+        if context:
+            system_message = {
+                "role": "system",
+                "content": f"Use the following context to answer questions:\n{context}"
+            }
+            messages = [system_message] + messages
+        return messages
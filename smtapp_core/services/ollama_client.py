@@ -0,0 +1,171 @@
+"""
+Shared pooled HTTP client for the Ollama API
+"""
+from typing import AsyncIterator, Dict, List, Optional
+import importlib.util
+import json
+import httpx
+
+from config.settings import get_settings
+
+
+class OllamaError(Exception):
+    """Error reported by the Ollama server"""
+
+    def __init__(self, message: str, status_code: int = -1):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OllamaClient:
+    """
+    One keep-alive connection pool for all traffic to Ollama
+
+    Chat, model listing, pulls and health checks share a single
+    httpx.AsyncClient opened at startup, so calls reuse warm connections
+    instead of paying client construction (SSL context, pool) and TCP setup
+    every time. Each route gets its own timeout: generation is bounded by
+    ollama_timeout between bytes, metadata calls fail fast. HTTP/2 is
+    negotiated when the h2 package is installed and the server offers it
+    (https only; plain http stays on pooled HTTP/1.1 keep-alive).
+    """
+
+    CONNECT_TIMEOUT = 5.0
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 120.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self.timeouts = {
+            "chat": httpx.Timeout(timeout, connect=self.CONNECT_TIMEOUT),
+            # Pulls download gigabytes: no overall bound, but a stalled
+            # transfer still fails after ollama_timeout without a byte
+            "pull": httpx.Timeout(timeout, connect=self.CONNECT_TIMEOUT),
+            "tags": httpx.Timeout(min(timeout, 10.0), connect=self.CONNECT_TIMEOUT),
+            "health": httpx.Timeout(min(timeout, 5.0), connect=min(timeout, 5.0)),
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        """Open the connection pool"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeouts["chat"],
+                limits=self.limits,
+                http2=self.http2
+            )
+
+    async def stop(self):
+        """Close the connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, method: str, path: str, route: str = "chat", **kwargs) -> httpx.Response:
+        """
+        Send a request over the shared pool
+
+        Args:
+            method: HTTP method
+            path: API path (e.g. "/api/tags")
+            route: Timeout profile: chat, pull, tags or health
+
+        Returns:
+            Response with a successful status
+
+        Raises:
+            OllamaError: If the server answers with an error status
+        """
+        await self.start()
+        response = await self._client.request(method, path, timeout=self.timeouts[route], **kwargs)
+        if response.is_error:
+            raise OllamaError(response.text, response.status_code)
+        return response
+
+    async def chat(self, model: str, messages: List[Dict], options: Optional[Dict] = None) -> Dict:
+        """
+        Generate a complete chat response
+
+        Args:
+            model: Model name
+            messages: Chat messages (role, content)
+            options: Model options (temperature, ...)
+
+        Returns:
+            Ollama chat response
+        """
+        response = await self.request(
+            "POST",
+            "/api/chat",
+            json={"model": model, "messages": messages, "stream": False, "options": options or {}}
+        )
+        return response.json()
+
+    async def stream_chat(
+        self,
+        model: str,
+        messages: List[Dict],
+        options: Optional[Dict] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream a chat response as Ollama generates it
+
+        Args:
+            model: Model name
+            messages: Chat messages (role, content)
+            options: Model options (temperature, ...)
+
+        Yields:
+            Ollama chat response parts, one per streamed line
+        """
+        await self.start()
+        async with self._client.stream(
+            "POST",
+            "/api/chat",
+            json={"model": model, "messages": messages, "stream": True, "options": options or {}},
+            timeout=self.timeouts["chat"]
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                raise OllamaError(response.text, response.status_code)
+
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                part = json.loads(line)
+                if part.get("error"):
+                    raise OllamaError(part["error"])
+                yield part
+
+
+_client: Optional[OllamaClient] = None
+
+
+def get_ollama_client() -> OllamaClient:
+    """
+    Get the process-wide Ollama client
+
+    Returns:
+        Shared OllamaClient instance
+    """
+    global _client
+    if _client is None:
+        settings = get_settings()
+        _client = OllamaClient(
+            base_url=settings.ollama_base_url,
+            timeout=settings.ollama_timeout,
+            max_connections=settings.ollama_max_connections,
+            max_keepalive_connections=settings.ollama_max_keepalive_connections
+        )
+    return _client
@@ -0,0 +1,183 @@
+"""
+ONNX Runtime embedding backend (optionally int8-quantized) for CPU inference
+"""
+from typing import List, Union
+import json
+import os
+import time
+import numpy as np
+
+
+METADATA_FILE = "smtapp_onnx.json"
+
+
+class OnnxEmbeddingModel:
+    """
+    Sentence embedding model running on ONNX Runtime
+
+    Reproduces the SentenceTransformer pipeline of the exported model
+    (transformer -> attention-masked mean pooling -> optional L2
+    normalization) and exposes the same encode() call, so EmbeddingService
+    can use either backend interchangeably.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = True, num_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+
+        model_file = "model_int8.onnx" if quantized else "model.onnx"
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.max_seq_length = self.metadata["max_seq_length"]
+        self.normalize = self.metadata["normalize"]
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True
+    ) -> np.ndarray:
+        """
+        Embed one text or a list of texts
+
+        Args:
+            sentences: Text or list of texts
+            batch_size: Texts per inference call
+            convert_to_numpy: Accepted for SentenceTransformer compatibility
+
+        Returns:
+            float32 array of shape (dim,) for one text or (n, dim) for a list
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled.astype(np.float32))
+
+        embeddings = np.concatenate(outputs) if outputs else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def model_dir_for(model_name: str, cache_dir: str) -> str:
+    """Directory holding the exported ONNX files for a model"""
+    return os.path.join(cache_dir, model_name.replace("/", "__"))
+
+
+def export_model(model_name: str, cache_dir: str, quantize: bool = True) -> str:
+    """
+    Export a SentenceTransformer model to ONNX (and int8), once
+
+    Args:
+        model_name: SentenceTransformer model name or path
+        cache_dir: Root directory for exported models
+        quantize: Also write a dynamically int8-quantized copy
+
+    Returns:
+        Directory containing the exported model
+    """
+    model_dir = model_dir_for(model_name, cache_dir)
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model_int8.onnx")
+    metadata_path = os.path.join(model_dir, METADATA_FILE)
+
+    if os.path.exists(metadata_path) and os.path.exists(fp32_path):
+        if not quantize or os.path.exists(int8_path):
+            return model_dir
+
+    # Export needs the PyTorch stack; serving an existing export does not
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(model_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    normalize = any(type(module).__name__ == "Normalize" for module in st_model)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            # Trailing dict = keyword inputs, robust to forward() argument order
+            ({name: sample[name] for name in input_names},),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            do_constant_folding=True
+        )
+    tokenizer.save_pretrained(model_dir)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    with open(metadata_path, "w") as f:
+        json.dump({
+            "model_name": model_name,
+            "max_seq_length": st_model.max_seq_length,
+            "normalize": normalize,
+            "dimensions": st_model.get_sentence_embedding_dimension(),
+        }, f)
+
+    print(f"Exported {model_name} to ONNX in {time.perf_counter() - start:.1f}s")
+    return model_dir
+
+
+def load_onnx_model(
+    model_name: str,
+    cache_dir: str,
+    quantize: bool = True,
+    num_threads: int = 0
+) -> OnnxEmbeddingModel:
+    """
+    Load the ONNX version of a model, exporting it first if needed
+
+    Args:
+        model_name: SentenceTransformer model name or path
+        cache_dir: Root directory for exported models
+        quantize: Use the int8-quantized model
+        num_threads: ONNX Runtime intra-op threads (0 = runtime default)
+
+    Returns:
+        OnnxEmbeddingModel instance
+    """
+    model_dir = export_model(model_name, cache_dir, quantize=quantize)
+    return OnnxEmbeddingModel(model_dir, quantized=quantize, num_threads=num_threads)
@@ -0,0 +1,183 @@
+"""
+In-flight deduplication of identical model generations
+"""
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
+
+from config.settings import get_settings
+from utils.helpers import generate_file_hash
+
+
+class _SharedStream:
+    """Tokens of one upstream stream, replayed to every subscriber"""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._updated = asyncio.Event()
+
+    def notify(self):
+        """Wake subscribers waiting for a token or the end of the stream"""
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait(self):
+        await self._updated.wait()
+
+
+class RequestCoalescer:
+    """
+    Runs concurrent identical generations once
+
+    Calls are keyed by a fingerprint of everything that determines the
+    output (see fingerprint). While a generation for a key is in flight,
+    further calls with that key await the same result instead of starting
+    another one upstream; streamed calls subscribe to the same token
+    stream, a late subscriber first receiving the tokens already produced.
+    Once the generation finishes, the next call with that key starts a new
+    one; nothing is cached.
+
+    The shared generation runs in its own task, so a caller that goes away
+    does not cancel it for the others; a stream is only cancelled once its
+    last subscriber has gone.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self._stats = {
+            "generations": 0,
+            "coalesced": 0,
+            "stream_generations": 0,
+            "stream_coalesced": 0,
+        }
+
+    @staticmethod
+    def fingerprint(**parts) -> str:
+        """Key of a generation: hash of its parameters (JSON-serializable)"""
+        return generate_file_hash(json.dumps(parts, sort_keys=True, default=str).encode("utf-8"))
+
+    async def run(self, key: str, generate: Callable[[], Awaitable]):
+        """
+        Run a generation, or join the identical one in flight
+
+        Args:
+            key: Fingerprint of the generation
+            generate: Starts the generation (called only if none is in flight)
+
+        Returns:
+            Result of the shared generation
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(generate())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish_call(key, done))
+            self._stats["generations"] += 1
+        else:
+            self._stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, generate: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Stream a generation, or subscribe to the identical one in flight
+
+        Args:
+            key: Fingerprint of the generation
+            generate: Starts the token stream (called only if none is in flight)
+
+        Yields:
+            Tokens of the shared stream, from the first one
+        """
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = _SharedStream()
+            self._streams[key] = shared
+            shared.task = asyncio.get_running_loop().create_task(self._produce(key, shared, generate))
+            self._stats["stream_generations"] += 1
+        else:
+            self._stats["stream_coalesced"] += 1
+
+        shared.subscribers += 1
+        try:
+            position = 0
+            while True:
+                if position < len(shared.tokens):
+                    position += 1
+                    yield shared.tokens[position - 1]
+                elif shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                else:
+                    await shared.wait()
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0 and not shared.done:
+                # Nobody is listening any more: stop the upstream generation
+                self._release_stream(key, shared)
+                shared.task.cancel()
+
+    def metrics(self) -> Dict:
+        """
+        Get coalescing statistics
+
+        Returns:
+            Upstream generations and coalesced calls (plain and streamed),
+            the share of calls that were coalesced and the number in flight
+        """
+        stats = dict(self._stats)
+        calls = sum(stats.values())
+        stats["coalesced_rate"] = (stats["coalesced"] + stats["stream_coalesced"]) / calls if calls else 0.0
+        stats["in_flight"] = len(self._calls) + len(self._streams)
+        return stats
+
+    async def _produce(self, key: str, shared: _SharedStream, generate: Callable[[], AsyncIterator[str]]):
+        """Read the upstream stream into the shared token list"""
+        upstream = generate()
+        try:
+            async for token in upstream:
+                shared.tokens.append(token)
+                shared.notify()
+        except Exception as e:
+            shared.error = e
+        finally:
+            shared.done = True
+            self._release_stream(key, shared)
+            shared.notify()
+            await upstream.aclose()
+
+    def _release_stream(self, key: str, shared: _SharedStream):
+        """Stop routing new subscribers to a stream"""
+        if self._streams.get(key) is shared:
+            del self._streams[key]
+
+    def _finish_call(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Every caller may have gone; mark the outcome as seen either way
+        if not task.cancelled():
+            task.exception()
+
+
+_coalescer: Optional[RequestCoalescer] = None
+
+
+def get_request_coalescer() -> Optional[RequestCoalescer]:
+    """
+    Get the process-wide request coalescer
+
+    Returns:
+        Shared RequestCoalescer, or None when coalescing is disabled
+    """
+    global _coalescer
+    if not get_settings().ollama_coalesce_requests:
+        return None
+
+    if _coalescer is None:
+        _coalescer = RequestCoalescer()
+    return _coalescer
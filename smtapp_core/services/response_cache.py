@@ -0,0 +1,260 @@
+"""
+Semantic cache of chat answers over document sets
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import threading
+import time
+import numpy as np
+
+from config.settings import get_settings
+
+
+# Invalidation ticks remembered per document before the oldest are dropped
+_MAX_INVALIDATIONS = 10000
+
+
+class ResponseCache:
+    """
+    In-memory cache of assistant answers keyed by (model, document set, question)
+
+    Entries are grouped by scope: the model name and the sorted document
+    IDs the question was asked against. A lookup embeds nothing itself; it
+    compares the caller's message embedding with those of the entries in
+    the same scope and returns the closest answer if its cosine similarity
+    reaches the threshold. Entries expire after ttl_seconds and the least
+    recently used go first once max_entries is reached. Processing or
+    deleting a document drops every entry that references it.
+
+    The cache lives in one process: with several API workers each keeps
+    its own, and a document changed by another process is only dropped
+    when its entries expire.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._scopes: Dict[Tuple[str, Tuple[int, ...]], Set[int]] = {}
+        self._by_document: Dict[int, Set[int]] = {}
+        self._next_id = 0
+        # Invalidation clock and the tick each document was last invalidated
+        # at (oldest first). Versions below _floor can no longer be checked
+        # against dropped ticks, so put() refuses them.
+        self._clock = 0
+        self._floor = 0
+        self._invalidated_at: "OrderedDict[int, int]" = OrderedDict()
+        # Documents are processed on ingestion worker threads
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "generation_ms_saved": 0.0,
+        }
+
+    @staticmethod
+    def make_scope(model_name: str, document_ids: Iterable[int]) -> Tuple[str, Tuple[int, ...]]:
+        """Build the scope of a question: model and normalized document IDs"""
+        return model_name, tuple(sorted(set(document_ids)))
+
+    def version(self) -> int:
+        """Current invalidation clock, to pass to put() for an answer about to be generated"""
+        with self._lock:
+            return self._clock
+
+    def get(self, model_name: str, document_ids: List[int], embedding: List[float]) -> Optional[Dict]:
+        """
+        Look up the answer to a similar question over the same documents
+
+        Args:
+            model_name: Chat model
+            document_ids: Attached document IDs
+            embedding: Embedding of the user message
+
+        Returns:
+            Dict with content, similarity and age_seconds, or None on a miss
+        """
+        query = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            entry_ids = list(self._scopes.get(self.make_scope(model_name, document_ids), ()))
+            for entry_id in entry_ids:
+                if now - self._entries[entry_id]["created"] > self.ttl:
+                    self._remove(entry_id)
+                    self._stats["expirations"] += 1
+            entry_ids = [entry_id for entry_id in entry_ids if entry_id in self._entries]
+
+            if entry_ids:
+                similarities = np.stack([self._entries[entry_id]["embedding"] for entry_id in entry_ids]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    entry = self._entries[entry_ids[best]]
+                    self._entries.move_to_end(entry_ids[best])
+                    self._stats["hits"] += 1
+                    self._stats["generation_ms_saved"] += entry["generation_ms"]
+                    return {
+                        "content": entry["content"],
+                        "similarity": float(similarities[best]),
+                        "age_seconds": now - entry["created"],
+                    }
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(
+        self,
+        model_name: str,
+        document_ids: List[int],
+        embedding: List[float],
+        content: str,
+        generation_ms: float = 0.0,
+        since: Optional[int] = None
+    ) -> bool:
+        """
+        Store an answer
+
+        Args:
+            model_name: Chat model
+            document_ids: Attached document IDs
+            embedding: Embedding of the user message
+            content: Assistant answer
+            generation_ms: Time the answer took, counted as saved on each hit
+            since: version() from before the answer's context was read; the
+                answer is not stored if a document changed in the meantime
+
+        Returns:
+            Whether the answer was stored
+        """
+        scope = self.make_scope(model_name, document_ids)
+        with self._lock:
+            if since is not None and (
+                since < self._floor or any(self._invalidated_at.get(d, -1) >= since for d in scope[1])
+            ):
+                return False
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "scope": scope,
+                "embedding": _unit(embedding),
+                "content": content,
+                "generation_ms": generation_ms,
+                "created": time.monotonic(),
+            }
+            self._scopes.setdefault(scope, set()).add(entry_id)
+            for document_id in scope[1]:
+                self._by_document.setdefault(document_id, set()).add(entry_id)
+            self._stats["stores"] += 1
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+        return True
+
+    def invalidate_documents(self, document_ids: Iterable[int]) -> int:
+        """
+        Drop every answer that references one of the documents
+
+        Args:
+            document_ids: Documents that were processed or deleted
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            entry_ids = set()
+            for document_id in document_ids:
+                self._invalidated_at[document_id] = self._clock
+                self._invalidated_at.move_to_end(document_id)
+                entry_ids |= self._by_document.get(document_id, set())
+            self._clock += 1
+            while len(self._invalidated_at) > _MAX_INVALIDATIONS:
+                _, tick = self._invalidated_at.popitem(last=False)
+                self._floor = max(self._floor, tick + 1)
+            for entry_id in entry_ids:
+                self._remove(entry_id)
+            self._stats["invalidations"] += len(entry_ids)
+        return len(entry_ids)
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics
+
+        Returns:
+            Hit/miss counters, hit rate, evictions, expirations,
+            invalidations, generation time saved and current size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["generation_ms_saved"] = round(stats["generation_ms_saved"], 1)
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl
+        stats["similarity_threshold"] = self.similarity_threshold
+        return stats
+
+    def clear(self):
+        """Drop all entries and the invalidation history"""
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._by_document.clear()
+            self._invalidated_at.clear()
+            # Advance rather than reset the clock so versions handed out
+            # before the clear stay comparable; their answers are refused
+            self._clock += 1
+            self._floor = self._clock
+
+    def _remove(self, entry_id: int):
+        """Remove an entry and its index references (caller holds the lock)"""
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        scope = entry["scope"]
+        self._scopes[scope].discard(entry_id)
+        if not self._scopes[scope]:
+            del self._scopes[scope]
+        for document_id in scope[1]:
+            self._by_document[document_id].discard(entry_id)
+            if not self._by_document[document_id]:
+                del self._by_document[document_id]
+
+
+def _unit(embedding) -> np.ndarray:
+    """float32 copy of an embedding scaled to unit length"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Get the process-wide response cache
+
+    Returns:
+        Shared ResponseCache, or None when caching is disabled
+    """
+    global _cache
+    settings = get_settings()
+    if not settings.chat_response_cache_enabled:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_entries=settings.chat_response_cache_max_entries,
+                    ttl_seconds=settings.chat_response_cache_ttl_seconds,
+                    similarity_threshold=settings.chat_response_cache_similarity
+                )
+    return _cache
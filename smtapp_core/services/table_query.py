@@ -0,0 +1,339 @@
+"""
+Structured queries over the columnar tables of spreadsheet documents
+"""
+from typing import Any, Dict, List, Optional
+import math
+import os
+import re
+import time
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from models.document import Document
+from utils.columnar import table_path_for
+
+
+AGGREGATE_FUNCTIONS = ("sum", "mean", "min", "max", "count", "count_distinct")
+FILTER_OPERATORS = ("==", "!=", "<", "<=", ">", ">=", "in", "not_in", "contains")
+
+
+class TableQueryError(ValueError):
+    """Invalid query for a table (unknown column, operator or function)"""
+
+
+def document_tables(document: Document) -> List[Dict[str, Any]]:
+    """
+    List the columnar tables of a processed spreadsheet document
+
+    Args:
+        document: Document
+
+    Returns:
+        metadata["tables"] entries (sheet, rows, columns) with the resolved
+        "path", for tables present on disk
+    """
+    tables = []
+    for table in (document.extra_metadata or {}).get("tables", []):
+        path = table_path_for(document.file_path, table["file"])
+        if os.path.exists(path):
+            tables.append({**table, "path": path})
+    return tables
+
+
+def query_table(
+    path: str,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    aggregates: Optional[List[Dict[str, Any]]] = None,
+    columns: Optional[List[str]] = None,
+    order_by: Optional[str] = None,
+    descending: bool = False,
+    limit: int = 100
+) -> Dict[str, Any]:
+    """
+    Filter, group and aggregate a columnar table
+
+    Only the referenced columns are read, filters are pushed down to the
+    Parquet reader (row groups whose statistics exclude every row are
+    skipped), and filtering, grouping and aggregation run vectorized in
+    Arrow.
+
+    Args:
+        path: Parquet table path
+        filters: [{"column", "op", "value"}], combined with AND
+        group_by: Columns to group by
+        aggregates: [{"column", "func"}]; func in AGGREGATE_FUNCTIONS, and
+            "count" without a column counts rows
+        columns: Columns returned when not aggregating (default: all)
+        order_by: Result column to sort by (aggregates are named like "sum(revenue)")
+        descending: Sort descending
+        limit: Maximum rows returned
+
+    Returns:
+        Dictionary with "columns", "rows", "row_count" (before the limit),
+        "truncated" and "elapsed_ms"
+
+    Raises:
+        TableQueryError: If the query does not fit the table
+    """
+    start = time.perf_counter()
+    group_by = list(group_by or [])
+    aggregates = list(aggregates or [])
+    dataset = ds.dataset(path, format="parquet")
+    schema = dataset.schema
+
+    def check_column(column: str) -> str:
+        if schema.get_field_index(column) < 0:
+            raise TableQueryError(f"Unknown column: {column}")
+        return column
+
+    aggregations = []
+    arrow_names = []
+    names = []
+    for aggregate in aggregates:
+        func = aggregate.get("func")
+        column = aggregate.get("column")
+        if func not in AGGREGATE_FUNCTIONS:
+            raise TableQueryError(f"Unsupported aggregate: {func}")
+        if column is None:
+            if func != "count":
+                raise TableQueryError(f"Aggregate {func} needs a column")
+            aggregations.append(([], "count_all"))
+            arrow_names.append("count_all")
+            names.append("count(*)")
+        else:
+            aggregations.append((check_column(column), func))
+            arrow_names.append(f"{column}_{func}")
+            names.append(f"{func}({column})")
+
+    if aggregations or group_by:
+        read_columns = [check_column(column) for column in group_by]
+        read_columns += [column for column, _ in aggregations if column and column not in read_columns]
+    else:
+        read_columns = [check_column(column) for column in columns] if columns else schema.names
+
+    try:
+        expression = None
+        for condition in filters or []:
+            term = _filter_expression(schema, condition)
+            expression = term if expression is None else expression & term
+
+        table = dataset.to_table(columns=read_columns, filter=expression)
+        if aggregations or group_by:
+            result = table.group_by(group_by).aggregate(aggregations)
+            # Arrow names results "<column>_<func>"; use "func(column)"
+            result = result.select(group_by + arrow_names).rename_columns(group_by + names)
+            sort_keys = [(order_by, "descending" if descending else "ascending")] if order_by else [
+                (column, "ascending") for column in group_by
+            ]
+        else:
+            result = table
+            sort_keys = [(order_by, "descending" if descending else "ascending")] if order_by else []
+        if sort_keys:
+            for column, _ in sort_keys:
+                if result.schema.get_field_index(column) < 0:
+                    raise TableQueryError(f"Cannot order by {column}")
+            result = result.sort_by(sort_keys)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+        raise TableQueryError(str(e))
+
+    row_count = result.num_rows
+    result = result.slice(0, limit)
+    rows = [[_json_value(value) for value in row.values()] for row in result.to_pylist()]
+    return {
+        "columns": result.column_names,
+        "rows": rows,
+        "row_count": row_count,
+        "truncated": row_count > limit,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+def _filter_expression(schema: pa.Schema, condition: Dict[str, Any]) -> ds.Expression:
+    """Build a dataset filter for one {"column", "op", "value"} condition"""
+    column = condition.get("column")
+    op = condition.get("op", "==")
+    value = condition.get("value")
+    if schema.get_field_index(column or "") < 0:
+        raise TableQueryError(f"Unknown column: {column}")
+    if op not in FILTER_OPERATORS:
+        raise TableQueryError(f"Unsupported filter operator: {op}")
+
+    field = ds.field(column)
+    column_type = schema.field(column).type
+    if op == "contains":
+        return pc.match_substring(field.cast(pa.string()), str(value), ignore_case=True)
+    if op in ("in", "not_in"):
+        values = value if isinstance(value, list) else [value]
+        values = pa.array([_coerce(column_type, v) for v in values], type=column_type)
+        expression = field.isin(values)
+        return ~expression if op == "not_in" else expression
+
+    value = _coerce(column_type, value)
+    return {
+        "==": field == value,
+        "!=": field != value,
+        "<": field < value,
+        "<=": field <= value,
+        ">": field > value,
+        ">=": field >= value,
+    }[op]
+
+
+def _coerce(column_type: pa.DataType, value: Any) -> Any:
+    """Convert a filter value (often a JSON string) to the column's type"""
+    if value is None:
+        return None
+    try:
+        if pa.types.is_integer(column_type) or pa.types.is_floating(column_type):
+            number = float(value)
+            return int(number) if pa.types.is_integer(column_type) and number.is_integer() else number
+        if pa.types.is_string(column_type) or pa.types.is_large_string(column_type):
+            return str(value)
+        if pa.types.is_boolean(column_type) and isinstance(value, str):
+            return value.strip().lower() in ("true", "1", "yes")
+    except (TypeError, ValueError):
+        raise TableQueryError(f"Invalid value for a {column_type} column: {value!r}")
+    return value
+
+
+def _json_value(value: Any) -> Any:
+    """Map NaN / infinity (not valid JSON) to None"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    """
+    Render a query result as a compact "|"-separated table for a prompt
+
+    Args:
+        result: query_table() result
+
+    Returns:
+        Header line, one line per row, and a note when rows were cut
+    """
+    lines = ["|".join(result["columns"])]
+    for row in result["rows"]:
+        lines.append("|".join(_format_cell(value) for value in row))
+    if result["truncated"]:
+        lines.append(f"({len(result['rows'])} of {result['row_count']} rows)")
+    return "\n".join(lines)
+
+
+def _format_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.6g}" if abs(value) < 1e15 else str(value)
+    return str(value)
+
+
+_AGGREGATE_WORDS = [
+    ("mean", ("average", "avg", "mean")),
+    ("sum", ("total", "sum", "overall")),
+    ("max", ("maximum", "max", "highest", "largest", "biggest")),
+    ("min", ("minimum", "min", "lowest", "smallest")),
+    ("count", ("how many", "count", "number of")),
+]
+
+_GROUP_WORDS = r"(?:by|per|for each|each|across|broken down by)"
+
+# Words that do not constrain an aggregate question: any other word left
+# once columns and aggregate / grouping words are taken out (a customer
+# name, a date, "top", "order") is a condition the plan cannot express
+_FILLER_WORDS = frozenset("""
+    a all an and any are as at be by calculate compute did do does find for
+    from get give how i in is it its list me much my of on our over please s
+    show tell that the their there these this those to value values was we
+    were what whats which with you your
+    table tables sheet sheets spreadsheet data dataset file document
+    row rows record records entry entries line lines column columns
+""".split())
+
+
+def plan_query(question: str, table: Dict[str, Any], limit: int = 50) -> Optional[Dict[str, Any]]:
+    """
+    Derive an aggregate query from a chat question, if it asks for one
+
+    Recognizes aggregate words ("total", "average", "how many", ...) and
+    column names mentioned in the question; columns after "by" / "per" /
+    "each" become the grouping, numeric columns the measures. For example
+    "total revenue by region" becomes sum(revenue) grouped by region.
+    Plans never filter, so a question with any other condition ("total
+    revenue for ACME", "how many units did ACME order") gets no plan
+    rather than a whole-table answer.
+
+    Args:
+        question: User message
+        table: document_tables() entry
+        limit: Maximum result rows
+
+    Returns:
+        query_table() keyword arguments, or None when the question is not
+        an aggregate question about this table
+    """
+    text = " " + re.sub(r"[_\s]+", " ", question.lower()) + " "
+    numeric_types = ("int", "uint", "float", "double", "decimal")
+
+    mentioned = []
+    grouped = []
+    for column in table["columns"]:
+        phrase = re.sub(r"[_\s]+", " ", column["name"].lower()).strip()
+        if not phrase or not re.search(rf"\b{re.escape(phrase)}s?\b", text):
+            continue
+        if re.search(rf"\b{_GROUP_WORDS} (?:the )?{re.escape(phrase)}s?\b", text):
+            grouped.append(column["name"])
+        else:
+            mentioned.append(column)
+
+    functions = [
+        func for func, words in _AGGREGATE_WORDS
+        if any(re.search(rf"\b{re.escape(word)}\b", text) for word in words)
+    ]
+    measures = [column["name"] for column in mentioned if column["type"].startswith(numeric_types)]
+    if len(measures) < len(mentioned) or not _fully_understood(text, table, functions):
+        return None
+    if not functions and grouped and measures:
+        # "revenue by region"
+        functions = ["sum"]
+    if not functions:
+        return None
+
+    aggregates = []
+    for func in functions:
+        if func == "count":
+            aggregates.append({"func": "count"})
+        else:
+            aggregates.extend({"column": column, "func": func} for column in measures)
+    if measures and not any(aggregate.get("column") for aggregate in aggregates):
+        # "how many units": the column is a quantity, not something to count
+        return None
+    if not aggregates:
+        if not grouped:
+            return None
+        aggregates.append({"func": "count"})
+
+    first = aggregates[0]
+    return {
+        "group_by": grouped,
+        "aggregates": aggregates,
+        "order_by": f"{first['func']}({first.get('column', '*')})" if grouped else None,
+        "descending": True,
+        "limit": limit
+    }
+
+
+def _fully_understood(text: str, table: Dict[str, Any], functions: List[str]) -> bool:
+    """Whether every word of a question is a column, aggregate, grouping or filler word"""
+    phrases = [re.sub(r"[_\s]+", " ", column["name"].lower()).strip() for column in table["columns"]]
+    phrases += [word for func, words in _AGGREGATE_WORDS if func in functions for word in words]
+    phrases.append(_GROUP_WORDS)
+    # Longest first, so "number of" goes before "of" and "unit price" before "unit"
+    for phrase in sorted(phrases, key=len, reverse=True):
+        pattern = phrase if phrase is _GROUP_WORDS else rf"{re.escape(phrase)}s?"
+        if phrase:
+            text = re.sub(rf"\b{pattern}\b", " ", text)
+    return all(word in _FILLER_WORDS for word in re.findall(r"\w+", text))
@@ -0,0 +1,322 @@
+"""
+In-memory vector index for document and chunk embeddings
+"""
+from typing import List, Optional, Sequence, Tuple
+import threading
+import numpy as np
+from sqlalchemy.orm import Session
+
+from config.settings import get_settings
+from models.document import Document, DocumentChunk
+from utils.embeddings import decode_embeddings
+
+
+# Row kinds stored in the index
+KIND_DOCUMENT = 0
+KIND_CHUNK = 1
+
+
+class VectorIndex:
+    """
+    Brute-force cosine index backed by a contiguous float32 matrix
+
+    Rows are L2-normalized on insert so a search is a single matrix-vector
+    product followed by argpartition. The index is shared by every request
+    in the process and kept in sync by DocumentService.
+    """
+
+    def __init__(self, dimensions: int, initial_capacity: int = 1024):
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+        self._size = 0
+        self._matrix = np.empty((initial_capacity, dimensions), dtype=np.float32)
+        self._kinds = np.empty(initial_capacity, dtype=np.int8)
+        self._ids = np.empty(initial_capacity, dtype=np.int64)
+        self._document_ids = np.empty(initial_capacity, dtype=np.int64)
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, db: Session):
+        """
+        Populate the index from the database (once per process)
+
+        Args:
+            db: Database session
+        """
+        with self._lock:
+            if self._loaded:
+                return
+
+            documents = db.query(Document.id, Document.embedding).filter(
+                Document.embedding.isnot(None)
+            ).all()
+            chunks = db.query(
+                DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.embedding
+            ).filter(DocumentChunk.embedding.isnot(None)).all()
+
+            rows = len(documents) + len(chunks)
+            self._reserve(rows)
+
+            if documents:
+                self._append(
+                    KIND_DOCUMENT,
+                    [doc_id for doc_id, _ in documents],
+                    [doc_id for doc_id, _ in documents],
+                    decode_embeddings([emb for _, emb in documents], self.dimensions)
+                )
+            if chunks:
+                self._append(
+                    KIND_CHUNK,
+                    [chunk_id for chunk_id, _, _ in chunks],
+                    [doc_id for _, doc_id, _ in chunks],
+                    decode_embeddings([emb for _, _, emb in chunks], self.dimensions)
+                )
+
+            self._loaded = True
+            print(f"Vector index loaded: {len(documents)} documents, {len(chunks)} chunks")
+
+    def add(
+        self,
+        kind: int,
+        ids: Sequence[int],
+        document_ids: Sequence[int],
+        embeddings: np.ndarray
+    ):
+        """
+        Add embeddings to the index
+
+        Args:
+            kind: KIND_DOCUMENT or KIND_CHUNK
+            ids: Row ids (document id or chunk id)
+            document_ids: Owning document id for each row
+            embeddings: Array of shape (n, dimensions)
+        """
+        if len(ids) == 0:
+            return
+
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimensions)
+        ids = np.asarray(ids, dtype=np.int64)
+        document_ids = np.asarray(document_ids, dtype=np.int64)
+        with self._lock:
+            if not self._loaded:
+                # The first load() reads these rows from the database
+                return
+
+            # Skip rows a concurrent load() already picked up
+            n = self._size
+            existing = self._ids[:n][self._kinds[:n] == kind]
+            fresh = ~np.isin(ids, existing)
+            if not fresh.all():
+                ids, document_ids, embeddings = ids[fresh], document_ids[fresh], embeddings[fresh]
+
+            self._reserve(n + len(ids))
+            self._append(kind, ids, document_ids, embeddings)
+
+    def remove_document(self, document_id: int) -> int:
+        """
+        Remove the document row and all of its chunk rows
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            Number of rows removed
+        """
+        with self._lock:
+            n = self._size
+            keep = self._document_ids[:n] != document_id
+            kept = int(keep.sum())
+            removed = n - kept
+            if removed:
+                # Compact into fresh arrays so in-flight searches holding the
+                # old ones keep a consistent snapshot
+                capacity = self._matrix.shape[0]
+                for name in ("_matrix", "_kinds", "_ids", "_document_ids"):
+                    old = getattr(self, name)
+                    new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                    new[:kept] = old[:n][keep]
+                    setattr(self, name, new)
+                self._size = kept
+            return removed
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        limit: int = 5,
+        kind: Optional[int] = None,
+        document_ids: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, int, float]]:
+        """
+        Find the rows most similar to the query
+
+        Args:
+            query_embedding: Query vector
+            limit: Number of results
+            kind: Restrict to KIND_DOCUMENT or KIND_CHUNK rows
+            document_ids: Restrict to rows belonging to these documents
+
+        Returns:
+            List of (row id, document id, cosine similarity), best first
+        """
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+
+        matrix, kinds, ids, owners = self._snapshot()
+        scores = matrix @ query
+        mask = _mask(kinds, owners, kind, document_ids)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+
+        top = _top_k(scores, limit)
+        return [
+            (int(ids[i]), int(owners[i]), float(scores[i]))
+            for i in top
+            if scores[i] != -np.inf
+        ]
+
+    def search_documents(
+        self,
+        query_embedding: Sequence[float],
+        limit: int = 5
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank documents by their best matching row (document or chunk)
+
+        Args:
+            query_embedding: Query vector
+            limit: Number of documents
+
+        Returns:
+            List of (document id, cosine similarity), best first
+        """
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+
+        matrix, _, _, owners = self._snapshot()
+        if len(owners) == 0:
+            return []
+
+        scores = matrix @ query
+
+        unique_ids, inverse = np.unique(owners, return_inverse=True)
+        best = np.full(len(unique_ids), -np.inf, dtype=np.float32)
+        np.maximum.at(best, inverse, scores)
+
+        top = _top_k(best, limit)
+        return [(int(unique_ids[i]), float(best[i])) for i in top]
+
+    def _snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Views of the live rows
+
+        Rows below the current size are never modified in place (appends go
+        past the end and removals allocate new arrays), so the views stay
+        valid after the lock is released.
+        """
+        with self._lock:
+            n = self._size
+            return self._matrix[:n], self._kinds[:n], self._ids[:n], self._document_ids[:n]
+
+    def _reserve(self, capacity: int):
+        """Grow the backing arrays (amortized doubling)"""
+        current = self._matrix.shape[0]
+        if capacity <= current:
+            return
+
+        new_capacity = max(capacity, current * 2)
+        matrix = np.empty((new_capacity, self.dimensions), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+        for name in ("_kinds", "_ids", "_document_ids"):
+            old = getattr(self, name)
+            new = np.empty(new_capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _append(
+        self,
+        kind: int,
+        ids: Sequence[int],
+        document_ids: Sequence[int],
+        embeddings: np.ndarray
+    ):
+        """Write normalized rows after the current end (caller holds the lock)"""
+        start = self._size
+        end = start + len(ids)
+        self._matrix[start:end] = _normalize(embeddings)
+        self._kinds[start:end] = kind
+        self._ids[start:end] = ids
+        self._document_ids[start:end] = document_ids
+        self._size = end
+
+
+def _mask(
+    kinds: np.ndarray,
+    owners: np.ndarray,
+    kind: Optional[int],
+    document_ids: Optional[Sequence[int]]
+) -> Optional[np.ndarray]:
+    """Build a boolean row filter, or None when every row qualifies"""
+    mask = None
+    if kind is not None:
+        mask = kinds == kind
+    if document_ids is not None:
+        in_docs = np.isin(owners, np.asarray(list(document_ids), dtype=np.int64))
+        mask = in_docs if mask is None else mask & in_docs
+    return mask
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows, leaving zero vectors untouched"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, sorted descending"""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_vector_index():
+    """
+    Get the process-wide vector index
+
+    The backend is chosen by settings.vector_index_backend: "memory" for the
+    brute-force VectorIndex, "ann" for the persisted IVF index.
+
+    Returns:
+        Shared VectorIndex or ANNIndex instance
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                settings = get_settings()
+                if settings.vector_index_backend == "ann":
+                    from services.ann_index import ANNIndex
+                    _index = ANNIndex(
+                        index_dir=settings.ann_index_dir,
+                        dimensions=settings.vector_dimensions,
+                        nprobe=settings.ann_nprobe,
+                        nlist=settings.ann_nlist,
+                        train_sample=settings.ann_train_sample,
+                        kmeans_iterations=settings.ann_kmeans_iterations
+                    )
+                else:
+                    _index = VectorIndex(settings.vector_dimensions)
+    return _index
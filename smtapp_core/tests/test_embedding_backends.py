@@ -0,0 +1,84 @@
+"""
+Parity of the ONNX Runtime embedding backend with the PyTorch one
+Embeds a fixed corpus with SentenceTransformer and with the exported ONNX
+model (fp32 and int8) and checks the cosine between the embeddings of each
+text stays above the bounds bench_embedding_backends.py gates on.
+
+Usage:
+    cd smtapp_core && python -m pytest tests/test_embedding_backends.py
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("transformers")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from config.settings import get_settings
+from services.onnx_embedding import export_model, OnnxEmbeddingModel
+
+
+MIN_COSINE_FP32 = 0.9999
+MIN_COSINE_INT8 = 0.98
+
+CORPUS = [
+    "Invoice INV-2024-00042: payment due within 30 days of delivery.",
+    "Quarterly revenue for the north region rose 12% on higher shipment volume.",
+    "The supplier shall deliver all goods to the warehouse listed in clause 4.2.",
+    "Meeting summary: budget review postponed until the policy update is approved.",
+    "Employee travel expenses are reimbursed against itemized receipts only.",
+    "Customer account balance after discount and tax: 1,234.56 EUR.",
+    "Product catalogue v3 adds twelve items and retires the legacy SKUs.",
+    "Kurzfassung: Die Lieferung erfolgt nach Eingang der Zahlung.",
+    "ok",
+    # Longer than max_seq_length, so both backends truncate
+    " ".join(["contract clause delivery schedule supplier account"] * 80),
+]
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.einsum("ij,ij->i", a, b)
+
+
+@pytest.fixture(scope="module")
+def model_name():
+    return get_settings().default_embeddings_model
+
+
+@pytest.fixture(scope="module")
+def model_dir(model_name, tmp_path_factory):
+    return export_model(model_name, str(tmp_path_factory.mktemp("onnx")), quantize=True)
+
+
+@pytest.fixture(scope="module")
+def reference(model_name):
+    model = sentence_transformers.SentenceTransformer(model_name, device="cpu")
+    return np.asarray(model.encode(CORPUS, batch_size=4, convert_to_numpy=True), dtype=np.float32)
+
+
+@pytest.mark.parametrize("quantized, bound", [(False, MIN_COSINE_FP32), (True, MIN_COSINE_INT8)])
+def test_onnx_matches_torch(model_dir, reference, quantized, bound):
+    model = OnnxEmbeddingModel(model_dir, quantized=quantized)
+    embeddings = np.asarray(model.encode(CORPUS, batch_size=4, convert_to_numpy=True), dtype=np.float32)
+
+    assert embeddings.shape == reference.shape
+    cosines = cosine_rows(reference, embeddings)
+    assert cosines.min() >= bound, f"worst text: {CORPUS[int(cosines.argmin())][:60]!r} ({cosines.min():.5f})"
+
+
+def test_onnx_batching_does_not_change_embeddings(model_dir):
+    # Padding to the longest text of a batch must not leak into the pooling
+    model = OnnxEmbeddingModel(model_dir, quantized=False)
+    batched = np.asarray(model.encode(CORPUS, batch_size=len(CORPUS), convert_to_numpy=True))
+    single = np.asarray(model.encode(CORPUS, batch_size=1, convert_to_numpy=True))
+
+    assert cosine_rows(batched, single).min() >= MIN_COSINE_FP32
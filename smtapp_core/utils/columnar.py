@@ -0,0 +1,139 @@
+"""
+Columnar (Parquet) sidecar tables for spreadsheet uploads
+"""
+from typing import Any, Dict, List, Optional
+import os
+import shutil
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Sidecar tables of <file> live in <file>.tables/
+TABLES_SUFFIX = ".tables"
+
+
+def table_dir_for(file_path: str) -> str:
+    """Directory holding the sidecar tables of an uploaded file"""
+    return file_path + TABLES_SUFFIX
+
+
+def table_path_for(file_path: str, table_file: str) -> str:
+    """Path of one sidecar table of an uploaded file"""
+    return os.path.join(table_dir_for(file_path), table_file)
+
+
+def remove_tables(file_path: str):
+    """Delete the sidecar tables of an uploaded file, if any"""
+    shutil.rmtree(table_dir_for(file_path), ignore_errors=True)
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    """
+    Convert a DataFrame to an Arrow table, one column at a time
+
+    Columns Arrow cannot type (e.g. numbers mixed with text, as spreadsheet
+    columns often are) are stored as strings instead of failing the batch.
+    """
+    arrays = []
+    for position in range(len(df.columns)):
+        values = df.iloc[:, position]
+        try:
+            array = pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = pa.array(
+                [None if pd.isna(value) else str(value) for value in values],
+                type=pa.string()
+            )
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=[str(column) for column in df.columns])
+
+
+def _widen(current: pa.DataType, incoming: pa.DataType) -> pa.DataType:
+    """Smallest common type for a column whose batches disagree"""
+    if pa.types.is_null(current):
+        return incoming
+    if pa.types.is_null(incoming):
+        return current
+    numeric = (pa.types.is_integer, pa.types.is_floating)
+    if any(check(current) for check in numeric) and any(check(incoming) for check in numeric):
+        return pa.float64()
+    return pa.string()
+
+
+class ColumnarTableWriter:
+    """
+    Writes one sheet to a Parquet file, a batch of rows at a time
+
+    Each batch becomes a row group, so memory stays bounded by one batch.
+    Column types come from the first batch; when a later batch does not
+    fit (an integer column that turns out to hold decimals, numbers that
+    turn into text) the affected columns are widened and the rows written
+    so far are rewritten once. The table is written to a temp file and
+    moved into place by close(), so readers never see a partial file.
+    """
+
+    def __init__(self, path: str, compression: str = "zstd"):
+        self.path = path
+        self.compression = compression
+        self.rows = 0
+        self.schema: Optional[pa.Schema] = None
+        self._temp_path = self._new_temp_path()
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def write(self, df: pd.DataFrame):
+        """Append a batch of rows"""
+        table = _to_arrow(df)
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.schema = table.schema
+            self._writer = pq.ParquetWriter(self._temp_path, self.schema, compression=self.compression)
+        elif table.schema != self.schema:
+            try:
+                table = table.cast(self.schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                schema = pa.schema([
+                    pa.field(field.name, _widen(field.type, incoming.type))
+                    for field, incoming in zip(self.schema, table.schema)
+                ])
+                self._rewrite(schema)
+                table = table.cast(schema)
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Finish the file and move it into place
+
+        Returns:
+            Column names and types
+        """
+        if self._writer is None:
+            return []
+        self._writer.close()
+        self._writer = None
+        os.replace(self._temp_path, self.path)
+        return [{"name": field.name, "type": str(field.type)} for field in self.schema]
+
+    def abort(self):
+        """Discard the partially written file"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def _new_temp_path(self) -> str:
+        return f"{self.path}.{uuid.uuid4().hex}.tmp"
+
+    def _rewrite(self, schema: pa.Schema):
+        """Copy the rows written so far into a new file with a wider schema"""
+        self._writer.close()
+        previous = self._temp_path
+        self._temp_path = self._new_temp_path()
+        self._writer = pq.ParquetWriter(self._temp_path, schema, compression=self.compression)
+        for batch in pq.ParquetFile(previous).iter_batches():
+            self._writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+        os.remove(previous)
+        self.schema = schema
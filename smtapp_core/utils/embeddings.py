@@ -0,0 +1,99 @@
+"""
+Binary encoding of embedding vectors for database storage
+
+Vectors are stored as raw little-endian float32 (or float16) bytes instead
+of JSON text. Rows written before the switch are still JSON strings and are
+decoded transparently until migrate_embeddings.py has converted them.
+"""
+from typing import Optional, Sequence, Union
+import json
+import numpy as np
+
+
+STORAGE_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+
+
+def encode_embedding(embedding: Union[Sequence[float], np.ndarray], dtype: str = "float32") -> bytes:
+    """
+    Encode an embedding as raw little-endian bytes
+
+    Args:
+        embedding: Embedding vector
+        dtype: Storage dtype ("float32" or "float16")
+
+    Returns:
+        Bytes suitable for a BLOB column
+    """
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError(f"Unsupported embedding storage dtype: {dtype}")
+    return np.asarray(embedding, dtype=STORAGE_DTYPES[dtype]).tobytes()
+
+
+def decode_embedding(value: Union[bytes, str, Sequence[float]], dimensions: int) -> np.ndarray:
+    """
+    Decode a stored embedding
+
+    Bytes are wrapped with np.frombuffer without copying when stored as
+    float32; float16 rows are widened to float32. JSON strings from older
+    rows are parsed.
+
+    Args:
+        value: Stored value (bytes, JSON string or list)
+        dimensions: Expected vector length, used to infer the storage dtype
+
+    Returns:
+        float32 array of shape (dimensions,)
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        dtype = _infer_dtype(len(value), dimensions)
+        vector = np.frombuffer(value, dtype=dtype)
+        return vector if dtype == STORAGE_DTYPES["float32"] else vector.astype(np.float32)
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def decode_embeddings(values: Sequence[Union[bytes, str]], dimensions: int) -> np.ndarray:
+    """
+    Decode many stored embeddings into one contiguous matrix
+
+    When every row is binary with the same dtype the bytes are joined and
+    decoded with a single np.frombuffer call.
+
+    Args:
+        values: Stored values
+        dimensions: Vector length
+
+    Returns:
+        float32 array of shape (len(values), dimensions)
+    """
+    if not values:
+        return np.empty((0, dimensions), dtype=np.float32)
+
+    first = values[0]
+    if isinstance(first, (bytes, bytearray, memoryview)):
+        size = len(first)
+        if all(isinstance(v, (bytes, bytearray, memoryview)) and len(v) == size for v in values):
+            dtype = _infer_dtype(size, dimensions)
+            matrix = np.frombuffer(b"".join(values), dtype=dtype).reshape(len(values), dimensions)
+            return matrix if dtype == STORAGE_DTYPES["float32"] else matrix.astype(np.float32)
+
+    return np.stack([decode_embedding(v, dimensions) for v in values])
+
+
+def is_legacy_embedding(value: Optional[Union[bytes, str]]) -> bool:
+    """Check whether a stored embedding still uses the JSON text format"""
+    return isinstance(value, str)
+
+
+def _infer_dtype(byte_length: int, dimensions: int) -> np.dtype:
+    """Infer the storage dtype from the blob size"""
+    for dtype in STORAGE_DTYPES.values():
+        if byte_length == dimensions * dtype.itemsize:
+            return dtype
+    raise ValueError(
+        f"Embedding blob of {byte_length} bytes does not match {dimensions} dimensions"
+    )
@@ -68,6 +68,24 @@ def sanitize_filename(filename: str) -> str:
     return filename
 
 
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens in a text
+    
+    Uses the common ~4 characters per token rule of thumb, which is close
+    enough for budgeting prompts without loading a tokenizer.
+    
+    Args:
+        text: Text to measure
+        
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
 def chunk_text(text: str, max_length: int = 500, overlap: int = 50) -> list:
     """
     Split text into chunks with overlap
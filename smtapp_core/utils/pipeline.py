@@ -0,0 +1,84 @@
+"""
+Helpers for streaming pipelines with bounded buffers
+"""
+from typing import Iterable, Iterator, List, TypeVar
+import queue
+import threading
+
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Group an iterable into lists of up to size items
+
+    Args:
+        items: Source items
+        size: Items per batch
+
+    Yields:
+        Lists of items
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prefetch(items: Iterable[T], maxsize: int = 2) -> Iterator[T]:
+    """
+    Run an iterator in a background thread, at most maxsize items ahead
+
+    Lets one pipeline stage (e.g. extraction + chunking) overlap with the
+    next (embedding + database writes) while the queue between them bounds
+    memory. Exceptions from the producer are re-raised in the consumer, and
+    closing the consumer early stops the producer.
+
+    Args:
+        items: Source iterable, consumed in the background thread
+        maxsize: Maximum items buffered between the stages
+
+    Yields:
+        Items of the source, in order
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+
+    thread = threading.Thread(target=produce, name="pipeline-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,194 @@
+"""
+Streaming upload helpers
+"""
+from typing import Iterable, List, Optional, Tuple
+import asyncio
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+
+from starlette.requests import Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+# Room for boundaries, part headers and small form fields on top of the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+
+
+class _FilePartReader:
+    """Multipart parser callbacks that collect the data of one file field"""
+
+    def __init__(self, field: str):
+        self.field = field.encode("latin-1")
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.pending: List[bytes] = []
+        self.size = 0
+        self.finished = False
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._active = False
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field_data,
+            "on_header_value": self._header_value_data,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_field_data(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _header_value_data(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if self.filename is None and options.get(b"name") == self.field and b"filename" in options:
+            self._active = True
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+            content_type = self._headers.get(b"content-type")
+            self.content_type = content_type.decode("latin-1") if content_type else None
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        if self._active:
+            self.pending.append(bytes(data[start:end]))
+            self.size += end - start
+
+    def _part_end(self):
+        if self._active:
+            self._active = False
+            self.finished = True
+
+
+async def stream_upload_to_temp(
+    request: Request,
+    temp_dir: str,
+    max_bytes: int,
+    supported_formats: Optional[Iterable[str]] = None,
+    field: str = "file"
+) -> Tuple[str, int, str, str, Optional[str]]:
+    """
+    Stream the file field of a multipart request body to a temp file
+
+    The body is parsed as it arrives from the client instead of letting
+    the framework spool the whole form to disk first, so only one network
+    chunk is held in memory and the file is written once. A Content-Length
+    over the limit is rejected before reading anything; otherwise the read
+    stops (and the temp file is removed) as soon as the file passes the
+    limit. The SHA-256 and size are computed while copying.
+
+    Args:
+        request: Incoming multipart/form-data request
+        temp_dir: Directory for the temp file
+        max_bytes: Maximum allowed file size in bytes
+        supported_formats: Allowed file extensions (checked from the part headers)
+        field: Form field holding the file
+
+    Returns:
+        Tuple of (temp file path, size in bytes, SHA-256 hex digest,
+        original filename, content type)
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than max_bytes
+        ValueError: If the body is not a multipart upload with the file
+            field, or the file type is not supported
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadTooLargeError(max_bytes)
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data upload")
+
+    reader = _FilePartReader(field)
+    parser = MultipartParser(params[b"boundary"], reader.callbacks())
+
+    os.makedirs(temp_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir, suffix=".upload")
+    sha256 = hashlib.sha256()
+    checked_type = False
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if reader.filename is not None and not checked_type:
+                    checked_type = True
+                    file_ext = reader.filename.rsplit(".", 1)[-1].lower() if "." in reader.filename else ""
+                    if supported_formats is not None and file_ext not in supported_formats:
+                        raise ValueError(f"Unsupported file type: {file_ext}")
+                if reader.size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                if reader.pending:
+                    data = b"".join(reader.pending)
+                    reader.pending.clear()
+                    sha256.update(data)
+                    await asyncio.to_thread(f.write, data)
+                if reader.finished:
+                    # Later form fields are not needed
+                    break
+            else:
+                parser.finalize()
+
+        if reader.filename is None:
+            raise ValueError(f"Missing file field: {field}")
+        if not reader.finished:
+            raise ValueError("Upload ended before the file was complete")
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return temp_path, reader.size, sha256.hexdigest(), reader.filename, reader.content_type
+
+
+def move_into_place(temp_path: str, final_path: str):
+    """
+    Atomically move a finished temp file to its final path
+
+    Falls back to copying next to the destination and renaming when the two
+    directories are on different filesystems, so readers never see a
+    partially written file.
+
+    Args:
+        temp_path: Source temp file
+        final_path: Destination path
+    """
+    os.makedirs(os.path.dirname(final_path) or ".", exist_ok=True)
+    try:
+        os.replace(temp_path, final_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        staging_path = f"{final_path}.part"
+        shutil.copyfile(temp_path, staging_path)
+        os.replace(staging_path, final_path)
+        os.remove(temp_path)